@@ -0,0 +1,152 @@
+"""
+Shared address extraction for the scrapers and generate_csv.
+
+Every address pattern used in this project starts with a literal anchor
+(山东省, or 地址 for labelled addresses). For a set of pattern kinds, one
+combined regex is compiled: it stops only at anchors and, at each one,
+evaluates every kind as an optional capturing lookahead. The text is
+therefore scanned once, in C, no matter how many kinds are requested.
+Because each pattern begins with its anchor, the first anchor where a kind
+matches is exactly what re.search would return, and skipping anchors inside
+the previous match of the same kind reproduces re.findall.
+
+best_address() needs only the first match of the highest-priority kind that
+matches at all, so it does not pay for every kind at every anchor: it
+searches the kinds one at a time, best first, each with its own compiled
+pattern, and stops at the first kind that matches.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+ANCHORS = ('山东省', '地址')
+
+# Words that end a labelled address even without whitespace before them (Baidu map widgets)
+LABEL_STOP_WORDS = ('点击查看地图', '附近企业')
+
+# Pattern sources keyed by kind; every one begins with one of the anchors
+PATTERNS = {
+    # generate_csv: street address with a house number (also covers the dev-zone and park variants)
+    'numbered': r'山东省[\w市县区]+[\w路街道]+\d+号',
+    # bing-web-scrape: province prefix up to an address suffix
+    'hao': r'山东省[^\n\.。,，:：]{5,60}号',
+    'lu': r'山东省[^\n\.。,，:：]{5,60}路',
+    'jie': r'山东省[^\n\.。,，:：]{5,60}街',
+    'park': r'山东省[^\n\.。,，:：]{5,60}工业园',
+    'zone': r'山东省[^\n\.。,，:：]{5,60}开发区',
+    # generate_csv: building name / general address without a number
+    'building': r'山东省[\w市县区]+[\w路街道]+[\w大厦]',
+    'general': r'山东省[\w市县区]+[\w路街道]+',
+    # bing-web-scrape broad fallback and generate_csv sentence fallback
+    'broad': r'山东省[^，。\n]{10,100}',
+    'sentence': r'山东省[^。，；\n]{5,60}',
+    # baidu_scrape: value after an 地址 label, up to the first whitespace or stop word
+    'labeled': r'地址[:：]?(?P<labeled_value>(?:(?!' + '|'.join(LABEL_STOP_WORDS) + r')\S)*)',
+}
+
+# Higher score = more specific / more trustworthy
+PRIORITY = {
+    'numbered': 100,
+    'hao': 90,
+    'lu': 80,
+    'jie': 70,
+    'park': 60,
+    'zone': 50,
+    'building': 40,
+    'general': 30,
+    'labeled': 25,
+    'broad': 20,
+    'sentence': 10,
+}
+
+# Kind groups used by the scripts, in the order their original patterns were tried
+SUFFIX_KINDS = ('hao', 'lu', 'jie', 'park', 'zone')
+STRUCTURED_KINDS = ('numbered', 'building', 'general')
+
+# Words that mark an address-like snippet
+ADDRESS_MARKERS = ["号", "路", "经济技术开发区", "工业园"]
+
+AddressCandidate = namedtuple('AddressCandidate', ['text', 'kind', 'score', 'start'])
+
+
+@lru_cache(maxsize=None)
+def _combined_pattern(kinds):
+    """
+    Compile the single-scan pattern for a tuple of kinds.
+
+    Returns:
+        tuple: (pattern, [(kind, group index)], labeled value group index or None)
+    """
+    # Group the kinds by anchor and evaluate each kind as an optional lookahead
+    # right after its anchor, so the scan itself is a plain literal alternation
+    branches = []
+    for anchor in ANCHORS:
+        lookaheads = "".join(f"(?:(?=(?P<{kind}>{PATTERNS[kind][len(anchor):]})))?"
+                             for kind in kinds if PATTERNS[kind].startswith(anchor))
+        if lookaheads:
+            branches.append(f"{anchor}{lookaheads}")
+    pattern = re.compile("|".join(branches))
+    # Read groups by position from match.groups() rather than by name
+    slots = [(kind, pattern.groupindex[kind] - 1) for kind in kinds]
+    value_slot = pattern.groupindex['labeled_value'] - 1 if 'labeled' in kinds else None
+    return pattern, slots, value_slot
+
+
+@lru_cache(maxsize=None)
+def _kind_pattern(kind):
+    """Compiled pattern of a single kind."""
+    return re.compile(PATTERNS[kind])
+
+
+def _iter_matches(text, kinds):
+    """Yield (kind, start, end, value) for every non-overlapping match of each kind, in text order."""
+    pattern, slots, value_slot = _combined_pattern(kinds)
+    next_free = dict.fromkeys(kinds, 0)
+    for match in pattern.finditer(text):
+        groups = match.groups()
+        pos, anchor_end = match.span()
+        for kind, slot in slots:
+            rest = groups[slot]
+            if rest is None or pos < next_free[kind]:
+                continue
+            end = anchor_end + len(rest)
+            next_free[kind] = end
+            if kind == 'labeled':
+                yield kind, pos, end, groups[value_slot].strip()
+            else:
+                yield kind, pos, end, text[pos:end]
+
+
+def find_candidates(text, kinds=tuple(PATTERNS)):
+    """
+    Scan text once and return every address candidate of the requested kinds.
+
+    Args:
+        text (str): Text to search
+        kinds (iterable): Pattern kinds to evaluate at each anchor
+
+    Returns:
+        list: AddressCandidate tuples ranked by score (highest first), then by
+              position. Matches of one kind never overlap, like re.findall.
+    """
+    if not text:
+        return []
+    candidates = [AddressCandidate(value, kind, PRIORITY[kind], start)
+                  for kind, start, _end, value in _iter_matches(text, tuple(kinds))]
+    candidates.sort(key=lambda candidate: (-candidate.score, candidate.start))
+    return candidates
+
+
+def best_address(text, kinds=tuple(PATTERNS)):
+    """
+    Top-ranked candidate text of the requested kinds, or None: the first
+    match of the highest-priority kind that matches anywhere in the text.
+    """
+    if not text:
+        return None
+    for kind in sorted(kinds, key=PRIORITY.get, reverse=True):
+        match = _kind_pattern(kind).search(text)
+        if match is not None:
+            return match.group('labeled_value').strip() if kind == 'labeled' else match.group(0)
+    return None
+
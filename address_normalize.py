@@ -0,0 +1,182 @@
+"""
+Hierarchical address normalization.
+
+parse_address() splits a Shandong address into province, city, county,
+town, park, road and number. Divisions come from the gazetteer's trie, so
+short and former names are mapped to the current official ones (临淄 ->
+淄博市临淄区, 莱芜市钢城区 -> 济南市钢城区). The finer parts are matched
+with suffix patterns after variant spellings have been folded into one
+canonical form (经济技术开发区 -> 经济开发区, 街道办事处 -> 街道 ...).
+
+Parsing is cached per distinct address, and normalize_addresses() works
+column-wise: the text cleanup runs as pandas .str operations and only the
+distinct cleaned addresses are parsed. dedup_key() gives the canonical key
+the geocode cache and de-duplication use.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+import pandas as pd
+
+from gazetteer import Gazetteer, PROVINCE
+
+# --- Constants ---
+# Variant spellings folded into one canonical form, applied in order (longer variants first)
+CANONICAL_TERMS = [
+    (r"经济技术开发区|经济技术开发|经开区", "经济开发区"),
+    (r"高新技术产业开发区|高新技术产业园区|高新技术开发区|高新开发区|高新技术区", "高新区"),
+    (r"化学工业园区?|化工(?:产业|工业)?园区?", "化工园区"),
+    (r"工业园区?", "工业园区"),
+    (r"街道办事处|街道办|办事处", "街道"),
+]
+
+# Noise removed before parsing: whitespace, brackets and the punctuation used inside addresses
+NOISE_PATTERN = r"[\s\"'“”‘’、，,。.;；:：()\[\]【】]+"
+
+TOWN_PATTERN = re.compile(r"[一-龥]{1,8}?(?:镇|乡|街道)")
+PARK_PATTERN = re.compile(r"[一-龥\d]{0,10}?(?:经济开发区|高新区|化工园区|工业园区|开发区|产业园|园区|港区)")
+ROAD_PATTERN = re.compile(r"[一-龥\dA-Za-z]{1,12}?(?:大道|大街|路|街(?!道)|巷)")
+NUMBER_PATTERN = re.compile(r"\d+(?:[-之]\d+)?号")
+
+COMPONENTS = ("province", "city", "county", "town", "park", "road", "number", "rest")
+
+ParsedAddress = namedtuple("ParsedAddress", COMPONENTS)
+
+_gazetteer = None
+
+
+def _get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+def clean_address(address):
+    """NFKC-fold, remove whitespace and punctuation, and fold variant spellings."""
+    text = unicodedata.normalize("NFKC", str(address))
+    text = re.sub(NOISE_PATTERN, "", text)
+    for pattern, canonical in CANONICAL_TERMS:
+        text = re.sub(pattern, canonical, text)
+    return text
+
+
+def clean_address_series(addresses):
+    """
+    Vectorized clean_address over a Series: one .str call per rule, not per row.
+
+    Returns:
+    Series: Cleaned strings; missing values become ""
+    """
+    text = addresses.fillna("").astype(str).str.normalize("NFKC")
+    text = text.str.replace(NOISE_PATTERN, "", regex=True)
+    for pattern, canonical in CANONICAL_TERMS:
+        text = text.str.replace(pattern, canonical, regex=True)
+    return text
+
+
+def _take(pattern, text):
+    # First match of a component and the text after it; the text is unchanged if there is none
+    match = pattern.search(text)
+    if match is None:
+        return "", text
+    return match.group(0), text[match.end():]
+
+
+@lru_cache(maxsize=100000)
+def parse_cleaned(text):
+    """parse_address for text already passed through clean_address (cached)."""
+    province = city = county = town = ""
+    rest = text
+    reconciled = _get_gazetteer().divisions(text)
+    if reconciled is not None:
+        chosen, end = reconciled
+        if chosen:
+            province = PROVINCE[0]
+        if "city" in chosen:
+            city = chosen["city"].city
+        if "county" in chosen:
+            county = chosen["county"].county
+            city = chosen["county"].city
+        if "town" in chosen:
+            town = chosen["town"].name
+        rest = text[end:]
+    elif text.startswith(PROVINCE[0]) or text.startswith(PROVINCE[0][:-1]):
+        province = PROVINCE[0]
+
+    if not town:
+        town, after = _take(TOWN_PATTERN, rest)
+        if town:
+            rest = after
+    park, after = _take(PARK_PATTERN, rest)
+    if park:
+        rest = after
+    road, after = _take(ROAD_PATTERN, rest)
+    if road:
+        rest = after
+    number, after = _take(NUMBER_PATTERN, rest)
+    if number:
+        rest = after
+    return ParsedAddress(province, city, county, town, park, road, number, rest)
+
+
+def parse_address(address):
+    """
+    Split an address into its hierarchical components.
+
+    Returns:
+    ParsedAddress: province, city, county, town, park, road, number and rest
+                   (whatever follows the last component, e.g. building or room);
+                   components not present are ""
+    """
+    return parse_cleaned(clean_address(address))
+
+
+def canonical_address(parsed):
+    """Full canonical address text including the rest, with 山东省 filled in ("" for an empty address)."""
+    text = "".join(parsed)
+    if text and not parsed.province:
+        text = PROVINCE[0] + text
+    return text
+
+
+def _key(parsed):
+    # Building, floor and room after a house number do not change the location
+    if parsed.number:
+        parsed = parsed._replace(rest="")
+    return canonical_address(parsed)
+
+
+def dedup_key(address):
+    """
+    Canonical key under which equivalent spellings of an address coincide:
+    divisions filled in and named officially, variants folded, and anything
+    after the house number dropped.
+    """
+    return _key(parse_address(address))
+
+
+def normalize_addresses(addresses):
+    """
+    Normalize a whole address column.
+
+    Parameters:
+    addresses (Series): Raw addresses
+
+    Returns:
+    DataFrame: One column per component plus 'address' (canonical text) and
+               'key' (dedup_key), indexed like the input
+    """
+    cleaned = clean_address_series(addresses)
+    unique = pd.unique(cleaned)
+    parsed = [parse_cleaned(text) for text in unique]
+    table = pd.DataFrame(parsed, columns=COMPONENTS)
+    table["address"] = [canonical_address(p) for p in parsed]
+    table["key"] = [_key(p) for p in parsed]
+    # Fan the per-distinct-address rows back out to every input row
+    positions = pd.Index(unique).get_indexer(cleaned)
+    result = table.iloc[positions].reset_index(drop=True)
+    result.index = addresses.index
+    return result
@@ -1,108 +1,416 @@
+import argparse
 import csv
+import json
 import time
 import random
-import re
 import os
-import pandas as pd
+import queue
+import threading
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-
-# Load company names
-input_file = "shandong_chemical_plant_list.csv"
-df = pd.read_csv(input_file)
-if "Company" not in df.columns:
-    raise ValueError("The input CSV must contain a column named 'Company'")
-companies = df["Company"].tolist()
-
-# Determine where to resume from
-existing_addresses = {}
-if os.path.exists("addresses.csv"):
-    with open("addresses.csv", "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        next(reader, None)  # skip header
-        for row in reader:
-            if len(row) == 2:
-                existing_addresses[row[0]] = row[1]
-
-# Filter companies that haven't been processed yet
-unprocessed_companies = [c for c in companies if c not in existing_addresses]
-
-# Set up Selenium
-chrome_options = Options()
-chrome_options.add_argument('--headless')
-chrome_options.add_argument('--disable-gpu')
-chrome_options.add_argument('--no-sandbox')
-chrome_options.add_argument('--disable-dev-shm-usage')
-chrome_options.add_argument(f'user-agent={random.choice([
+
+from address_extract import best_address
+from browser import PageMetrics, create_driver as create_browser, load_page, quit_driver
+from company_store import load_table
+from page_store import PAGE_STORE_DIR, PageStore, reextract
+from pacing import (AdaptiveRateController, BlockedError, DEFAULT_INITIAL_RATE, DEFAULT_MAX_RATE,
+                    DEFAULT_MIN_RATE, detect_block)
+
+INPUT_FILE = "shandong_chemical_plant_list.csv"
+OUTPUT_FILE = "addresses.csv"
+JOURNAL_FILE = "addresses.journal.jsonl"
+
+USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.5993.117 Safari/537.36"
-])}')
-driver = webdriver.Chrome(options=chrome_options)
+]
+
+# Seconds to wait for a results page to render; the gap between queries is set adaptively
+PAGE_WAIT = (3, 5)
+
+# Attempts per company before it is journaled as an error
+MAX_ATTEMPTS = 3
+
+# Address kinds taken from Baidu pages: the value after an 地址 label
+LABELED = ('labeled',)
+
+
+def load_companies(input_file):
+    """Load company names from the input table (company_store; the CSV is imported if newer)."""
+    df = load_table(input_file)
+    if "Company" not in df.columns:
+        raise ValueError("The input CSV must contain a column named 'Company'")
+    return df["Company"].tolist()
+
+
+def load_existing_addresses(output_file):
+    """Read already scraped (company, address) pairs so the run can resume."""
+    existing_addresses = {}
+    if os.path.exists(output_file):
+        with open(output_file, "r", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # skip header
+            for row in reader:
+                if len(row) == 2:
+                    existing_addresses[row[0]] = row[1]
+    return existing_addresses
+
+
+def write_addresses(output_file, results):
+    """Write all (company, address) pairs to the output CSV (via a temp file, so a crash never truncates it)."""
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Company", "Address"])
+        writer.writerows(results)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, output_file)
+
+
+def create_driver(user_agent):
+    """Start a lean headless Chrome instance with the given user agent."""
+    return create_browser(user_agent=user_agent)
+
+
+def extract_address(page_source):
+    """
+    Pull the most likely address out of a Baidu results page.
+
+    Args:
+        page_source (str): Rendered HTML of the results page
+
+    Returns:
+        tuple: (address, selector) where selector names the rule that matched,
+               or ("address not found", None)
+    """
+    soup = BeautifulSoup(page_source, "html.parser")
 
-results = list(existing_addresses.items())
+    # First: AI box
+    ai_box = soup.select_one('.op-smart-answer-new-promotion-line')
+    if ai_box:
+        address = best_address(ai_box.get_text(), LABELED)
+        if address:
+            return address, "ai_box"
 
-for idx, company in enumerate(unprocessed_companies):
+    # Second: Map snippet fallback
+    address = best_address(soup.get_text(), LABELED)
+    if address:
+        return address, "page_text"
+
+    # Third: General fallback from top search results
+    search_results = soup.select("div.result")
+    for result in search_results:
+        address = best_address(result.get_text(), LABELED)
+        if address:
+            return address, "div.result"
+
+    return "address not found", None
+
+
+def search_company(driver, company, page_wait=PAGE_WAIT, store=None):
+    """
+    Run one Baidu query for a company and return (address, selector).
+    Raises BlockedError if Baidu answered with a captcha / verification page.
+    Results pages are kept in the page store, when given, for offline re-extraction.
+    """
     query = f"{company} 山东工厂 地址"
     url = f"https://www.baidu.com/s?wd={query}"
+    load_page(driver, url)
+    time.sleep(random.uniform(*page_wait))  # Wait for content to load
+    page_source = driver.page_source
+    marker = detect_block(page_source)
+    if marker:
+        raise BlockedError(marker)
+    if store is not None:
+        store.put("baidu", query, company, page_source)
+    return extract_address(page_source)
 
-    try:
-        driver.get(url)
-        time.sleep(random.uniform(3, 5))  # Wait for content to load
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        address = ""
-
-        # First: AI box
-        ai_box = soup.select_one('.op-smart-answer-new-promotion-line')
-        if ai_box:
-            ai_text = ai_box.get_text()
-            match = re.search(r"地址[:：]?(.*?)(\n|\s|点击查看地图|$)", ai_text)
-            if match:
-                address = match.group(1).strip()
-
-        # Second: Map snippet fallback
-        if not address:
-            map_match = re.search(r"地址[:：]?(.*?)(\n|\s|附近企业|点击查看地图|$)", soup.get_text())
-            if map_match:
-                address = map_match.group(1).strip()
-
-        # Third: General fallback from top search results
-        if not address:
-            search_results = soup.select("div.result")
-            for result in search_results:
-                result_text = result.get_text()
-                fallback_match = re.search(r"地址[:：]?(.*?)(\n|\s|$)", result_text)
-                if fallback_match:
-                    address = fallback_match.group(1).strip()
-                    if address:
-                        break
-
-        if not address:
-            address = "address not found"
-
-        print(f"{company} --> {address}")
-        results.append((company, address))
-
-        if len(results) % 10 == 0:
-            with open("addresses.csv", "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Company", "Address"])
-                writer.writerows(results)
-
-        time.sleep(random.uniform(5, 10))
 
+class ResultJournal:
+    """
+    Append-only, fsync'd JSONL log of scrape results.
+
+    Each company costs one appended line (company, address, status, source
+    selector, timestamp), so checkpointing is O(1) per result and a crash can
+    at worst lose the line being written. Replaying the journal rebuilds the
+    resume state; compact() produces the final addresses.csv.
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.lock = threading.Lock()
+        # Terminate a torn last line from a crash so new records start on their own line
+        needs_newline = False
+        if os.path.exists(journal_file) and os.path.getsize(journal_file) > 0:
+            with open(journal_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self.file = open(journal_file, "a", encoding="utf-8")
+        if needs_newline:
+            self.file.write("\n")
+
+    def append(self, company, address, status, selector=None):
+        record = {
+            "company": company,
+            "address": address,
+            "status": status,
+            "selector": selector,
+            "ts": time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def replay_journal(journal_file):
+    """
+    Rebuild the latest result per company from the journal.
+
+    Returns:
+        dict: company -> record; the last line for a company wins, and a
+              torn final line from a crash is ignored
+    """
+    records = {}
+    if not os.path.exists(journal_file):
+        return records
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["company"]] = record
+    return records
+
+
+def load_resume_state(journal_file, output_file):
+    """
+    Companies already resolved, from the journal plus any legacy addresses.csv.
+    Errors are not treated as done, so they are retried on the next run.
+    """
+    existing_addresses = load_existing_addresses(output_file)
+    for company, record in replay_journal(journal_file).items():
+        if record["status"] == "error":
+            existing_addresses.pop(company, None)
+        else:
+            existing_addresses[company] = record["address"]
+    return {c: a for c, a in existing_addresses.items() if a != "error"}
+
+
+def compact(journal_file, output_file, companies):
+    """Write addresses.csv from the journal: one row per company, in input order."""
+    addresses = load_existing_addresses(output_file)
+    for company, record in replay_journal(journal_file).items():
+        addresses[company] = record["address"]
+
+    # Input order first, then any earlier rows for companies no longer in the input
+    known = set(companies)
+    ordered = [c for c in dict.fromkeys(companies) if c in addresses]
+    ordered += [c for c in addresses if c not in known]
+    write_addresses(output_file, [(c, addresses[c]) for c in ordered])
+    return len(ordered)
+
+
+def next_company(work_queue, retry_queue):
+    """Take the next (company, attempt) pair, preferring fresh work over retries."""
+    for source in (work_queue, retry_queue):
+        try:
+            return source.get_nowait()
+        except queue.Empty:
+            continue
+    return None
+
+
+def run_worker(worker_id, work_queue, retry_queue, journal, stats, controller, page_wait=PAGE_WAIT,
+               store=None):
+    """
+    Drain the shared queues with a dedicated Chrome instance and user agent.
+
+    Pacing comes from the worker's AdaptiveRateController: clean pages speed
+    it up, captcha pages slow it down. A company that hits a block or an
+    error goes to the retry queue instead of stopping the run, and is
+    journaled as "error" after MAX_ATTEMPTS.
+    """
+    user_agent = USER_AGENTS[worker_id % len(USER_AGENTS)]
+    worker_stats = {"processed": 0, "errors": 0, "blocks": 0, "started": time.time(), "finished": None,
+                    "network": PageMetrics()}
+    stats[worker_id] = worker_stats
+
+    try:
+        driver = create_driver(user_agent)
     except Exception as e:
-        print(f"{company} --> Error: {e}")
-        results.append((company, "error"))
-        break  # assume block, halt batch
-
-# Final write
-with open("addresses.csv", "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Company", "Address"])
-    writer.writerows(results)
-
-driver.quit()
-print("Scraping complete or interrupted. Saved to addresses.csv")
+        print(f"[worker {worker_id}] Failed to start Chrome: {e}")
+        worker_stats["finished"] = time.time()
+        return
+
+    try:
+        while True:
+            item = next_company(work_queue, retry_queue)
+            if item is None:
+                break
+            company, attempt = item
+
+            try:
+                address, selector = search_company(driver, company, page_wait, store)
+                print(f"[worker {worker_id}] {company} --> {address}")
+                journal.append(company, address, "ok" if selector else "not_found", selector)
+                worker_stats["processed"] += 1
+                controller.on_success()
+
+            except Exception as e:
+                if isinstance(e, BlockedError):
+                    print(f"[worker {worker_id}] {company} --> Blocked ({e})")
+                    worker_stats["blocks"] += 1
+                    controller.on_block(str(e))
+                else:
+                    print(f"[worker {worker_id}] {company} --> Error: {e}")
+                    worker_stats["errors"] += 1
+
+                if attempt + 1 < MAX_ATTEMPTS:
+                    retry_queue.put((company, attempt + 1))
+                else:
+                    journal.append(company, "error", "error")
+
+            controller.wait()
+    finally:
+        worker_stats["network"] = quit_driver(driver)
+        worker_stats["finished"] = time.time()
+
+
+def reextract_addresses(store, journal, workers=None):
+    """
+    Re-run extract_address over every stored Baidu page, without a browser,
+    and journal the results so compact() picks them up.
+
+    Returns:
+        tuple: (pages re-extracted, companies whose address changed)
+    """
+    previous = replay_journal(journal.journal_file)
+    results = reextract(store, "baidu", extract_address, workers)
+    changed = 0
+    for company, _query, (address, selector) in results:
+        old = previous.get(company)
+        if old is None or old["address"] != address:
+            changed += 1
+            print(f"{company}: {old['address'] if old else None} --> {address}")
+        journal.append(company, address, "ok" if selector else "not_found", selector)
+    return len(results), changed
+
+
+def print_throughput_report(stats):
+    print("\n============ WORKER THROUGHPUT ============")
+    total = 0
+    for worker_id in sorted(stats):
+        worker_stats = stats[worker_id]
+        elapsed = (worker_stats["finished"] or time.time()) - worker_stats["started"]
+        rate = worker_stats["processed"] / elapsed * 60 if elapsed > 0 else 0.0
+        total += worker_stats["processed"]
+        print(f"Worker {worker_id}: {worker_stats['processed']} companies, {worker_stats['errors']} errors, "
+              f"{worker_stats['blocks']} blocks, "
+              f"{elapsed:.0f} s, {rate:.1f} companies/min")
+    print(f"Total: {total} companies")
+
+    network = PageMetrics()
+    for worker_stats in stats.values():
+        network.merge(worker_stats["network"])
+    network.report("Baidu pages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape Shandong chemical plant addresses from Baidu.')
+    parser.add_argument('--workers', type=int, default=1, help='Number of parallel Chrome workers')
+    parser.add_argument('--page-wait', type=float, nargs=2, default=PAGE_WAIT, metavar=('MIN', 'MAX'),
+                        help='Seconds to wait for each results page to render')
+    parser.add_argument('--initial-rate', type=float, default=DEFAULT_INITIAL_RATE,
+                        help='Starting queries per minute for each worker')
+    parser.add_argument('--min-rate', type=float, default=DEFAULT_MIN_RATE,
+                        help='Slowest queries per minute a worker backs off to')
+    parser.add_argument('--max-rate', type=float, default=DEFAULT_MAX_RATE,
+                        help='Fastest queries per minute a worker ramps up to')
+    parser.add_argument('--compact-only', action='store_true',
+                        help=f'Only rebuild {OUTPUT_FILE} from the journal, without scraping')
+    parser.add_argument('--page-store', default=PAGE_STORE_DIR,
+                        help='Directory of the compressed results-page store')
+    parser.add_argument('--no-page-store', action='store_true',
+                        help='Do not keep results pages')
+    parser.add_argument('--reextract', action='store_true',
+                        help='Re-run address extraction over the stored pages (no browser), then compact')
+    parser.add_argument('--reextract-workers', type=int, default=None,
+                        help='Processes used by --reextract (default: CPU count)')
+    args = parser.parse_args()
+
+    # Load company names
+    companies = load_companies(INPUT_FILE)
+
+    if args.compact_only:
+        count = compact(JOURNAL_FILE, OUTPUT_FILE, companies)
+        print(f"Compacted {JOURNAL_FILE} into {OUTPUT_FILE} ({count} companies)")
+        return
+
+    store = None if args.no_page_store else PageStore(args.page_store)
+
+    if args.reextract:
+        if store is None:
+            parser.error("--reextract needs the page store")
+        journal = ResultJournal(JOURNAL_FILE)
+        try:
+            pages, changed = reextract_addresses(store, journal, args.reextract_workers)
+        finally:
+            journal.close()
+            store.close()
+        count = compact(JOURNAL_FILE, OUTPUT_FILE, companies)
+        print(f"Re-extracted {pages} stored pages ({changed} addresses changed). "
+              f"Saved {count} companies to {OUTPUT_FILE}")
+        return
+
+    # Determine where to resume from
+    existing_addresses = load_resume_state(JOURNAL_FILE, OUTPUT_FILE)
+
+    # Filter companies that haven't been processed yet
+    unprocessed_companies = [c for c in dict.fromkeys(companies) if c not in existing_addresses]
+    print(f"{len(unprocessed_companies)} companies to scrape with {args.workers} worker(s)")
+
+    work_queue = queue.Queue()
+    retry_queue = queue.Queue()
+    for company in unprocessed_companies:
+        work_queue.put((company, 0))
+
+    journal = ResultJournal(JOURNAL_FILE)
+    stats = {}
+    threads = []
+    for worker_id in range(args.workers):
+        controller = AdaptiveRateController(f"baidu worker {worker_id}", initial_rate=args.initial_rate,
+                                            min_rate=args.min_rate, max_rate=args.max_rate)
+        thread = threading.Thread(target=run_worker,
+                                  args=(worker_id, work_queue, retry_queue, journal, stats, controller,
+                                        args.page_wait, store))
+        thread.start()
+        threads.append(thread)
+        # Stagger start-up so workers do not hit Baidu in lockstep
+        time.sleep(random.uniform(0, controller.delay))
+
+    try:
+        # A worker that queues a retry keeps looping, so both queues are empty once all have joined
+        for thread in threads:
+            thread.join()
+    finally:
+        # Final write: compact the journal into addresses.csv
+        journal.close()
+        count = compact(JOURNAL_FILE, OUTPUT_FILE, companies)
+        if store is not None:
+            store.report()
+            store.close()
+
+    print_throughput_report(stats)
+    print(f"Scraping complete or interrupted. Saved {count} companies to {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
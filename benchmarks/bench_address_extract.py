@@ -0,0 +1,137 @@
+"""
+Micro-benchmark for the shared address extraction engine.
+
+Compares, over a corpus of page texts:
+  - the old Bing page scan: five re.findall passes plus the broad fallback
+  - the old generate_csv pattern lists, rebuilt inside the loop
+against address_extract (find_candidates' single anchor scan for the Bing
+page, best_address's best-kind-first search for generate_csv), and checks
+the results match.
+
+Pass --corpus DIR to use saved pages (*.html is reduced to text, *.txt is
+used as-is); otherwise a synthetic corpus is built from the company CSV.
+
+Usage: python benchmarks/bench_address_extract.py [--corpus DIR] [--pages 300] [--repeat 5]
+"""
+import argparse
+import csv
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from address_extract import ADDRESS_MARKERS, STRUCTURED_KINDS, SUFFIX_KINDS, best_address, find_candidates
+
+
+def legacy_bing_scan(page_text):
+    matches_found = []
+    for pattern in [
+        r"山东省[^\n\.。,，:：]{5,60}号",
+        r"山东省[^\n\.。,，:：]{5,60}路",
+        r"山东省[^\n\.。,，:：]{5,60}街",
+        r"山东省[^\n\.。,，:：]{5,60}工业园",
+        r"山东省[^\n\.。,，:：]{5,60}开发区"
+    ]:
+        matches_found.extend(re.findall(pattern, page_text))
+    if not matches_found:
+        for match in re.findall(r"(山东省[^，。\n]{10,100})", page_text):
+            if any(marker in match for marker in ADDRESS_MARKERS):
+                matches_found.append(match)
+    return matches_found
+
+
+def engine_bing_scan(page_text):
+    candidates = find_candidates(page_text, SUFFIX_KINDS + ('broad',))
+    specific = [c.text for c in candidates if c.kind != 'broad']
+    if specific:
+        return specific
+    return [c.text for c in candidates if c.kind == 'broad' and any(m in c.text for m in ADDRESS_MARKERS)]
+
+
+def legacy_structured(text):
+    for pattern in [
+        r'(山东省[\w市县区]+[\w路街道]+\d+号)',
+        r'(山东省[\w市县区]+经济技术开发区[\w路街道]+\d+号)',
+        r'(山东省[\w市县区]+[\w路街道]+[\w大厦])',
+        r'(山东省[\w市县区]+[\w路街道]+)',
+    ]:
+        address_match = re.search(pattern, text)
+        if address_match:
+            return address_match.group(1)
+    return None
+
+
+def load_corpus(corpus_dir):
+    from bs4 import BeautifulSoup
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*'))):
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        if path.endswith(('.html', '.htm')):
+            content = BeautifulSoup(content, 'html.parser').get_text('\n')
+        pages.append(content)
+    return pages
+
+
+def synthetic_corpus(pages, address_rate=0.3, seed=0):
+    """
+    Search-result-like pages: navigation boilerplate plus 10-15 results whose
+    snippets mention an address with probability address_rate.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(ROOT, 'shandong_chemical_companies.csv'), encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    boilerplate = "网页 资讯 视频 图片 知道 文库 贴吧 地图 采购 更多 设置 登录 " * 40
+    snippet = "公司主营化工产品的生产与销售，产品广泛应用于农业、医药、纺织等领域，欢迎来电咨询。Products catalogue and news. " * 3
+    corpus = []
+    for _ in range(pages):
+        parts = [boilerplate]
+        for _ in range(rng.randint(10, 15)):
+            row = rng.choice(rows)
+            parts.append(f"\n{row['Chinese Name']} - 官网\n{snippet}")
+            if rng.random() < address_rate:
+                address = row['Address'] if row['Address'].startswith('山东省') else '山东省' + row['Address']
+                parts.append(f"地址：{address}，电话：0531-{rng.randint(1000000, 9999999)}")
+            if rng.random() < 0.2:
+                parts.append("位于山东省的化工园区")
+        parts.append(boilerplate)
+        corpus.append("".join(parts))
+    return corpus
+
+
+def timed(func, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [func(page) for page in pages]
+    return (time.perf_counter() - start) / repeat, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark legacy regex scans vs the shared extraction engine.')
+    parser.add_argument('--corpus', help='Directory of saved result pages')
+    parser.add_argument('--pages', type=int, default=300, help='Synthetic pages when no corpus is given')
+    parser.add_argument('--address-rate', type=float, default=0.3,
+                        help='Share of synthetic results whose snippet contains an address')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.pages, args.address_rate)
+    size = sum(len(page) for page in pages)
+    print(f"Corpus: {len(pages)} pages, {size / 1e6:.1f} M characters")
+
+    for label, legacy, engine in (
+        ("Bing page scan", legacy_bing_scan, engine_bing_scan),
+        ("generate_csv structured", legacy_structured, lambda text: best_address(text, STRUCTURED_KINDS)),
+    ):
+        legacy_time, legacy_results = timed(legacy, pages, args.repeat)
+        engine_time, engine_results = timed(engine, pages, args.repeat)
+        print(f"{label}: legacy {legacy_time * 1000:.1f} ms, engine {engine_time * 1000:.1f} ms, "
+              f"speedup {legacy_time / engine_time:.1f}x, identical {legacy_results == engine_results}")
+
+
+if __name__ == '__main__':
+    main()
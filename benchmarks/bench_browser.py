@@ -0,0 +1,75 @@
+"""
+Benchmark for the lean Chrome profile in browser.py.
+
+Loads the same URLs with the lean profile (images/media/fonts blocked,
+eager page load) and with a default profile (nothing blocked, normal page
+load), and reports per-page load time, bytes transferred and the resident
+memory of the Chrome process tree (needs psutil; skipped otherwise).
+
+Needs Chrome and network access.
+
+Usage: python benchmarks/bench_browser.py [--url URL ...] [--repeat 2]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from browser import create_driver, load_page, quit_driver
+
+DEFAULT_URLS = [
+    "https://www.baidu.com/s?wd=万华化学集团股份有限公司 山东工厂 地址",
+    "https://www.bing.com/search?q=万华化学集团股份有限公司 山东 工厂地址&setlang=zh-CN",
+    "http://zctpt.com/chem/13818.html",
+]
+
+
+def chrome_memory(driver):
+    """Resident memory in MiB of chromedriver and every Chrome process under it, or None."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        return sum(process.memory_info().rss for process in processes) / 1024 / 1024
+    except psutil.Error:
+        return None
+
+
+def run_profile(label, urls, repeat, **driver_args):
+    driver = create_driver(**driver_args)
+    memory = None
+    try:
+        for _ in range(repeat):
+            for url in urls:
+                load_page(driver, url)
+        memory = chrome_memory(driver)
+    finally:
+        metrics = quit_driver(driver)
+    metrics.report(label)
+    if memory is not None:
+        print(f"{label}: Chrome process tree {memory:.0f} MiB resident")
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", action="append", help="URL to load (repeatable)")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+    urls = args.url or DEFAULT_URLS
+
+    default = run_profile("default profile", urls, args.repeat, block_resources=False, page_load_strategy="normal")
+    lean = run_profile("lean profile", urls, args.repeat)
+    if default.pages and lean.pages:
+        default_time = sum(default.load_times) / default.pages
+        lean_time = sum(lean.load_times) / lean.pages
+        print(f"Lean profile: {lean_time / default_time * 100:.0f}% of the default load time, "
+              f"{lean.bytes / max(1, default.bytes) * 100:.0f}% of the bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark streaming top-N extraction from a CSV against the full-sort path.
+
+stream_top_n is the CSV extraction path sort_enhance used before the typed
+store (company_store.load_top_n); it is kept here as the baseline for
+bench_store.
+
+Builds a synthetic company CSV by resampling shandong_chemical_companies.csv,
+then compares peak traced memory and wall time of
+  - the full path: read_csv + sort_values + head
+  - stream_top_n: chunked read + heap selection
+and checks that both select the same rows in the same order.
+
+Usage: python benchmarks/bench_extract.py [--rows 1000000] [--key 'Opening Year' --ascending]
+"""
+import argparse
+import heapq
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Rows per chunk when stream_top_n ranks a CSV
+EXTRACT_CHUNKSIZE = 100000
+
+
+def _combine_dtypes(a, b):
+    """Dtype pandas would infer for a column whose chunks were inferred as a and b."""
+    if a == b:
+        return a
+    numeric_a = pd.api.types.is_numeric_dtype(a) and not pd.api.types.is_bool_dtype(a)
+    numeric_b = pd.api.types.is_numeric_dtype(b) and not pd.api.types.is_bool_dtype(b)
+    if numeric_a and numeric_b:
+        return np.result_type(a, b)
+    # An all-empty chunk parses as float64; a full read keeps the text dtype of the other chunks
+    if numeric_a and a.kind == 'f':
+        return b
+    if numeric_b and b.kind == 'f':
+        return a
+    return np.dtype(object)
+
+
+def stream_top_n(input_file, num_companies=200, sort_by='Registered Capital (RMB)', ascending=False,
+                 chunksize=EXTRACT_CHUNKSIZE):
+    """
+    Select the top N rows of a CSV by one column without loading the whole file.
+    
+    The file is read in chunks; each chunk is pre-filtered with a vectorized
+    nlargest/nsmallest and the survivors go through a bounded heap, so memory
+    stays at O(chunksize + num_companies). Ties are broken by file order (the
+    earlier row wins), which matches a stable full sort. Rows with a missing
+    key are only used to fill up the result, in file order, like na_position='last'.
+    
+    Parameters:
+    input_file (str): Path to the input CSV file
+    num_companies (int): Number of rows to keep
+    sort_by (str): Ranking column, e.g. 'Registered Capital (RMB)' or 'Opening Year'
+    ascending (bool): Keep the smallest values instead of the largest
+    chunksize (int): Rows read per chunk
+    
+    Returns:
+    DataFrame: The selected rows in ranked order, indexed by their original row number
+    """
+    heap = []        # (rank key, -row number, row values); smallest key is evicted first
+    nan_rows = []    # first num_companies rows whose key is missing
+    columns = None
+    column_dtypes = {}
+    
+    for chunk in pd.read_csv(input_file, chunksize=chunksize):
+        if sort_by not in chunk.columns:
+            raise KeyError(sort_by)
+        if columns is None:
+            columns = list(chunk.columns)
+        
+        # Track the dtype a full read would have inferred for every column
+        for col, dtype in chunk.dtypes.items():
+            column_dtypes[col] = _combine_dtypes(column_dtypes[col], dtype) if col in column_dtypes else dtype
+        
+        keys = pd.to_numeric(chunk[sort_by], errors='coerce')
+        missing = keys.isna()
+        if len(nan_rows) < num_companies and missing.any():
+            for row_number, row in zip(chunk.index[missing], chunk[missing].itertuples(index=False)):
+                if len(nan_rows) >= num_companies:
+                    break
+                nan_rows.append((row_number, tuple(row)))
+        
+        keys = keys[~missing]
+        candidates = keys.nsmallest(num_companies, keep='first') if ascending else keys.nlargest(num_companies, keep='first')
+        rows = chunk.loc[candidates.index]
+        for row_number, key, row in zip(candidates.index, candidates.values, rows.itertuples(index=False)):
+            item = ((-key if ascending else key), -row_number, tuple(row))
+            if len(heap) < num_companies:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+    
+    if columns is None:
+        return pd.DataFrame()
+    
+    ranked = sorted(heap, key=lambda item: (item[0], item[1]), reverse=True)
+    selected = [(-row_number, row) for _key, row_number, row in ranked]
+    selected += nan_rows[:num_companies - len(selected)]
+    
+    result = pd.DataFrame([row for _row_number, row in selected], columns=columns,
+                          index=[row_number for row_number, _row in selected])
+    return result.astype({col: dtype for col, dtype in column_dtypes.items() if result[col].dtype != dtype})
+
+
+def build_synthetic_csv(path, rows, seed=0):
+    source = pd.read_csv(os.path.join(ROOT, 'shandong_chemical_companies.csv'))
+    rng = np.random.default_rng(seed)
+    sample = source.iloc[rng.integers(0, len(source), rows)].reset_index(drop=True)
+    # Jitter capital so values are mostly distinct but keep plenty of exact ties
+    jitter = rng.integers(0, 3, rows) * 1000000
+    sample['Registered Capital (RMB)'] = sample['Registered Capital (RMB)'] + jitter
+    sample.to_csv(path, index=False)
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming top-N vs full sort.')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--top', type=int, default=200)
+    parser.add_argument('--key', default='Registered Capital (RMB)')
+    parser.add_argument('--ascending', action='store_true')
+    parser.add_argument('--chunksize', type=int, default=EXTRACT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'companies.csv')
+        print(f"Building synthetic CSV with {args.rows} rows...")
+        build_synthetic_csv(path, args.rows)
+        print(f"File size: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        full, full_time, full_peak = measure(
+            lambda: pd.read_csv(path).sort_values(by=args.key, ascending=args.ascending, kind='stable').head(args.top))
+        streamed, stream_time, stream_peak = measure(
+            lambda: stream_top_n(path, args.top, sort_by=args.key, ascending=args.ascending, chunksize=args.chunksize))
+
+    print(f"Full sort:    {full_time:6.2f} s, peak {full_peak / 1e6:7.1f} MB")
+    print(f"Stream top-N: {stream_time:6.2f} s, peak {stream_peak / 1e6:7.1f} MB (chunksize {args.chunksize})")
+    print(f"Identical output: {full.equals(streamed)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark the offline gazetteer geocoder on the scraped company addresses:
+how many addresses it resolves (by precision), how many still need the
+Geocoding API, and how fast the trie lookup runs.
+
+Usage: python benchmarks/bench_gazetteer.py [--repeat 20]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from gazetteer import Gazetteer, geocode_offline, needs_street_level
+
+
+def load_addresses(filename):
+    with open(os.path.join(ROOT, filename), encoding='utf-8-sig') as f:
+        return [row['Address'].strip() for row in csv.DictReader(f) if row['Address'].strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the offline gazetteer geocoder.')
+    parser.add_argument('--input', default='shandong_chemical_companies.csv')
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the address list for the timing')
+    args = parser.parse_args()
+
+    addresses = load_addresses(args.input)
+
+    start = time.perf_counter()
+    gazetteer = Gazetteer()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for address in addresses:
+            gazetteer.resolve(address)
+    elapsed = time.perf_counter() - start
+
+    resolved = geocode_offline(addresses, gazetteer)
+    street = sum(needs_street_level(address) for address in dict.fromkeys(addresses))
+    towns = sum(not needs_street_level(address) and gazetteer.names_unplaced_town(address)
+                for address in dict.fromkeys(addresses))
+    unique = len(set(addresses))
+    precisions = Counter(match.precision for match in resolved.values())
+
+    print(f"Gazetteer built in {build_time * 1000:.1f} ms")
+    print(f"Addresses: {len(addresses)} ({unique} unique), {street} need street-level accuracy, "
+          f"{towns} more name a town without a bundled centroid")
+    print(f"Throughput: {len(addresses) * args.repeat / elapsed:,.0f} addresses/s")
+    print(f"Resolved offline: {len(resolved)} ({', '.join(f'{n} {p}' for p, n in precisions.most_common())})")
+    print(f"Geocoding API calls: {unique - len(resolved)} instead of {unique} "
+          f"({len(resolved) / unique * 100:.1f}% saved)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark for generate_csv's streaming section parser.
+
+Writes a synthetic Bing address dump in the format bing-web-scrape.py
+produces, then converts it to CSV twice, each in a fresh subprocess:
+  - legacy: read the whole file, re.split on divider lines, build a list
+  - streaming: parse_addresses_file generator feeding write_csv
+and reports wall time and peak RSS for both, and checks the CSVs match.
+
+Usage: python benchmarks/bench_generate_csv.py [--companies 1000000] [--keep DIR]
+"""
+import argparse
+import filecmp
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CITIES = ["济南市", "青岛市", "淄博市", "烟台市", "潍坊市", "东营市", "滨州市", "聊城市"]
+DISTRICTS = ["临淄区", "垦利区", "高新区", "经济技术开发区", "寿光市", "邹平市"]
+ROADS = ["黄河路", "泰山路", "化工大道", "北海路", "胶厂南路"]
+
+
+def write_dump(path, companies, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Shandong Chemical Company Addresses\n")
+        f.write("==================================\n\n")
+        for i in range(companies):
+            f.write(f"山东测试{i}化工有限公司:\n")
+            style = rng.random()
+            if style < 0.1:
+                f.write("  No address found.\n")
+            else:
+                address = f"山东省{rng.choice(CITIES)}{rng.choice(DISTRICTS)}{rng.choice(ROADS)}{rng.randint(1, 999)}号"
+                if style < 0.3:
+                    primary = f"公司位于{address}，交通便利"
+                    source = "Bing Featured Snippet"
+                else:
+                    primary, source = address, "Page Text Regex"
+                f.write(f"  Primary Address: {primary}\n")
+                f.write(f"  Source: {source}\n\n")
+                f.write("  All potential address matches:\n")
+                for n in range(1, rng.randint(2, 4)):
+                    f.write(f"    {n}. {address}\n")
+                    f.write(f"       Source: {source}\n")
+            f.write("\n" + "-" * 50 + "\n\n")
+
+
+def legacy_parse(file_path):
+    from generate_csv import extract_best_address, get_main_products, translate_company_name
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    company_sections = re.split(r'\n-{10,}\n', content)
+    companies = []
+    for section in company_sections:
+        if not section.strip() or "Shandong Chemical Company Addresses" in section:
+            continue
+        company_match = re.match(r'([^:]+):', section.strip())
+        if not company_match:
+            continue
+        company_name = company_match.group(1).strip()
+        companies.append({
+            'chinese_name': company_name,
+            'english_name': translate_company_name(company_name),
+            'address': extract_best_address(section),
+            'latitude': '',
+            'longitude': '',
+            'main_products': get_main_products(company_name)
+        })
+    return companies
+
+
+def run_child(mode, input_file, output_file):
+    from generate_csv import parse_addresses_file, write_csv
+    companies = legacy_parse(input_file) if mode == "legacy" else parse_addresses_file(input_file)
+    count = write_csv(companies, output_file)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{count} {peak:.1f}")
+
+
+def measure(mode, input_file, output_file):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, __file__, "--child", mode, input_file, output_file],
+                         check=True, capture_output=True, text=True).stdout.split()
+    elapsed = time.perf_counter() - start
+    count, peak = int(out[0]), float(out[1])
+    print(f"{mode:10s} {elapsed:7.1f} s  peak RSS {peak:7.1f} MiB  {count} companies "
+          f"({count / elapsed:,.0f}/s)")
+    return count
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run_child(*sys.argv[2:5])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--companies", type=int, default=1000000)
+    parser.add_argument("--keep", help="Write the dump and CSVs here instead of a temp dir")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.keep or tmp
+        os.makedirs(directory, exist_ok=True)
+        dump = os.path.join(directory, "addresses_dump.txt")
+        start = time.perf_counter()
+        write_dump(dump, args.companies)
+        print(f"Dump: {args.companies} companies, {os.path.getsize(dump) / 1024 / 1024:.0f} MiB "
+              f"(written in {time.perf_counter() - start:.1f} s)")
+
+        legacy_csv = os.path.join(directory, "legacy.csv")
+        streaming_csv = os.path.join(directory, "streaming.csv")
+        measure("legacy", dump, legacy_csv)
+        measure("streaming", dump, streaming_csv)
+        if not filecmp.cmp(legacy_csv, streaming_csv, shallow=False):
+            print("MISMATCH: streaming CSV differs from legacy CSV")
+            sys.exit(1)
+        print("CSV outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
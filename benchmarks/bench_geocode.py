@@ -0,0 +1,95 @@
+"""
+Benchmark the concurrent GeocodingEngine against the serial get_lat_long loop.
+
+Both paths hit a local stub of the Google Geocoding API that answers after a
+fixed latency and returns OVER_QUERY_LIMIT for a fraction of requests.
+
+Usage: python benchmarks/bench_geocode.py [--addresses 200] [--latency 0.15]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geocoding import GeocodingEngine
+
+
+def make_stub_handler(latency, over_limit_rate):
+    class StubGeocodeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_GET(self):
+            time.sleep(latency)
+            address = parse_qs(urlparse(self.path).query).get('address', [''])[0]
+            if random.random() < over_limit_rate:
+                payload = {'status': 'OVER_QUERY_LIMIT', 'results': []}
+            else:
+                seed = sum(map(ord, address))
+                payload = {
+                    'status': 'OK',
+                    'results': [{'geometry': {'location': {'lat': 34 + seed % 300 / 100, 'lng': 115 + seed % 500 / 100}}}]
+                }
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubGeocodeHandler
+
+
+def serial_baseline(base_url, addresses, delay):
+    """Reproduce the original loop: one fresh requests.get per row, then a fixed sleep."""
+    for address in addresses:
+        response = requests.get(base_url, params={'address': address, 'key': 'stub'})
+        response.json()
+        time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serial vs concurrent geocoding against a local stub server.')
+    parser.add_argument('--addresses', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.15, help='Simulated API round-trip latency in seconds')
+    parser.add_argument('--over-limit-rate', type=float, default=0.02)
+    parser.add_argument('--rps', type=float, default=40)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_stub_handler(args.latency, args.over_limit_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/maps/api/geocode/json"
+    addresses = [f"山东省测试市工业园区{i}号" for i in range(args.addresses)]
+
+    start = time.perf_counter()
+    serial_baseline(base_url, addresses, delay=0.1)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with GeocodingEngine('stub', requests_per_second=args.rps, max_workers=args.workers,
+                         backoff=0.05, base_url=base_url) as engine:
+        results = engine.geocode_many(addresses, progress_every=0)
+    engine_time = time.perf_counter() - start
+    server.shutdown()
+
+    resolved = sum(1 for lat, _lon, _status in results.values() if lat is not None)
+    print(f"Addresses: {args.addresses}, latency: {args.latency * 1000:.0f} ms")
+    print(f"Serial get_lat_long loop: {serial_time:.2f} s ({args.addresses / serial_time:.1f} addr/s)")
+    print(f"GeocodingEngine ({args.workers} workers, {args.rps:g} rps): {engine_time:.2f} s "
+          f"({args.addresses / engine_time:.1f} addr/s), resolved {resolved}/{args.addresses}")
+    print(f"Speedup: {serial_time / engine_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark the glossary translator: segmentation throughput, how much of each
+name the glossary covers, and how many names and backend calls still reach
+the network translator compared with sending every name.
+
+Brand segments are romanized in pinyin when pypinyin is installed. Names
+translated completely offline are also checked against the English names
+already in 200_largest_chemical_plants.csv.
+
+Usage: python benchmarks/bench_glossary.py [--repeat 20]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from glossary import GlossaryTranslator
+from translation import DEFAULT_BATCH_SIZE
+
+
+def load_column(filename, column):
+    with open(os.path.join(ROOT, filename), encoding='utf-8-sig') as f:
+        return [row[column] for row in csv.DictReader(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark longest-match glossary translation.')
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the name list for the timing')
+    args = parser.parse_args()
+
+    names = [name for name in load_column('shandong_chemical_companies.csv', 'Chinese Name') if name]
+    unique = list(dict.fromkeys(names))
+
+    start = time.perf_counter()
+    translator = GlossaryTranslator()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for name in names:
+            translator.translate(name)
+    elapsed = time.perf_counter() - start
+
+    covered = total = 0
+    for name in unique:
+        unmatched = sum(len(text) for text, english in translator.segment(name) if english is None)
+        total += len(name)
+        covered += len(name) - unmatched
+    offline = sum(map(translator.covers, unique))
+    network = len(unique) - offline
+    calls = -(-network // DEFAULT_BATCH_SIZE)
+    baseline_calls = -(-len(unique) // DEFAULT_BATCH_SIZE)
+
+    print(f"Translator built in {build_time * 1000:.1f} ms (trie and pinyin dictionary); brand segments "
+          f"{'romanized in pinyin' if translator.pinyin else 'not romanized (pypinyin not installed)'}")
+    print(f"Names: {len(names)} ({len(unique)} unique)")
+    print(f"Throughput: {len(names) * args.repeat / elapsed:,.0f} names/s")
+    print(f"Characters covered by the glossary: {covered / total * 100:.1f}%")
+    print(f"Names translated fully offline: {offline} ({offline / len(unique) * 100:.1f}%)")
+    print(f"Names sent to the network translator: {network} of {len(unique)} "
+          f"({(1 - network / len(unique)) * 100:.1f}% fewer), {calls} instead of {baseline_calls} "
+          f"backend calls in batches of {DEFAULT_BATCH_SIZE}")
+
+    # Agreement with existing (network) translations where the glossary needs no network at all
+    reference = dict(zip(load_column('200_largest_chemical_plants.csv', 'Chinese Name'),
+                         load_column('200_largest_chemical_plants.csv', 'English Name')))
+    compared = agree = 0
+    for name, english in reference.items():
+        ours = translator.translate(name, keep_unmatched=False)
+        if ours is None or not english:
+            continue
+        compared += 1
+        agree += ours.lower() == english.strip().lower()
+    if compared:
+        print(f"Agreement with 200_largest_chemical_plants.csv: {agree}/{compared} fully offline names")
+
+
+if __name__ == '__main__':
+    main()
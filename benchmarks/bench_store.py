@@ -0,0 +1,109 @@
+"""
+Benchmark the typed Arrow store against CSV for the companies table scaled
+up to --rows rows: full load (read_csv with the schema applied vs the
+memory-mapped store), a one-column load, top-N extraction (bench_extract's
+stream_top_n on the CSV vs load_top_n on the store), file size and in-memory size.
+The first extraction from a CSV without a store (the chunked import plus
+load_top_n) is measured for peak RSS in a fresh subprocess, against
+stream_top_n and a whole-file read.
+
+Usage: python benchmarks/bench_store.py [--rows 1000000]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from company_schema import apply_schema
+from company_store import import_csv, load_table, load_top_n, save_table, store_path
+from bench_extract import stream_top_n
+
+CAPITAL = 'Registered Capital (RMB)'
+
+# Run in a fresh interpreter so each path's peak RSS is its own (VmHWM, unlike ru_maxrss,
+# is not inherited from the forked benchmark process)
+PEAK_RSS_SCRIPT = """
+import re, sys
+sys.path[:0] = {paths!r}
+{setup}
+{statement}
+with open('/proc/self/status') as f:
+    print(int(re.search(r'VmHWM:\\s+(\\d+)', f.read()).group(1)) / 1024)
+"""
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def peak_rss(setup, statement):
+    """Peak RSS in MB of running statement in a fresh interpreter."""
+    script = PEAK_RSS_SCRIPT.format(paths=[ROOT, os.path.dirname(os.path.abspath(__file__))],
+                                    setup=setup, statement=statement)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return float(output.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Arrow company store against CSV.')
+    parser.add_argument('--input', default='shandong_chemical_companies.csv')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--top', type=int, default=200)
+    args = parser.parse_args()
+
+    source = import_csv(os.path.join(ROOT, args.input))
+    repeats = -(-args.rows // len(source))
+    df = pd.concat([source] * repeats, ignore_index=True).iloc[:args.rows]
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'companies.csv')
+        _, save_time = timed(lambda: save_table(df, path))
+
+        csv_df, csv_time = timed(lambda: apply_schema(pd.read_csv(path)))
+        store_df, store_time = timed(lambda: load_table(path))
+        assert len(csv_df) == len(store_df) == len(df)
+        _, column_csv_time = timed(lambda: pd.read_csv(path, usecols=[CAPITAL]))
+        _, column_store_time = timed(lambda: load_table(path, columns=[CAPITAL]))
+
+        streamed, stream_time = timed(lambda: stream_top_n(path, args.top))
+        top, top_time = timed(lambda: load_top_n(path, args.top, CAPITAL))
+        assert top.index.equals(streamed.index), "load_top_n picked different rows than stream_top_n"
+
+        cold_path = os.path.join(directory, 'cold.csv')
+        shutil.copy(path, cold_path)
+        setup = f"path = {cold_path!r}"
+        stream_rss = peak_rss(setup + "\nfrom bench_extract import stream_top_n",
+                              f"stream_top_n(path, {args.top})")
+        full_rss = peak_rss(setup + "\nfrom company_store import import_csv",
+                            f"import_csv(path).sort_values({CAPITAL!r}, ascending=False).head({args.top})")
+        cold_rss = peak_rss(setup + "\nfrom company_store import load_top_n",
+                            f"load_top_n(path, {args.top}, {CAPITAL!r})")
+
+        csv_size = os.path.getsize(path)
+        store_size = os.path.getsize(store_path(path))
+        print(f"Rows: {len(df)} (saved in {save_time:.1f} s)")
+        print(f"Full load:       CSV + schema {csv_time:6.2f} s   store {store_time:6.3f} s ({csv_time / store_time:.0f}x)")
+        print(f"Capital column:  CSV          {column_csv_time:6.2f} s   store {column_store_time:6.3f} s")
+        print(f"Top {args.top}:         stream_top_n {stream_time:6.2f} s   load_top_n {top_time:6.3f} s "
+              f"({stream_time / top_time:.0f}x)")
+        print(f"First top {args.top} from a CSV without a store, peak RSS: chunked import + load_top_n "
+              f"{cold_rss:.0f} MB, stream_top_n {stream_rss:.0f} MB, whole-file read {full_rss:.0f} MB")
+        print(f"File size:       CSV {csv_size / 1e6:.0f} MB, store {store_size / 1e6:.0f} MB")
+        print(f"In memory:       {store_df.memory_usage(deep=True).sum() / 1e6:.0f} MB "
+              f"(City/County as categories: {store_df[['City', 'County']].memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark the batched, cached translation pipeline against the per-row loop.
+
+Uses FakeTranslatorBackend so no network is involved; --latency simulates one
+translator round trip and --row-delay the fixed sleep of the old per-row loop.
+
+Usage: python benchmarks/bench_translate.py [--latency 0.2] [--row-delay 0.5] [--rows 300]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from translation import FakeTranslatorBackend, TranslationCache, translate_texts
+
+
+def load_names(limit):
+    with open(os.path.join(ROOT, 'shandong_chemical_companies.csv'), encoding='utf-8-sig') as f:
+        names = [row['Chinese Name'] for row in csv.DictReader(f)]
+    return names[:limit] if limit else names
+
+
+def per_row_baseline(names, backend, row_delay):
+    """Reproduce the original loop: one backend call per row, then a fixed sleep."""
+    translations = []
+    for name in names:
+        translations.append(backend.translate_batch([name])[0])
+        time.sleep(row_delay)
+    return translations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-row vs batched/cached translation.')
+    parser.add_argument('--rows', type=int, default=300, help='Number of names to translate (0 = all)')
+    parser.add_argument('--latency', type=float, default=0.2, help='Simulated seconds per translator call')
+    parser.add_argument('--row-delay', type=float, default=0.5, help='Per-row sleep of the old loop')
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    names = load_names(args.rows)
+
+    baseline_backend = FakeTranslatorBackend(latency=args.latency)
+    start = time.perf_counter()
+    per_row_baseline(names, baseline_backend, args.row_delay)
+    baseline_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranslationCache(os.path.join(tmp, 'translation_cache.sqlite'))
+        backend = FakeTranslatorBackend(latency=args.latency)
+
+        start = time.perf_counter()
+        translate_texts(names, backend, cache=cache, batch_size=args.batch_size, batch_delay=args.row_delay)
+        cold_time = time.perf_counter() - start
+        cold_calls = backend.calls
+
+        start = time.perf_counter()
+        translate_texts(names, backend, cache=cache, batch_size=args.batch_size, batch_delay=args.row_delay)
+        warm_time = time.perf_counter() - start
+        cache.close()
+
+    print(f"Names: {len(names)} ({len(set(names))} unique)")
+    print(f"Per-row loop:          {baseline_time:7.2f} s, {baseline_backend.calls} backend calls")
+    print(f"Batched, cold cache:   {cold_time:7.2f} s, {cold_calls} backend calls")
+    print(f"Batched, warm cache:   {warm_time:7.2f} s, {backend.calls - cold_calls} backend calls")
+    print(f"Speedup (cold): {baseline_time / cold_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark for zcw_crawl against a local HTTP server.
+
+Serves a directory of saved pages (--site DIR, laid out like the site, e.g.
+DIR/chem/13818.html) with http.server and crawls it. Without --site, a
+synthetic site is generated: a listing page linking to articles that each
+hold an overlapping slice of shandong_chemical_companies.csv. The merged
+output is then checked against the CSV's unique company names.
+
+Usage: python benchmarks/bench_zcw_crawl.py [--site DIR] [--articles 40] [--workers 8] [--backend lxml]
+"""
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_zcw_parse import build_page, load_rows
+from page_fetch import StaticFetcher
+from zcw_crawl import crawl, merge_companies, print_crawl_report
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def build_site(directory, rows, articles):
+    """Listing page plus articles with overlapping slices of the company rows."""
+    chem = os.path.join(directory, "chem")
+    os.makedirs(chem, exist_ok=True)
+    size = max(1, len(rows) // articles)
+    links = []
+    for i in range(articles):
+        # Each article repeats the last 10 companies of the previous one
+        chunk = rows[max(0, i * size - 10):(i + 1) * size if i < articles - 1 else len(rows)]
+        page = build_page(chunk, 1, seed=i)
+        related = f'<a href="/chem/{20000 + (i + 1) % articles}.html">下一篇</a>'
+        with open(os.path.join(chem, f"{20000 + i}.html"), "w", encoding="utf-8") as f:
+            f.write(page.replace("</body>", related + "</body>"))
+        links.append(f'<li><a href="/chem/{20000 + i}.html">化工企业名单 {i}</a></li>')
+    with open(os.path.join(chem, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"<html><body><ul>{''.join(links)}</ul></body></html>")
+    return "/chem/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--site", help="Directory of saved pages to serve")
+    parser.add_argument("--seed-path", default="/chem/13818.html", help="Seed path when --site is given")
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=8)
+    parser.add_argument("--host-delay", type=float, default=0.0)
+    parser.add_argument("--backend", choices=["html.parser", "lxml"], default="lxml")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = None
+        if args.site:
+            directory, seed_path = args.site, args.seed_path
+        else:
+            rows = load_rows()
+            directory, seed_path = tmp, build_site(tmp, rows, args.articles)
+
+        handler = functools.partial(QuietHandler, directory=directory)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        seed = f"http://127.0.0.1:{server.server_port}{seed_path}"
+        try:
+            with StaticFetcher(pool_size=args.workers) as fetcher:
+                pages, stats = crawl([seed], fetcher, workers=args.workers, per_host=args.per_host,
+                                     host_delay=args.host_delay, backend=args.backend)
+        finally:
+            server.shutdown()
+
+    companies, duplicates = merge_companies(pages)
+    print_crawl_report(stats, len(companies), duplicates)
+    if rows is not None:
+        expected = list(dict.fromkeys(row["Chinese Name"] for row in rows))
+        if [company["Chinese Name"] for company in companies] != expected:
+            print("MISMATCH: merged companies differ from shandong_chemical_companies.csv")
+            sys.exit(1)
+        print("Merged dataset matches the CSV's unique companies, in order")
+
+
+if __name__ == "__main__":
+    main()
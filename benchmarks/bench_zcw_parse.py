@@ -0,0 +1,159 @@
+"""
+Benchmark for the zcw_scrape article parser.
+
+Compares the old approach (serialize article_content, regex-split on
+<br><br>, re-parse every block with BeautifulSoup) against the single walk
+over the parsed tree, with both the html.parser and lxml backends, and checks
+that all three produce the same rows.
+
+Pass --page to use a saved copy of the article page. Otherwise a synthetic
+page is rebuilt from shandong_chemical_companies.csv (with nested tags,
+comments and extra <br>s mixed in), and the parsed rows are also checked
+against the CSV row for row.
+
+Usage: python benchmarks/bench_zcw_parse.py [--page saved.html] [--copies 1] [--repeat 5]
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from zcw_scrape import FIELDNAMES, parse_companies, parse_company_block
+
+COMPANIES_CSV = os.path.join(ROOT, "shandong_chemical_companies.csv")
+
+
+def legacy_parse(html):
+    soup = BeautifulSoup(html, "html.parser")
+    content_div = soup.find("div", class_="article_content")
+    raw_html = content_div.decode_contents()
+    blocks = re.split(r'<br\s*/?>\s*<br\s*/?>', raw_html)
+    companies = []
+    for block in blocks:
+        text = ' '.join(BeautifulSoup(block, 'html.parser').stripped_strings)
+        company = parse_company_block(text)
+        if company:
+            companies.append(company)
+    return companies
+
+
+def load_rows():
+    with open(COMPANIES_CSV, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def capital_text(capital):
+    """万元 figure that converts back to exactly this RMB value."""
+    for digits in range(4, 9):
+        text = f"{int(capital) / 10000:.{digits}f}".rstrip("0").rstrip(".")
+        if str(int(float(text) * 10000)) == capital:
+            return text
+    return None
+
+
+def company_block(row, rng):
+    lines = [f"{row['Chinese Name']}"]
+    lines.append(f"法定代表人（董事长、总经理）：{rng.choice(['张伟', '王芳', '李强'])} ")
+    if row["Registered Capital (RMB)"]:
+        lines.append(f"注册资本：{capital_text(row['Registered Capital (RMB)'])}万人民币元")
+    if row["Opening Year"]:
+        lines.append(f"成立时间：{row['Opening Year']}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}")
+    lines.append(f"联系电话：0{rng.randint(530, 546)}-{rng.randint(1000000, 9999999)}")
+    lines.append(f"公司地址：{row['Address']}")
+    # Vary the markup the way CMS articles do
+    style = rng.random()
+    if style < 0.2:
+        lines[0] = f"<strong>{lines[0]}</strong>"
+    elif style < 0.3:
+        lines[-1] = f"<span style=\"color:#333\">{lines[-1]}</span><!-- addr -->"
+    elif style < 0.35:
+        lines[1] = f"{lines[1]}&nbsp;"
+    return "<br>\n".join(lines)
+
+
+def build_page(rows, copies, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(copies):
+        blocks.extend(company_block(row, rng) for row in rows)
+    separators = ["<br><br>", "<br/>\n<br/>", "<br />  <br />", "<br><br><br>"]
+    body = blocks[0]
+    for block in blocks[1:]:
+        body += rng.choice(separators) + "\n" + block
+    return ("<html><head><title>山东化工企业名单</title><script>var x = '<br><br>';</script></head>"
+            "<body><div class=\"nav\"><a href=\"/\">首页</a></div>"
+            f"<div class=\"article_content\"><p>{body}</p></div>"
+            "<div class=\"footer\">版权所有</div></body></html>")
+
+
+def expected_rows(rows, copies):
+    # The CSV leaves everything but these columns empty
+    expected = []
+    for _ in range(copies):
+        for row in rows:
+            expected.append({key: row[key] if key in ("Chinese Name", "Address", "Registered Capital (RMB)",
+                                                       "Opening Year") else "" for key in FIELDNAMES})
+    return expected
+
+
+def time_it(func, html, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(html)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page", help="Saved article page to parse instead of the synthetic one")
+    parser.add_argument("--copies", type=int, default=1, help="Repeat the synthetic company list this many times")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    expected = None
+    if args.page:
+        with open(args.page, encoding="utf-8") as f:
+            html = f.read()
+    else:
+        rows = load_rows()
+        html = build_page(rows, args.copies)
+        expected = expected_rows(rows, args.copies)
+    print(f"Page: {len(html) / 1024:.0f} KiB")
+
+    candidates = [
+        ("legacy re-parse", legacy_parse),
+        ("walk html.parser", lambda page: parse_companies(page, "html.parser")),
+        ("walk lxml", lambda page: parse_companies(page, "lxml")),
+    ]
+    results = {}
+    baseline = None
+    for name, func in candidates:
+        elapsed, companies = time_it(func, html, args.repeat)
+        results[name] = companies
+        baseline = baseline or elapsed
+        print(f"{name:18s} {elapsed * 1000:8.1f} ms  {len(companies)} companies  {baseline / elapsed:5.1f}x")
+
+    reference = results["legacy re-parse"]
+    for name, companies in results.items():
+        if companies != reference:
+            mismatches = sum(a != b for a, b in zip(companies, reference)) + abs(len(companies) - len(reference))
+            print(f"MISMATCH: {name} differs from legacy in {mismatches} rows")
+            sys.exit(1)
+    if expected is not None and reference != expected:
+        print("MISMATCH: parsed rows differ from shandong_chemical_companies.csv")
+        sys.exit(1)
+    print("All backends produce identical rows" + (" matching the CSV" if expected is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
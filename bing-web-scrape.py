@@ -1,39 +1,220 @@
+import argparse
+import os
 import time
-import random
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-import re
+from collections import deque
+from bs4 import BeautifulSoup
 
-def search_company_address_bing(driver, company_name):
+from address_extract import ADDRESS_MARKERS, SUFFIX_KINDS, find_candidates
+from browser import create_driver, load_page, quit_driver
+from page_store import PAGE_STORE_DIR, PageStore, reextract
+from pacing import AdaptiveRateController, detect_block
+
+OUTPUT_FILE = "shandong_chemical_addresses.txt"
+
+# Attempts per company before a blocked search is reported as not found
+MAX_ATTEMPTS = 3
+
+# Elements that may hold the AI answer / featured snippet
+SNIPPET_SELECTOR = "div.b_snippetBigText, div.b_caption, h2"
+
+# Ceiling for the snippet wait (the old fixed sleep), poll interval, and how many
+# identical consecutive polls count as "stable"
+SNIPPET_MAX_WAIT = 7
+SNIPPET_POLL_INTERVAL = 0.25
+SNIPPET_STABLE_POLLS = 2
+
+# Seconds the snippets must stay unchanged before a page without an address-like
+# snippet (the common no-answer page) is taken as fully rendered
+SNIPPET_SETTLE_TIME = 1.5
+
+# Elements that start a new line in rendered text (used when re-extracting stored pages)
+BLOCK_TAGS = ["address", "article", "br", "dd", "div", "dl", "dt", "h1", "h2", "h3", "h4", "h5", "h6",
+              "header", "footer", "li", "ol", "p", "section", "table", "td", "th", "tr", "ul"]
+
+
+class ScreenshotWriter:
+    """
+    Opt-in debug screenshots. The PNG is captured on the calling thread (the
+    driver is not thread-safe) and written to disk on a background thread.
+
+    Args:
+        directory (str): Where screenshots are saved
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def capture(self, driver, name):
+        png = driver.get_screenshot_as_png()
+        path = os.path.join(self.directory, f"{name}.png")
+        self.executor.submit(self._write, path, png)
+
+    @staticmethod
+    def _write(path, png):
+        with open(path, "wb") as f:
+            f.write(png)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def snippet_texts(driver):
+    """Current text of every snippet element, skipping ones that went stale mid-read."""
+    texts = []
+    for element in driver.find_elements(By.CSS_SELECTOR, SNIPPET_SELECTOR):
+        try:
+            texts.append(element.text.strip())
+        except Exception:
+            continue
+    return texts
+
+
+def wait_for_snippets(driver, max_wait=SNIPPET_MAX_WAIT, poll_interval=SNIPPET_POLL_INTERVAL,
+                      stable_polls=SNIPPET_STABLE_POLLS, settle_time=SNIPPET_SETTLE_TIME):
+    """
+    Poll the snippet elements until they stop changing, or until max_wait
+    seconds have passed. An address-like snippet counts as final after
+    stable_polls identical polls; without one, the snippets must stay
+    unchanged for settle_time seconds (an AI answer can still be rendering).
+    
+    Returns:
+        float: Seconds actually waited
+    """
+    start = time.monotonic()
+    previous = None
+    stable = 0
+    changed_at = start
+    while time.monotonic() - start < max_wait:
+        texts = snippet_texts(driver)
+        now = time.monotonic()
+        has_address = any("山东" in text and any(marker in text for marker in ADDRESS_MARKERS) for text in texts)
+        if texts == previous:
+            stable += 1
+        else:
+            stable = 0
+            changed_at = now
+        if has_address and stable >= stable_polls:
+            break
+        if stable and now - changed_at >= settle_time:
+            break
+        previous = texts
+        time.sleep(poll_interval)
+    return time.monotonic() - start
+
+def new_result(company_name):
+    return {
+        "company": company_name,
+        "address": None,
+        "source": None,
+        "all_matches": [],  # Store all potential address matches
+        "blocked": None,  # Block marker if Bing served a captcha / verification page
+        "timing": {"snippet_wait": 0.0, "total": 0.0}
+    }
+
+
+def match_snippets(result, texts):
+    """Take an address-like featured snippet (like in the screenshot) as the address."""
+    for text in texts:
+        if "山东" in text and any(marker in text for marker in ADDRESS_MARKERS):
+            result["address"] = text
+            result["source"] = "Bing Featured Snippet"
+            result["all_matches"].append({"text": text, "source": "Featured Snippet"})
+            print(f"Found in featured snippet: {text}")
+
+
+def match_page_text(result, page_text):
+    """Fall back to address patterns over the whole page text."""
+    # One scan of the page text for both the specific and the broad address patterns
+    candidates = find_candidates(page_text, SUFFIX_KINDS + ('broad',))
+    
+    # Specific patterns: 号 / 路 / 街 / 工业园 / 开发区, most specific first
+    for candidate in candidates:
+        if candidate.kind == 'broad':
+            continue
+        match = candidate.text
+        result["all_matches"].append({"text": match, "source": "Page Text Regex"})
+        print(f"Found potential address: {match}")
+        
+        # If we don't have an address yet, use the first match
+        if not result["address"] and len(match) < 200:
+            result["address"] = match
+            result["source"] = "Page Text Regex"
+    
+    # If still no match, try broader pattern
+    if not result["address"]:
+        for candidate in candidates:
+            match = candidate.text
+            if candidate.kind == 'broad' and any(marker in match for marker in ADDRESS_MARKERS):
+                result["all_matches"].append({"text": match, "source": "Broad Regex"})
+                if not result["address"]:
+                    result["address"] = match
+                    result["source"] = "Broad Regex"
+                    print(f"Found with broad pattern: {match}")
+
+
+def rendered_text(element):
+    """Approximate Selenium's .text for a parsed element: block elements start new lines."""
+    for tag in element.find_all(["script", "style", "noscript"]):
+        tag.decompose()
+    for tag in element.find_all(BLOCK_TAGS):
+        tag.insert_before("\n")
+        tag.insert_after("\n")
+    lines = (line.strip() for line in element.get_text().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def extract_from_html(page_source):
+    """
+    Offline extraction from a stored results page, with the same rules as the
+    live search. Snippet and page text come from the HTML instead of the browser.
+    """
+    soup = BeautifulSoup(page_source, "html.parser")
+    result = new_result(None)
+    result["blocked"] = detect_block(page_source)
+    if result["blocked"]:
+        return result
+    match_snippets(result, [rendered_text(element) for element in soup.select(SNIPPET_SELECTOR)])
+    if not result["address"]:
+        match_page_text(result, rendered_text(soup.body or soup))
+    return result
+
+
+def search_company_address_bing(driver, company_name, screenshots=None, max_wait=SNIPPET_MAX_WAIT, store=None):
     """
     Search for company address using Bing with Selenium to wait for AI-generated content
     
     Args:
         driver: Selenium WebDriver instance
         company_name (str): Name of the company
+        screenshots (ScreenshotWriter): Save debug screenshots when given
+        max_wait (float): Ceiling in seconds for the AI snippet wait
+        store (PageStore): Keep the results page for offline re-extraction when given
         
     Returns:
-        dict: Dictionary with address information and source
+        dict: Dictionary with address information, source and timing
     """
     # Format search query specifically for address in Shandong
     search_query = f"{company_name} 山东 工厂地址"
     
-    result = {
-        "company": company_name,
-        "address": None,
-        "source": None,
-        "all_matches": []  # Store all potential address matches
-    }
+    result = new_result(company_name)
+    start = time.monotonic()
     
     try:
         # Navigate to Bing search
-        driver.get(f"https://www.bing.com/search?q={search_query}&setlang=zh-CN")
+        load_page(driver, f"https://www.bing.com/search?q={search_query}&setlang=zh-CN")
+        
+        # Bail out early on a captcha page instead of waiting for results that never come
+        result["blocked"] = detect_block(driver.page_source)
+        if result["blocked"]:
+            print(f"Blocked while searching for {company_name}: {result['blocked']}")
+            return result
         
         # Wait for page to load and AI-generated content to appear
         WebDriverWait(driver, 10).until(
@@ -41,72 +222,129 @@ def search_company_address_bing(driver, company_name):
         )
         
         # Take a screenshot to debug if needed
-        driver.save_screenshot(f"{company_name}_search.png")
+        if screenshots:
+            screenshots.capture(driver, f"{company_name}_search")
         
-        # Additional wait for potentially dynamic content
-        time.sleep(7)  # Wait longer for AI-generated summary to appear
+        # Wait for the AI-generated summary to settle, up to the old fixed 7 s
+        result["timing"]["snippet_wait"] = wait_for_snippets(driver, max_wait)
         
         # Save a screenshot after waiting to see if content loaded
-        driver.save_screenshot(f"{company_name}_after_wait.png")
+        if screenshots:
+            screenshots.capture(driver, f"{company_name}_after_wait")
+        
+        if store is not None:
+            store.put("bing", search_query, company_name, driver.page_source)
         
         print(f"Looking for address for {company_name}...")
         
         # Try to find the address in the main AI snippet first
         try:
-            # Check for the featured snippet (like in the screenshot)
-            main_snippets = driver.find_elements(By.CSS_SELECTOR, "div.b_snippetBigText, div.b_caption, h2")
-            for snippet in main_snippets:
-                text = snippet.text.strip()
-                if "山东" in text and any(marker in text for marker in ["号", "路", "经济技术开发区", "工业园"]):
-                    result["address"] = text
-                    result["source"] = "Bing Featured Snippet"
-                    result["all_matches"].append({"text": text, "source": "Featured Snippet"})
-                    print(f"Found in featured snippet: {text}")
+            match_snippets(result, snippet_texts(driver))
         except Exception as e:
             print(f"Error finding featured snippet: {e}")
         
         # If no specific address found yet, get the entire page text
         if not result["address"]:
-            page_text = driver.find_element(By.TAG_NAME, "body").text
-            
-            # Look for specific address patterns in the entire page
-            address_patterns = [
-                r"山东省[^\n\.。,，:：]{5,60}号",
-                r"山东省[^\n\.。,，:：]{5,60}路",
-                r"山东省[^\n\.。,，:：]{5,60}街",
-                r"山东省[^\n\.。,，:：]{5,60}工业园",
-                r"山东省[^\n\.。,，:：]{5,60}开发区"
-            ]
-            
-            for pattern in address_patterns:
-                matches = re.findall(pattern, page_text)
-                for match in matches:
-                    result["all_matches"].append({"text": match, "source": "Page Text Regex"})
-                    print(f"Found potential address: {match}")
-                    
-                    # If we don't have an address yet, use the first match
-                    if not result["address"] and len(match) < 200:
-                        result["address"] = match
-                        result["source"] = "Page Text Regex"
-            
-            # If still no match, try broader pattern
-            if not result["address"]:
-                broad_pattern = r"(山东省[^，。\n]{10,100})"
-                matches = re.findall(broad_pattern, page_text)
-                for match in matches:
-                    if any(marker in match for marker in ["号", "路", "经济技术开发区", "工业园"]):
-                        result["all_matches"].append({"text": match, "source": "Broad Regex"})
-                        if not result["address"]:
-                            result["address"] = match
-                            result["source"] = "Broad Regex"
-                            print(f"Found with broad pattern: {match}")
+            match_page_text(result, driver.find_element(By.TAG_NAME, "body").text)
                 
     except Exception as e:
         print(f"Error searching for {company_name}: {str(e)}")
+        # A timeout waiting for b_algo is often a verification page
+        try:
+            result["blocked"] = detect_block(driver.page_source)
+        except Exception:
+            pass
     
+    result["timing"]["total"] = time.monotonic() - start
     return result
 
+
+def print_timing_report(results, max_wait=SNIPPET_MAX_WAIT):
+    """Per-company latency, and the time saved against the old fixed sleep."""
+    print("\n============ TIMING ============")
+    total_saved = 0.0
+    for result in results:
+        timing = result["timing"]
+        saved = max(0.0, max_wait - timing["snippet_wait"])
+        total_saved += saved
+        print(f"{result['company']}: {timing['total']:.1f} s total, "
+              f"snippet wait {timing['snippet_wait']:.1f} s, saved {saved:.1f} s")
+    if results:
+        print(f"Saved {total_saved:.1f} s overall ({total_saved / len(results):.1f} s per company)")
+
+def print_summary(results):
+    print("\n============ SUMMARY ============")
+    for result in results:
+        print(f"\n{result['company']}:")
+        if result["address"]:
+            print(f"  Primary Address: {result['address']}")
+            print(f"  Source: {result['source']}")
+            print(f"  All potential matches: {len(result['all_matches'])}")
+        else:
+            print("  No address found.")
+
+
+def write_results(results, output_file):
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("Shandong Chemical Company Addresses\n")
+        f.write("==================================\n\n")
+        for result in results:
+            f.write(f"{result['company']}:\n")
+            if result["address"]:
+                f.write(f"  Primary Address: {result['address']}\n")
+                f.write(f"  Source: {result['source']}\n\n")
+                
+                # Write all potential matches for manual review
+                f.write("  All potential address matches:\n")
+                for i, match in enumerate(result['all_matches'], 1):
+                    f.write(f"    {i}. {match['text']}\n")
+                    f.write(f"       Source: {match['source']}\n")
+            else:
+                f.write("  No address found.\n")
+            f.write("\n" + "-"*50 + "\n\n")
+
+
+def reextract_results(store, workers=None):
+    """Re-run the extraction rules over every stored Bing page, without a browser."""
+    results = []
+    for company, _query, result in reextract(store, "bing", extract_from_html, workers):
+        result["company"] = company
+        results.append(result)
+    return results
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Search Bing for Shandong chemical company addresses.')
+    parser.add_argument('--debug-screenshots', metavar='DIR',
+                        help='Save before/after screenshots for every company into DIR')
+    parser.add_argument('--max-wait', type=float, default=SNIPPET_MAX_WAIT,
+                        help='Ceiling in seconds for the AI snippet wait')
+    parser.add_argument('--page-store', default=PAGE_STORE_DIR,
+                        help='Directory of the compressed results-page store')
+    parser.add_argument('--no-page-store', action='store_true',
+                        help='Do not keep results pages')
+    parser.add_argument('--reextract', action='store_true',
+                        help='Re-run address extraction over the stored pages (no browser)')
+    parser.add_argument('--reextract-workers', type=int, default=None,
+                        help='Processes used by --reextract (default: CPU count)')
+    args = parser.parse_args()
+    
+    store = None if args.no_page_store else PageStore(args.page_store)
+    
+    if args.reextract:
+        if store is None:
+            parser.error("--reextract needs the page store")
+        try:
+            results = reextract_results(store, args.reextract_workers)
+        finally:
+            store.close()
+        print_summary(results)
+        write_results(results, OUTPUT_FILE)
+        print(f"\nRe-extracted {len(results)} stored pages; results saved to {OUTPUT_FILE}")
+        return
+    
+    screenshots = ScreenshotWriter(args.debug_screenshots) if args.debug_screenshots else None
+    
     # List of companies to search for
     companies = [
         "万华化学集团股份有限公司",
@@ -115,26 +353,14 @@ def main():
         "万达控股集团股份有限公司"
     ]
     
-    # Configure Chrome options for running in a Codespace
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # These additional options might help in container environments
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-features=NetworkService")
-    chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-    chrome_options.add_argument("--disable-software-rasterizer")
-    
-    # Set up Chrome driver with specific binary location for Codespace
+    # Set up a lean Chrome (the driver binary is resolved once and cached)
     print("Setting up Chrome driver...")
-    service = Service(ChromeDriverManager().install())
+    driver = None
     
     try:
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        # This additional option might help in container environments
+        driver = create_driver(window_size=(1920, 1080),
+                               extra_arguments=["--disable-features=VizDisplayCompositor"])
         print("Chrome driver initialized successfully")
         
         # Search for each company's address
@@ -142,9 +368,23 @@ def main():
         
         results = []
         
-        for company in companies:
+        controller = AdaptiveRateController("bing")
+        pending = deque((company, 0) for company in companies)
+        
+        while pending:
+            company, attempt = pending.popleft()
             print(f"\nSearching for {company}...")
-            result = search_company_address_bing(driver, company)
+            result = search_company_address_bing(driver, company, screenshots, args.max_wait, store)
+            
+            if result["blocked"]:
+                controller.on_block(result["blocked"])
+                if attempt + 1 < MAX_ATTEMPTS:
+                    # Only the blocked company is retried, after the rest of the queue
+                    pending.append((company, attempt + 1))
+                    controller.wait()
+                    continue
+            else:
+                controller.on_success()
             
             if result["address"]:
                 print(f"✓ Found primary address: {result['address']}")
@@ -155,50 +395,36 @@ def main():
                 
             results.append(result)
             
-            # Delay between searches to avoid being blocked
-            time.sleep(random.uniform(5, 8))
+            # Adaptive delay between searches to avoid being blocked
+            if pending:
+                controller.wait()
         
-        # Output summary
-        print("\n============ SUMMARY ============")
-        for result in results:
-            print(f"\n{result['company']}:")
-            if result["address"]:
-                print(f"  Primary Address: {result['address']}")
-                print(f"  Source: {result['source']}")
-                print(f"  All potential matches: {len(result['all_matches'])}")
-            else:
-                print("  No address found.")
+        print_summary(results)
+        
+        print_timing_report(results, args.max_wait)
         
         # Save results to a file with more detailed information
-        with open("shandong_chemical_addresses.txt", "w", encoding="utf-8") as f:
-            f.write("Shandong Chemical Company Addresses\n")
-            f.write("==================================\n\n")
-            for result in results:
-                f.write(f"{result['company']}:\n")
-                if result["address"]:
-                    f.write(f"  Primary Address: {result['address']}\n")
-                    f.write(f"  Source: {result['source']}\n\n")
-                    
-                    # Write all potential matches for manual review
-                    f.write("  All potential address matches:\n")
-                    for i, match in enumerate(result['all_matches'], 1):
-                        f.write(f"    {i}. {match['text']}\n")
-                        f.write(f"       Source: {match['source']}\n")
-                else:
-                    f.write("  No address found.\n")
-                f.write("\n" + "-"*50 + "\n\n")
-        
-        print("\nResults saved to shandong_chemical_addresses.txt")
+        write_results(results, OUTPUT_FILE)
+        
+        print(f"\nResults saved to {OUTPUT_FILE}")
             
     except Exception as e:
         print(f"Failed to initialize Chrome driver: {str(e)}")
     finally:
+        # Let pending screenshot writes finish
+        if screenshots:
+            screenshots.close()
+        if store is not None:
+            store.report()
+            store.close()
+        
         # Close the browser
-        try:
-            driver.quit()
-            print("Browser closed successfully")
-        except:
-            pass
+        if driver is not None:
+            try:
+                quit_driver(driver).report("Bing pages")
+                print("Browser closed successfully")
+            except Exception:
+                pass
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Shared headless Chrome factory for the Selenium scrapers.
+
+Drivers are started lean: images, media and fonts are blocked, pages load
+with the "eager" strategy (driver.get returns at DOMContentLoaded), and the
+chromedriver path is resolved once and cached instead of being looked up
+on every run. Network events from Chrome's performance log are summed into
+a PageMetrics object on each driver, so bytes and load time per page can be
+reported.
+"""
+import json
+import os
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+# --- Constants ---
+PAGE_LOAD_STRATEGY = "eager"
+
+# Resources no scraper reads; CSS is kept because Selenium's .text depends on layout
+BLOCKED_EXTENSIONS = [
+    "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "mp4", "webm", "mp3", "ogg", "wav",
+]
+BLOCKED_URL_PATTERNS = [pattern for extension in BLOCKED_EXTENSIONS
+                        for pattern in (f"*.{extension}", f"*.{extension}?*")]
+
+# Set CHROMEDRIVER_PATH to pin a driver; otherwise the resolved path is cached here
+DRIVER_PATH_ENV = "CHROMEDRIVER_PATH"
+DRIVER_PATH_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "shandong-chemical-plants", "chromedriver_path")
+
+
+class PageMetrics:
+    """Network bytes, request counts and load times accumulated over a driver's pages."""
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.requests = 0
+        self.blocked = 0
+        self.load_times = []
+
+    def merge(self, other):
+        self.pages += other.pages
+        self.bytes += other.bytes
+        self.requests += other.requests
+        self.blocked += other.blocked
+        self.load_times.extend(other.load_times)
+
+    def report(self, label="Browser"):
+        if not self.pages:
+            print(f"{label}: no pages loaded")
+            return
+        load_times = sorted(self.load_times)
+        mean = sum(load_times) / len(load_times)
+        median = load_times[len(load_times) // 2]
+        print(f"{label}: {self.pages} pages, {self.bytes / self.pages / 1024:.0f} KiB and "
+              f"{self.requests / self.pages:.0f} requests per page, {self.blocked} requests blocked, "
+              f"load time mean {mean:.2f} s, median {median:.2f} s")
+
+
+def chromedriver_path(refresh=False):
+    """
+    Path of the chromedriver binary, resolved once and cached.
+
+    Returns:
+        str or None: Driver path, or None to let Selenium Manager resolve (and
+                     cache) the driver itself when webdriver_manager is not installed
+    """
+    if os.environ.get(DRIVER_PATH_ENV):
+        return os.environ[DRIVER_PATH_ENV]
+    if not refresh and os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE, encoding="utf-8") as f:
+            path = f.read().strip()
+        if path and os.path.exists(path):
+            return path
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+    except ImportError:
+        return None
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+    with open(DRIVER_PATH_CACHE, "w", encoding="utf-8") as f:
+        f.write(path)
+    return path
+
+
+def build_options(user_agent=None, window_size=None, block_resources=True, extra_arguments=(),
+                  page_load_strategy=PAGE_LOAD_STRATEGY):
+    chrome_options = Options()
+    for argument in ("--headless=new", "--disable-gpu", "--no-sandbox", "--disable-dev-shm-usage",
+                     "--disable-extensions", "--disable-software-rasterizer"):
+        chrome_options.add_argument(argument)
+    if window_size:
+        chrome_options.add_argument(f"--window-size={window_size[0]},{window_size[1]}")
+    if user_agent:
+        chrome_options.add_argument(f"user-agent={user_agent}")
+    for argument in extra_arguments:
+        chrome_options.add_argument(argument)
+    if block_resources:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    chrome_options.page_load_strategy = page_load_strategy
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+def create_driver(user_agent=None, window_size=None, block_resources=True, extra_arguments=(),
+                  page_load_strategy=PAGE_LOAD_STRATEGY):
+    """
+    Start a lean headless Chrome.
+
+    Args:
+        user_agent (str): User-Agent override
+        window_size (tuple): (width, height); Chrome's default when None
+        block_resources (bool): Block images, media and fonts
+        extra_arguments (iterable): Additional Chrome command-line switches
+        page_load_strategy (str): "eager" or Selenium's default "normal"
+
+    Returns:
+        WebDriver: Driver with a page_metrics attribute (PageMetrics)
+    """
+    chrome_options = build_options(user_agent, window_size, block_resources, extra_arguments, page_load_strategy)
+    path = chromedriver_path()
+    try:
+        driver = webdriver.Chrome(service=Service(path), options=chrome_options)
+    except SessionNotCreatedException:
+        # A cached driver that no longer matches the installed Chrome: resolve it again
+        if path is None or os.environ.get(DRIVER_PATH_ENV):
+            raise
+        driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=chrome_options)
+
+    if block_resources:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    driver.page_metrics = PageMetrics()
+    return driver
+
+
+def collect_network_metrics(driver):
+    """Add the network events logged since the last call to the driver's metrics."""
+    metrics = driver.page_metrics
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return metrics
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        method = message.get("method")
+        if method == "Network.loadingFinished":
+            metrics.requests += 1
+            metrics.bytes += int(message["params"].get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            metrics.blocked += 1
+    return metrics
+
+
+def load_page(driver, url):
+    """
+    driver.get(url), recording the load time and network usage.
+
+    Returns:
+        float: Seconds until driver.get returned (DOMContentLoaded with the eager strategy)
+    """
+    # Events still arriving from the previous page are credited before timing this one
+    collect_network_metrics(driver)
+    start = time.monotonic()
+    driver.get(url)
+    load_time = time.monotonic() - start
+    driver.page_metrics.pages += 1
+    driver.page_metrics.load_times.append(load_time)
+    return load_time
+
+
+def quit_driver(driver):
+    """Collect the remaining network events, quit, and return the driver's metrics."""
+    metrics = collect_network_metrics(driver)
+    driver.quit()
+    return metrics
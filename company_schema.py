@@ -0,0 +1,129 @@
+"""
+Fixed column schema and vectorized cleanup for the company tables.
+
+Every function here works on whole columns: each cleanup rule is one pandas
+.str call per column, never a Python loop over rows, so a million-row table
+is cleaned in a handful of calls. apply_schema() gives every known column a
+fixed dtype instead of whatever read_csv inferred: text as str with "" for
+missing values, capital as nullable Int64 and year as nullable Int16 (so a
+missing year no longer turns the column into 2007.0-style floats),
+coordinates as float64 (float32 would round six-decimal coordinates on the
+way back to CSV) and the city/county divisions as categories (stored
+dictionary-encoded by company_store). Columns the schema does not know are
+left as they are.
+"""
+import pandas as pd
+
+# --- Constants ---
+TEXT = 'str'
+
+COMPANY_DTYPES = {
+    'Company': TEXT,
+    'Chinese Name': TEXT,
+    'English Name': TEXT,
+    'Address': TEXT,
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+    'Main Products': TEXT,
+    'Registered Capital (RMB)': 'Int64',
+    'Opening Year': 'Int16',
+    # Derived from the address by company_store
+    'City': 'category',
+    'County': 'category',
+    # Written by the enrichment stages in sort_enhance
+    'Geocode Precision': TEXT,
+    'Translate Input Hash': TEXT,
+    'Geocode Input Hash': TEXT,
+}
+
+# Columns kept in the typed store only, never in the published CSV exports: the derived
+# divisions and the enrichment bookkeeping (a CSV edited by hand and re-imported simply
+# lacks them; the hashes are then re-adopted from the current inputs)
+STORE_ONLY_COLUMNS = ('City', 'County', 'Geocode Precision', 'Translate Input Hash', 'Geocode Input Hash')
+
+# Text columns whose content is free text and gets normalized (hashes are kept verbatim)
+NORMALIZED_TEXT_COLUMNS = ('Chinese Name', 'English Name', 'Address', 'Main Products')
+
+# Full-width ASCII (！ to ～) and the ideographic space folded to their ASCII forms
+FULLWIDTH_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+FULLWIDTH_TABLE[0x3000] = ord(' ')
+
+# Values needing more than a strip: full-width characters, whitespace runs, or tabs/newlines
+# (the character class is built from the literal characters; pyarrow's RE2 has no \u escapes)
+DIRTY_PATTERN = '[\uff01-\uff5e\u3000]' + r'|\s\s|[^\S ]'
+
+# Quotation marks some translators put around a whole value
+QUOTES = ('"', "'")
+
+
+def text_column(values):
+    """Text with "" for missing values (not 'nan')."""
+    return values.fillna('').astype(str)
+
+
+def normalize_text(values):
+    """
+    Fold full-width punctuation and spaces to ASCII, collapse runs of
+    whitespace to one space and strip the ends.
+
+    Returns:
+    Series: Normalized text; missing values become ""
+    """
+    text = text_column(values)
+    # One regex scan finds the (usually few) values that need rewriting; only those
+    # go through str.translate, which pandas runs per element
+    dirty = text.str.contains(DIRTY_PATTERN, regex=True)
+    if dirty.any():
+        fixed = text[dirty].str.translate(FULLWIDTH_TABLE).str.replace(r'\s+', ' ', regex=True)
+        text = text.where(~dirty, fixed)
+    return text.str.strip()
+
+
+def strip_quotes(values):
+    """
+    Remove one pair of matching quotation marks around whole values.
+
+    Returns:
+    tuple: (Series with the quotes removed, number of values that had them)
+    """
+    text = text_column(values)
+    quoted = pd.Series(False, index=text.index)
+    for quote in QUOTES:
+        quoted |= text.str.startswith(quote) & text.str.endswith(quote)
+    quoted &= text.str.len() >= 2
+    return text.where(~quoted, text.str[1:-1]), int(quoted.sum())
+
+
+def to_int(values, dtype='Int64'):
+    """Numbers (or numeric text) as a nullable integer dtype, rounded; unparseable values become <NA>."""
+    return pd.to_numeric(values, errors='coerce').round().astype(dtype)
+
+
+def apply_schema(df, dtypes=COMPANY_DTYPES, normalize=True):
+    """
+    Coerce the known columns of a company table to their fixed dtypes.
+
+    Parameters:
+    df (DataFrame): Company data
+    dtypes (dict): Column -> dtype ('str', 'Int64', 'float64', 'category' ...)
+    normalize (bool): Also normalize the free-text columns (see normalize_text)
+
+    Returns:
+    DataFrame: A copy with the schema applied
+    """
+    df = df.copy()
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        if dtype == TEXT:
+            if normalize and column in NORMALIZED_TEXT_COLUMNS:
+                df[column] = normalize_text(df[column])
+            else:
+                df[column] = text_column(df[column])
+        elif dtype.startswith('Int'):
+            df[column] = to_int(df[column], dtype)
+        elif dtype == 'category':
+            df[column] = text_column(df[column]).astype('category')
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    return df
@@ -0,0 +1,258 @@
+"""
+Canonical binary storage for the company tables.
+
+Every table (shandong_chemical_companies, 200_largest_chemical_plants,
+shandong_chemical_plant_list ...) is kept next to its CSV as an
+uncompressed Arrow IPC (Feather v2) file with the fixed company schema:
+text as strings, capital as int64, year as int16, coordinates as float64,
+and the City/County columns derived from the address dictionary-encoded.
+Loading memory-maps the file, so nothing is parsed and no types are
+inferred, and a load that only needs some columns or rows only touches
+those pages.
+
+The CSV is an export written alongside the store for people and the web
+page, with the published columns only (the City/County divisions and the
+enrichment bookkeeping in STORE_ONLY_COLUMNS stay in the store). It is only
+read back when no store exists yet, or when the CSV is newer than the store
+(a scraper from before the store existed, or a hand edit); the store is then
+rebuilt from it once, IMPORT_CHUNKSIZE rows at a time, so the import never
+holds more than one chunk of the table in memory.
+
+Without pyarrow the store falls back to pickle (binary, keeps dtypes, not
+memory-mapped; the import then has to hold the whole table).
+"""
+import os
+
+import pandas as pd
+
+from address_normalize import normalize_addresses
+from company_schema import COMPANY_DTYPES, STORE_ONLY_COLUMNS, TEXT, apply_schema
+from gazetteer import CITIES, COUNTIES
+
+# --- Constants ---
+ARROW_EXTENSION = '.arrow'
+PICKLE_EXTENSION = '.pkl'
+
+# Rows per chunk when a CSV export is imported into the store
+IMPORT_CHUNKSIZE = 100000
+
+# Columns derived from the address when a table is saved
+DIVISION_COLUMNS = {'City': 'city', 'County': 'county'}
+
+# The divisions' categories are fixed to the gazetteer's names, so every chunk of an
+# import is dictionary-encoded with the same dictionary
+DIVISION_DTYPES = {
+    'City': pd.CategoricalDtype(["", *CITIES]),
+    'County': pd.CategoricalDtype(["", *sorted({county for counties in COUNTIES.values() for county in counties})]),
+}
+
+
+def _store_format():
+    """Arrow IPC when pyarrow is available, otherwise pickle."""
+    try:
+        import pyarrow  # noqa: F401
+        return 'arrow'
+    except ImportError:
+        return 'pickle'
+
+
+def store_path(path):
+    """Store file for a table, given its CSV (or store) path."""
+    extension = ARROW_EXTENSION if _store_format() == 'arrow' else PICKLE_EXTENSION
+    return os.path.splitext(path)[0] + extension
+
+
+def csv_path(path):
+    """CSV export for a table, given its store (or CSV) path."""
+    return os.path.splitext(path)[0] + '.csv'
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def store_is_current(path):
+    """True if the table's store exists and its CSV is not newer."""
+    stored, exported = _mtime(store_path(path)), _mtime(csv_path(path))
+    return stored is not None and (exported is None or exported <= stored)
+
+
+def modified_time(path):
+    """Last modification of a table's data (store or CSV, whichever is newer), or None."""
+    times = [t for t in (_mtime(store_path(path)), _mtime(csv_path(path))) if t is not None]
+    return max(times) if times else None
+
+
+def add_divisions(df):
+    """Add the City and County columns parsed from the Address column (in place)."""
+    if 'Address' not in df.columns:
+        return df
+    divisions = normalize_addresses(df['Address'])
+    for column, component in DIVISION_COLUMNS.items():
+        df[column] = divisions[component].astype(DIVISION_DTYPES[column])
+    return df
+
+
+def read_csv_chunks(path, chunksize=IMPORT_CHUNKSIZE):
+    """
+    Read a CSV export (a BOM is dropped) in chunks, with the fixed schema applied
+    and the City/County columns derived from Address in each chunk.
+
+    Yields:
+    DataFrame: Up to chunksize rows, indexed by row number in the file
+    """
+    header = pd.read_csv(path, nrows=0, encoding='utf-8-sig')
+    # Text (row input hashes included, so their digits survive) and unknown columns are
+    # read as str, so every chunk gets the same types; numbers are coerced by apply_schema
+    text_columns = {column: str for column in header.columns
+                    if COMPANY_DTYPES.get(column, TEXT) in (TEXT, 'category')}
+    for chunk in pd.read_csv(path, encoding='utf-8-sig', dtype=text_columns, chunksize=chunksize):
+        chunk = apply_schema(chunk)
+        if 'Address' in chunk.columns:
+            add_divisions(chunk)
+        yield chunk
+
+
+def import_csv(path):
+    """Read a whole CSV export (a BOM is dropped) with the fixed schema applied."""
+    return pd.concat(read_csv_chunks(path), ignore_index=True)
+
+
+def _write_store(df, path):
+    _write_store_chunks([df], path)
+
+
+def _write_store_chunks(chunks, path):
+    # Arrow record batches are appended chunk by chunk; pickle needs the whole frame at once
+    tmp_path = path + '.tmp'
+    if _store_format() == 'arrow':
+        import pyarrow as pa
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pa.ipc.new_file(tmp_path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        pd.concat(chunks, ignore_index=True).to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read_store(path, columns=None):
+    if _store_format() == 'arrow':
+        from pyarrow import feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+    df = pd.read_pickle(path)
+    return df[columns] if columns is not None else df
+
+
+def _columns(store):
+    if _store_format() == 'arrow':
+        import pyarrow as pa
+        with pa.memory_map(store) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_pickle(store).columns)
+
+
+def ensure_store(path):
+    """
+    Make sure a table's store is current, importing its CSV if needed.
+
+    Returns:
+    str: The store path
+
+    Raises:
+    FileNotFoundError: If neither the store nor the CSV exists
+    """
+    store = store_path(path)
+    if store_is_current(path):
+        return store
+    source = csv_path(path)
+    if not os.path.exists(source):
+        raise FileNotFoundError(path)
+    print(f"Importing {source} into {store}")
+    _write_store_chunks(read_csv_chunks(source), store)
+    return store
+
+
+def load_table(path, columns=None):
+    """
+    Load a table from its store (memory-mapped), importing the CSV first if it is newer.
+
+    Parameters:
+    path (str): Table path (the CSV or the store name)
+    columns (list): Only load these columns
+
+    Returns:
+    DataFrame: The table, indexed by row number
+    """
+    return _read_store(ensure_store(path), columns)
+
+
+def load_top_n(path, num_rows, sort_by, ascending=False):
+    """
+    The top rows of a table by one column, in ranked order.
+
+    Only the ranking column is read to choose the rows, and then only those
+    rows are taken from the memory-mapped store. Ties keep table order and
+    rows with a missing key come last, like a stable sort with na_position='last'.
+
+    Returns:
+    DataFrame: The selected rows, indexed by their row number in the table
+
+    Raises:
+    KeyError: If sort_by is not a column of the table
+    """
+    store = ensure_store(path)
+    if sort_by not in _columns(store):
+        raise KeyError(sort_by)
+    keys = pd.to_numeric(_read_store(store, [sort_by])[sort_by], errors='coerce')
+    rows = keys.sort_values(ascending=ascending, kind='stable', na_position='last').index[:num_rows]
+    if _store_format() != 'arrow':
+        selected = _read_store(store).iloc[rows]
+        selected.index = rows
+        return selected
+
+    import pyarrow as pa
+    # Take the rows batch by batch: a take over the whole multi-batch table would
+    # first concatenate every column in memory
+    wanted = rows.sort_values().to_numpy()
+    pieces = []
+    with pa.memory_map(store) as source:
+        reader = pa.ipc.open_file(source)
+        offset = 0
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            local = wanted[(wanted >= offset) & (wanted < offset + batch.num_rows)] - offset
+            if len(local):
+                pieces.append(batch.take(pa.array(local)))
+            offset += batch.num_rows
+        selected = pa.Table.from_batches(pieces, schema=reader.schema).to_pandas(split_blocks=True)
+    selected.index = wanted
+    return selected.loc[rows]
+
+
+def save_table(df, path, csv_encoding='utf-8'):
+    """
+    Save a table: the CSV export first, then the store (so the store is never older).
+    The export leaves out the store-only columns (divisions and enrichment bookkeeping).
+
+    Parameters:
+    df (DataFrame): Table to save; the company schema is applied and the
+                    City/County columns are (re)derived from Address
+    path (str): Table path (the CSV or the store name)
+    csv_encoding (str): Encoding of the CSV export ('utf-8-sig' adds a BOM for Excel)
+    """
+    df = apply_schema(df, normalize=False).reset_index(drop=True)
+    add_divisions(df)
+    export = csv_path(path)
+    tmp_path = export + '.tmp'
+    published = [column for column in df.columns if column not in STORE_ONLY_COLUMNS]
+    df.to_csv(tmp_path, index=False, encoding=csv_encoding, columns=published)
+    os.replace(tmp_path, export)
+    _write_store(df, store_path(path))
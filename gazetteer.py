@@ -0,0 +1,383 @@
+"""
+Offline geocoder for Shandong addresses from a bundled gazetteer.
+
+Many scraped addresses stop at the county or town (无棣县埕口镇,
+东明县菜园集工业园区). The Geocoding API can do no better than a centroid
+for those, so they are resolved locally: every place name in the address is
+found with a character trie, the matches are reconciled into one
+province -> city -> county -> town chain, and the finest level's centroid
+is returned together with that precision. Addresses that name a road or
+house number need street-level accuracy and are left to the network
+geocoder.
+
+Prefecture and county centroids are bundled below (county-level coordinates
+are the seat of government). Town centroids are read from TOWNS_FILE
+(city,county,town,latitude,longitude) when it exists. An address naming a
+town or subdistrict that is not listed there is left to the network
+geocoder too: the county seat can be tens of kilometres from the town.
+"""
+import csv
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+# --- Constants ---
+PROVINCE = ("山东省", 36.40, 118.50)
+
+# Optional town centroids: city,county,town,latitude,longitude (names as in COUNTIES, e.g. 滨州市,无棣县)
+TOWNS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shandong_towns.csv")
+
+# Precision levels, coarsest first
+PRECISIONS = ("province", "city", "county", "town")
+
+# A province centroid places nothing; such addresses are left to the network geocoder
+MIN_OFFLINE_PRECISION = "city"
+
+# A road, house number or street address needs the network geocoder (街道 is a subdistrict, not a street)
+STREET_PATTERN = re.compile(r"路|大道|大街|街(?!道)|巷|胡同|\d+号|[一二三四五六七八九十]+号")
+
+# A town, township or subdistrict (office) named after the divisions the gazetteer placed
+TOWN_PATTERN = re.compile(r"镇|乡|街道|办事处")
+
+CITIES = {
+    "济南市": (36.651, 117.120), "青岛市": (36.067, 120.383), "淄博市": (36.813, 118.055),
+    "枣庄市": (34.810, 117.323), "东营市": (37.434, 118.675), "烟台市": (37.463, 121.448),
+    "潍坊市": (36.707, 119.162), "济宁市": (35.415, 116.587), "泰安市": (36.200, 117.088),
+    "威海市": (37.513, 122.120), "日照市": (35.417, 119.527), "临沂市": (35.105, 118.356),
+    "德州市": (37.436, 116.359), "聊城市": (36.457, 115.985), "滨州市": (37.382, 117.971),
+    "菏泽市": (35.234, 115.481),
+}
+
+# County-level divisions by prefecture: name -> seat coordinates
+COUNTIES = {
+    "济南市": {
+        "历下区": (36.666, 117.077), "市中区": (36.651, 116.998), "槐荫区": (36.651, 116.901),
+        "天桥区": (36.678, 116.987), "历城区": (36.680, 117.065), "长清区": (36.553, 116.752),
+        "章丘区": (36.680, 117.526), "济阳区": (36.978, 117.173), "莱芜区": (36.214, 117.677),
+        "钢城区": (36.058, 117.811), "平阴县": (36.289, 116.456), "商河县": (37.309, 117.157),
+    },
+    "青岛市": {
+        "市南区": (36.071, 120.412), "市北区": (36.088, 120.375), "黄岛区": (35.960, 120.198),
+        "崂山区": (36.107, 120.468), "李沧区": (36.145, 120.433), "城阳区": (36.307, 120.396),
+        "即墨区": (36.389, 120.447), "胶州市": (36.264, 120.033), "平度市": (36.787, 119.960),
+        "莱西市": (36.887, 120.518),
+    },
+    "淄博市": {
+        "张店区": (36.807, 118.018), "淄川区": (36.644, 117.967), "博山区": (36.494, 117.862),
+        "临淄区": (36.826, 118.309), "周村区": (36.803, 117.870), "桓台县": (36.960, 118.097),
+        "高青县": (37.170, 117.826), "沂源县": (36.185, 118.171),
+    },
+    "枣庄市": {
+        "市中区": (34.864, 117.556), "薛城区": (34.795, 117.263), "峄城区": (34.773, 117.591),
+        "台儿庄区": (34.562, 117.734), "山亭区": (35.099, 117.461), "滕州市": (35.084, 117.165),
+    },
+    "东营市": {
+        "东营区": (37.448, 118.582), "河口区": (37.886, 118.525), "垦利区": (37.588, 118.548),
+        "利津县": (37.490, 118.255), "广饶县": (37.054, 118.407),
+    },
+    "烟台市": {
+        "芝罘区": (37.540, 121.400), "福山区": (37.498, 121.268), "牟平区": (37.387, 121.600),
+        "莱山区": (37.511, 121.445), "蓬莱区": (37.811, 120.759), "龙口市": (37.646, 120.478),
+        "莱阳市": (36.978, 120.711), "莱州市": (37.177, 119.942), "招远市": (37.355, 120.434),
+        "栖霞市": (37.336, 120.849), "海阳市": (36.776, 121.159),
+    },
+    "潍坊市": {
+        "潍城区": (36.728, 119.025), "寒亭区": (36.775, 119.219), "坊子区": (36.654, 119.166),
+        "奎文区": (36.707, 119.133), "青州市": (36.685, 118.480), "诸城市": (35.996, 119.410),
+        "寿光市": (36.856, 118.791), "安丘市": (36.478, 119.219), "高密市": (36.383, 119.755),
+        "昌邑市": (36.859, 119.398), "临朐县": (36.512, 118.542), "昌乐县": (36.707, 118.830),
+    },
+    "济宁市": {
+        "任城区": (35.408, 116.595), "兖州区": (35.553, 116.783), "曲阜市": (35.581, 116.986),
+        "邹城市": (35.405, 117.004), "微山县": (34.807, 117.129), "鱼台县": (35.012, 116.651),
+        "金乡县": (35.067, 116.311), "嘉祥县": (35.408, 116.342), "汶上县": (35.733, 116.489),
+        "泗水县": (35.665, 117.251), "梁山县": (35.802, 116.096),
+    },
+    "泰安市": {
+        "泰山区": (36.192, 117.130), "岱岳区": (36.188, 117.042), "新泰市": (35.909, 117.768),
+        "肥城市": (36.182, 116.769), "宁阳县": (35.759, 116.805), "东平县": (35.937, 116.471),
+    },
+    "威海市": {
+        "环翠区": (37.502, 122.123), "文登区": (37.194, 122.058), "荣成市": (37.165, 122.487),
+        "乳山市": (36.920, 121.539),
+    },
+    "日照市": {
+        "东港区": (35.425, 119.462), "岚山区": (35.122, 119.318), "五莲县": (35.750, 119.208),
+        "莒县": (35.580, 118.837),
+    },
+    "临沂市": {
+        "兰山区": (35.051, 118.347), "罗庄区": (34.997, 118.284), "河东区": (35.089, 118.402),
+        "沂南县": (35.550, 118.465), "郯城县": (34.613, 118.367), "沂水县": (35.790, 118.628),
+        "兰陵县": (34.857, 118.070), "费县": (35.266, 117.978), "平邑县": (35.506, 117.640),
+        "莒南县": (35.175, 118.835), "蒙阴县": (35.710, 117.945), "临沭县": (34.920, 118.650),
+    },
+    "德州市": {
+        "德城区": (37.451, 116.299), "陵城区": (37.336, 116.576), "乐陵市": (37.730, 117.232),
+        "禹城市": (36.934, 116.638), "宁津县": (37.652, 116.800), "庆云县": (37.776, 117.385),
+        "临邑县": (37.190, 116.866), "齐河县": (36.784, 116.758), "平原县": (37.165, 116.434),
+        "夏津县": (36.948, 116.002), "武城县": (37.213, 116.069),
+    },
+    "聊城市": {
+        "东昌府区": (36.434, 115.988), "茌平区": (36.580, 116.255), "临清市": (36.838, 115.705),
+        "阳谷县": (36.114, 115.791), "莘县": (36.234, 115.671), "东阿县": (36.334, 116.247),
+        "冠县": (36.484, 115.442), "高唐县": (36.866, 116.231),
+    },
+    "滨州市": {
+        "滨城区": (37.430, 118.019), "沾化区": (37.699, 118.099), "惠民县": (37.489, 117.510),
+        "阳信县": (37.641, 117.578), "无棣县": (37.770, 117.625), "博兴县": (37.150, 118.131),
+        "邹平市": (36.863, 117.743),
+    },
+    "菏泽市": {
+        "牡丹区": (35.252, 115.417), "定陶区": (35.071, 115.573), "曹县": (34.826, 115.542),
+        "单县": (34.795, 116.107), "成武县": (34.952, 115.890), "巨野县": (35.397, 116.095),
+        "郓城县": (35.600, 115.944), "鄄城县": (35.563, 115.510), "东明县": (35.290, 115.091),
+    },
+}
+
+# Former prefecture merged into Jinan in 2019; it still heads many addresses (莱芜市钢城区...)
+FORMER_CITIES = {"莱芜市": ("济南市", 36.214, 117.677)}
+
+# Names still common in company registrations: old name -> (city, current county-level name)
+FORMER_NAMES = {
+    "莱城区": ("济南市", "莱芜区"), "章丘市": ("济南市", "章丘区"), "即墨市": ("青岛市", "即墨区"),
+    "胶南市": ("青岛市", "黄岛区"), "垦利县": ("东营市", "垦利区"), "蓬莱市": ("烟台市", "蓬莱区"),
+    "兖州市": ("济宁市", "兖州区"), "文登市": ("威海市", "文登区"), "陵县": ("德州市", "陵城区"),
+    "茌平县": ("聊城市", "茌平区"), "沾化县": ("滨州市", "沾化区"), "邹平县": ("滨州市", "邹平市"),
+    "定陶县": ("菏泽市", "定陶区"), "苍山县": ("临沂市", "兰陵县"),
+}
+
+# Short forms that are ordinary words or shared with another division; only the full name matches
+AMBIGUOUS_SHORT_NAMES = {"市中", "市南", "市北", "河东", "河口", "东营", "泰山", "平原", "牡丹"}
+
+Place = namedtuple("Place", "name level city county latitude longitude")
+GazetteerMatch = namedtuple("GazetteerMatch", "latitude longitude precision place")
+
+
+def _short_name(name):
+    # 无棣县 -> 无棣, 东昌府区 -> 东昌府; single-character stems (莒县, 费县) are too ambiguous
+    stem = name[:-1]
+    return stem if len(stem) >= 2 else None
+
+
+def load_towns(path=TOWNS_FILE):
+    """
+    Read town centroids.
+
+    Returns:
+    list: Place entries; empty if the file does not exist
+    """
+    if not os.path.exists(path):
+        return []
+    towns = []
+    with open(path, encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            city, county = row["city"].strip(), row["county"].strip()
+            if county not in COUNTIES.get(city, {}):
+                continue
+            towns.append(Place(row["town"].strip(), "town", city, county,
+                               float(row["latitude"]), float(row["longitude"])))
+    return towns
+
+
+class Gazetteer:
+    """
+    Place-name trie over the bundled Shandong divisions.
+
+    Parameters:
+    towns (list): Town-level Place entries (default: load_towns())
+    """
+
+    def __init__(self, towns=None):
+        self.trie = {}
+        province, latitude, longitude = PROVINCE
+        self._add(province, Place(province, "province", None, None, latitude, longitude))
+        self._add("山东", Place(province, "province", None, None, latitude, longitude))
+
+        city_short_names = set()
+        for city, (latitude, longitude) in CITIES.items():
+            place = Place(city, "city", city, None, latitude, longitude)
+            self._add(city, place)
+            self._add(city[:-1], place)
+            city_short_names.add(city[:-1])
+
+        for city, counties in COUNTIES.items():
+            for county, (latitude, longitude) in counties.items():
+                place = Place(county, "county", city, county, latitude, longitude)
+                self._add(county, place)
+                short = _short_name(county)
+                if short and short not in AMBIGUOUS_SHORT_NAMES and short not in city_short_names:
+                    self._add(short, place)
+
+        for former, (city, latitude, longitude) in FORMER_CITIES.items():
+            place = Place(former, "city", city, None, latitude, longitude)
+            self._add(former, place)
+            self._add(former[:-1], place)
+
+        for former, (city, county) in FORMER_NAMES.items():
+            latitude, longitude = COUNTIES[city][county]
+            self._add(former, Place(county, "county", city, county, latitude, longitude))
+
+        self.towns = load_towns() if towns is None else towns
+        for place in self.towns:
+            self._add(place.name, place)
+
+    def _add(self, name, place):
+        node = self.trie
+        for char in name:
+            node = node.setdefault(char, {})
+        places = node.setdefault(None, [])
+        if place not in places:
+            places.append(place)
+
+    def scan(self, address):
+        """
+        Find place names in an address, longest match first, left to right.
+
+        Returns:
+            list: (start, end, candidate Places) per matched name, in address order
+        """
+        found = []
+        i = 0
+        length = len(address)
+        while i < length:
+            node = self.trie
+            match_end = None
+            places = None
+            j = i
+            while j < length:
+                node = node.get(address[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node:
+                    match_end, places = j, node[None]
+            if match_end is None:
+                i += 1
+                continue
+            found.append((i, match_end, places))
+            i = match_end
+        return found
+
+    def divisions(self, address):
+        """
+        Reconcile the place names in an address into one division chain.
+
+        Returns:
+            tuple or None: ({level: Place} for the levels named, end offset of
+            the last place name used), or None if the names contradict each other
+        """
+        by_level = {level: [] for level in PRECISIONS}
+        for start, end, places in self.scan(address):
+            for level in PRECISIONS:
+                candidates = [place for place in places if place.level == level]
+                if candidates:
+                    by_level[level].append((end, candidates))
+
+        chosen = {}
+        last_end = 0
+        if by_level["province"]:
+            last_end, candidates = by_level["province"][0]
+            chosen["province"] = candidates[0]
+        city = None
+        cities = {place.city for _end, candidates in by_level["city"] for place in candidates}
+        if len(cities) > 1:
+            return None
+        if cities:
+            city = cities.pop()
+            end, candidates = by_level["city"][0]
+            chosen["city"] = candidates[0]
+            last_end = max(last_end, end)
+
+        county = None
+        for end, candidates in by_level["county"]:
+            # A county name shared by two cities (市中区) counts only if the city is named too
+            consistent = [place for place in candidates if city is None or place.city == city]
+            if len(consistent) == 1:
+                if county is not None and consistent[0].county != county.county:
+                    return None
+                county = consistent[0]
+                last_end = max(last_end, end)
+        if county is not None:
+            chosen["county"] = county
+            city = county.city
+
+        for end, candidates in by_level["town"]:
+            consistent = [place for place in candidates
+                          if (county is None or place.county == county.county)
+                          and (city is None or place.city == city)]
+            if len(consistent) == 1:
+                chosen["town"] = consistent[0]
+                last_end = max(last_end, end)
+                break
+        return chosen, last_end
+
+    def names_unplaced_town(self, address):
+        """True if the address names a town or subdistrict the gazetteer has no centroid for."""
+        reconciled = self.divisions(address)
+        if reconciled is None:
+            return False
+        chosen, end = reconciled
+        return "town" not in chosen and bool(TOWN_PATTERN.search(address, end))
+
+    def resolve(self, address):
+        """
+        Resolve an address to the centroid of the finest division it names.
+
+        Returns:
+            GazetteerMatch or None: None if no division matched or the
+            divisions named contradict each other
+        """
+        reconciled = self.divisions(address)
+        if reconciled is None:
+            return None
+        chosen, _end = reconciled
+        for level in reversed(PRECISIONS):
+            place = chosen.get(level)
+            if place is not None:
+                return GazetteerMatch(place.latitude, place.longitude, level, _full_name(place))
+        return None
+
+
+def _full_name(place):
+    parts = [PROVINCE[0]]
+    if place.city:
+        parts.append(place.city)
+    if place.county:
+        parts.append(place.county)
+    if place.level == "town":
+        parts.append(place.name)
+    return "".join(parts)
+
+
+def needs_street_level(address):
+    """True if the address names a road or house number, which a division centroid cannot place."""
+    return bool(STREET_PATTERN.search(unicodedata.normalize("NFKC", address)))
+
+
+def geocode_offline(addresses, gazetteer=None, min_precision=MIN_OFFLINE_PRECISION):
+    """
+    Resolve the addresses that need neither street-level accuracy nor a town
+    centroid the gazetteer does not have.
+
+    Parameters:
+    addresses (iterable): Address strings; duplicates are resolved once
+    gazetteer (Gazetteer): Index to use (built on first use when None)
+    min_precision (str): Coarsest precision accepted (one of PRECISIONS)
+
+    Returns:
+    dict: address -> GazetteerMatch, for the addresses resolved offline
+    """
+    gazetteer = gazetteer or Gazetteer()
+    min_rank = PRECISIONS.index(min_precision)
+    results = {}
+    for address in dict.fromkeys(addresses):
+        if not address or needs_street_level(address):
+            continue
+        match = gazetteer.resolve(address)
+        if match is None or PRECISIONS.index(match.precision) < min_rank:
+            continue
+        if match.precision != "town" and gazetteer.names_unplaced_town(address):
+            continue
+        results[address] = match
+    return results
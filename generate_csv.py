@@ -1,141 +1,135 @@
+import argparse
 import csv
 import re
 
+from address_extract import STRUCTURED_KINDS, best_address
+from glossary import GlossaryTranslator
+
+PRIMARY_ADDRESS_PATTERN = re.compile(r'Primary Address:\s*(.*?)(?:\n\s*Source:|$)', re.DOTALL)
+ALL_MATCHES_PATTERN = re.compile(r'All potential address matches:(.*?)(?=\n-{10}|\Z)', re.DOTALL)
+MATCH_ITEM_PATTERN = re.compile(r'\d+\.\s*(.*?)(?:\n\s*Source:|$)', re.DOTALL)
+COMPANY_NAME_PATTERN = re.compile(r'([^:]+):')
+
+# Company sections are separated by a line of 10 or more dashes (the writer uses 50)
+DIVIDER_PATTERN = re.compile(r'\n-{10,}\n')
+
+# Characters read per chunk while streaming the addresses file
+SECTION_CHUNK_SIZE = 1 << 20
+
+# Built once: the glossary trie is shared by every company name
+NAME_TRANSLATOR = GlossaryTranslator()
+
 def extract_best_address(company_section):
     """
     Extract the most likely correct address from a company section in the text file
     """
     # First, check if there's a Primary Address section
-    primary_address_match = re.search(r'Primary Address:\s*(.*?)(?:\n\s*Source:|$)', company_section, re.DOTALL)
+    primary_address_match = PRIMARY_ADDRESS_PATTERN.search(company_section)
     
     if primary_address_match:
         raw_address = primary_address_match.group(1).strip()
         
         # Extract the most likely address pattern from the raw text
-        address_patterns = [
-            # Most specific patterns first
-            r'山东省[\w市县区]+[\w路街道]+\d+号',  # Standard address with number
-            r'山东省[\w市县区]+经济技术开发区[\w路街道]+\d+号',  # Dev zone with number
-            r'山东省[\w市县区]+[\w园区]+[\w路街道]+\d+号',  # Industrial park with number
-            r'山东省[\w市县区]+[\w路街道]+[\w大厦]',  # Building name
-            r'山东省[\w市县区]+[\w路街道]+',  # General address format
-            r'山东省[\w市县区]+经济技术开发区[\w路街道]+',  # Dev zone without number
-        ]
-        
-        for pattern in address_patterns:
-            match = re.search(pattern, raw_address)
-            if match:
-                return match.group(0)
+        # (most specific first: numbered street address, building, general)
+        address = best_address(raw_address, STRUCTURED_KINDS)
+        if address:
+            return address
         
         # If no patterns match in the primary address, look for anything with 山东省
         if '山东省' in raw_address:
             # Try to extract a reasonable length sentence with 山东省
-            sentences = re.findall(r'(山东省[^。，；\n]{5,60})', raw_address)
-            if sentences:
-                return sentences[0]
+            sentence = best_address(raw_address, ('sentence',))
+            if sentence:
+                return sentence
             else:
                 # Just return the first 100 chars as fallback
                 return raw_address[:100].strip()
     
     # If no primary address section, check the "All potential address matches" section
-    all_matches_section = re.search(r'All potential address matches:(.*?)(?=\n-{10}|\Z)', company_section, re.DOTALL)
+    all_matches_section = ALL_MATCHES_PATTERN.search(company_section)
     
     if all_matches_section:
         matches_text = all_matches_section.group(1).strip()
-        matches = re.findall(r'\d+\.\s*(.*?)(?:\n\s*Source:|$)', matches_text, re.DOTALL)
+        matches = MATCH_ITEM_PATTERN.findall(matches_text)
         
         # Go through each match and look for address patterns
         for match in matches:
-            for pattern in [
-                r'(山东省[\w市县区]+[\w路街道]+\d+号)',
-                r'(山东省[\w市县区]+经济技术开发区[\w路街道]+\d+号)',
-                r'(山东省[\w市县区]+[\w路街道]+[\w大厦])',
-                r'(山东省[\w市县区]+[\w路街道]+)',
-            ]:
-                address_match = re.search(pattern, match)
-                if address_match:
-                    return address_match.group(1)
+            address = best_address(match, STRUCTURED_KINDS)
+            if address:
+                return address
         
         # If no structured address found, return the first match that contains 山东省
         for match in matches:
             if '山东省' in match:
-                sentences = re.findall(r'(山东省[^。，；\n]{5,60})', match)
-                if sentences:
-                    return sentences[0]
+                sentence = best_address(match, ('sentence',))
+                if sentence:
+                    return sentence
     
     # Last resort - try to find any address-like pattern in the entire company section
-    for pattern in [
-        r'(山东省[\w市县区]+[\w路街道]+\d+号)',
-        r'(山东省[\w市县区]+经济技术开发区[\w路街道]+\d+号)',
-        r'(山东省[\w市县区]+[\w路街道]+[\w大厦])',
-        r'(山东省[\w市县区]+[\w路街道]+)',
-    ]:
-        address_match = re.search(pattern, company_section)
-        if address_match:
-            return address_match.group(1)
+    address = best_address(company_section, STRUCTURED_KINDS)
+    if address:
+        return address
             
     return "Address not found"
 
+def iter_sections(file, chunk_size=SECTION_CHUNK_SIZE):
+    """
+    Yield the company sections of an open addresses file, one at a time.
+
+    Sections are exactly what re.split(DIVIDER_PATTERN, content) gives for the
+    whole file, but the file is read in chunks: each chunk is split and the
+    text after its last complete divider is carried into the next read, so
+    memory is bounded by the chunk size plus the longest section.
+    """
+    carry = ''
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        # Everything after the last complete divider may continue in the next chunk
+        *sections, carry = DIVIDER_PATTERN.split(carry + chunk)
+        yield from sections
+    yield carry
+
+
 def parse_addresses_file(file_path):
     """
-    Parse the addresses file and extract company information with improved address extraction
+    Parse the addresses file and extract company information with improved address extraction.
+
+    The file is streamed and companies are yielded one at a time, so memory
+    use does not grow with the size of the dump.
     """
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Split the content into company sections using the divider lines
-    company_sections = re.split(r'\n-{10,}\n', content)
-    
-    companies = []
-    
-    for section in company_sections:
-        if not section.strip() or "Shandong Chemical Company Addresses" in section:
-            continue
-        
-        # Extract company name
-        company_match = re.match(r'([^:]+):', section.strip())
-        if not company_match:
-            continue
+        for section in iter_sections(f):
+            if not section.strip() or "Shandong Chemical Company Addresses" in section:
+                continue
             
-        company_name = company_match.group(1).strip()
-        
-        # Extract the best address from this section
-        address = extract_best_address(section)
-        
-        companies.append({
-            'chinese_name': company_name,
-            'english_name': translate_company_name(company_name),
-            'address': address,
-            'latitude': '',
-            'longitude': '',
-            'main_products': get_main_products(company_name)
-        })
-    
-    return companies
+            # Extract company name
+            company_match = COMPANY_NAME_PATTERN.match(section.strip())
+            if not company_match:
+                continue
+                
+            company_name = company_match.group(1).strip()
+            
+            # Extract the best address from this section
+            address = extract_best_address(section)
+            
+            yield {
+                'chinese_name': company_name,
+                'english_name': translate_company_name(company_name),
+                'address': address,
+                'latitude': '',
+                'longitude': '',
+                'main_products': get_main_products(company_name)
+            }
 
 def translate_company_name(chinese_name):
-    """Provide English translation for known company names"""
-    # This could be expanded with more companies as needed
-    translations = {
-        "万华化学集团股份有限公司": "Wanhua Chemical Group Co., Ltd.",
-        "山东东明化学集团有限公司": "Shandong Dongming Chemical Group Co., Ltd.",
-        "利华益集团股份有限公司": "Liwayee Group Co., Ltd.",
-        "万达控股集团股份有限公司": "Wanda Holdings Group Co., Ltd."
-    }
-    
-    # If no translation exists, create a basic one
-    if chinese_name not in translations:
-        # This is a very basic translation approach - for production use,
-        # consider using an actual translation API
-        basic_translation = chinese_name
-        basic_translation = basic_translation.replace("有限公司", "Co., Ltd.")
-        basic_translation = basic_translation.replace("股份", "")
-        basic_translation = basic_translation.replace("集团", "Group")
-        basic_translation = basic_translation.replace("化学", "Chemical")
-        basic_translation = basic_translation.replace("山东", "Shandong")
-        return basic_translation
-        
-    return translations.get(chinese_name, chinese_name)
+    """
+    Offline English name: whole-name overrides first, then longest-match
+    glossary segmentation. Runs the glossary does not cover are left in
+    Chinese.
+    """
+    return NAME_TRANSLATOR.translate(chinese_name)
 
 def get_main_products(company_name):
     """Return main products for each company based on research"""
@@ -151,13 +145,14 @@ def get_main_products(company_name):
     return products.get(company_name, "Chemical products, petrochemicals")
 
 def write_csv(companies, output_file):
-    """Write the company data to a CSV file"""
+    """Write the company data to a CSV file, consuming companies as they arrive (any iterable)"""
     with open(output_file, 'w', encoding='utf-8', newline='') as f:
         writer = csv.writer(f)
         # Write header
         writer.writerow(['Chinese Name', 'English Name', 'Address', 'Latitude', 'Longitude', 'Main Products'])
         
         # Write data
+        count = 0
         for company in companies:
             writer.writerow([
                 company['chinese_name'],
@@ -167,23 +162,34 @@ def write_csv(companies, output_file):
                 company['longitude'],
                 company['main_products']
             ])
+            count += 1
     
-    return len(companies)
+    return count
 
-def main():
-    input_file = 'shandong_chemical_addresses.txt'
-    output_file = 'shandong_chemical_plants.csv'
-    
-    # Parse the file to extract company information
-    companies = parse_addresses_file(input_file)
-    
-    # Add test data validation
+def echo_companies(companies):
+    """Print each company as it streams past (test data validation)."""
     for company in companies:
         print(f"Company: {company['chinese_name']}")
         print(f"Address: {company['address']}")
         print("---")
+        yield company
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a company CSV from the Bing address dump.')
+    parser.add_argument('--input', default='shandong_chemical_addresses.txt')
+    parser.add_argument('--output', default='shandong_chemical_plants.csv')
+    parser.add_argument('--quiet', action='store_true', help='Do not print every company')
+    args = parser.parse_args()
+    output_file = args.output
+    
+    # Parse the file to extract company information, one company at a time
+    companies = parse_addresses_file(args.input)
+    
+    # Add test data validation
+    if not args.quiet:
+        companies = echo_companies(companies)
     
-    # Write to CSV
+    # Write to CSV as companies are parsed
     count = write_csv(companies, output_file)
     
     print(f"\nSuccessfully created {output_file} with {count} companies")
@@ -0,0 +1,331 @@
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from address_normalize import dedup_key
+
+# --- Constants ---
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+# Default limits for the Google Geocoding API (hard quota is 50 QPS per project)
+DEFAULT_REQUESTS_PER_SECOND = 10
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+
+# Geocode cache defaults: successful lookups live long, negative ones are retried
+# occasionally, and hard API errors (REQUEST_DENIED etc.) are retried soon
+DEFAULT_CACHE_TTL = 180 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 30 * 24 * 3600
+DEFAULT_ERROR_TTL = 24 * 3600
+DEFAULT_CACHE_MAX_ENTRIES = 100000
+
+# Statuses that describe the quota or the network rather than the address itself
+TRANSIENT_STATUSES = {'OVER_QUERY_LIMIT', 'ERROR'}
+
+
+def normalize_address(address):
+    """
+    Build the cache key for an address: address_normalize.dedup_key, so
+    spellings that differ only in punctuation, short or former division
+    names, zone-name variants or the room after the house number share
+    one entry.
+    """
+    return dedup_key(address)
+
+
+class GeocodeCache:
+    """
+    SQLite-backed geocode cache keyed by normalized address.
+
+    Stores coordinates together with the API status so that ZERO_RESULTS and
+    permanent errors are not re-requested on every run. Entries expire after a
+    status-dependent TTL, and the least recently used entries are evicted once
+    the cache grows past max_entries.
+
+    Parameters:
+    path (str): SQLite database file
+    ttl (float): Lifetime in seconds of OK entries
+    negative_ttl (float): Lifetime in seconds of ZERO_RESULTS entries
+    error_ttl (float): Lifetime in seconds of other non-transient error entries
+    max_entries (int): Maximum number of cached addresses
+    """
+
+    def __init__(self, path, ttl=DEFAULT_CACHE_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 error_ttl=DEFAULT_ERROR_TTL, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                key TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_accessed ON geocode_cache (accessed_at)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+
+    def _ttl_for(self, status):
+        if status == 'OK':
+            return self.ttl
+        if status == 'ZERO_RESULTS':
+            return self.negative_ttl
+        return self.error_ttl
+
+    def get(self, address):
+        """
+        Look up an address.
+
+        Returns:
+        tuple or None: (latitude, longitude, status) if a fresh entry exists, else None.
+        """
+        key = normalize_address(address)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT lat, lon, status, created_at FROM geocode_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[3] > self._ttl_for(row[2]):
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE geocode_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0], row[1], row[2]
+
+    def put(self, address, lat, lon, status):
+        """Store a lookup result. Transient statuses (quota, network) are not cached."""
+        if status in TRANSIENT_STATUSES:
+            return
+        key = normalize_address(address)
+        now = time.time()
+        with self.lock:
+            existed = self.conn.execute("SELECT 1 FROM geocode_cache WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, lat, lon, status, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, status, now, now)
+            )
+            if not existed:
+                self.size += 1
+            if self.size > self.max_entries:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop expired entries first, then the least recently used down to 90% capacity
+        now = time.time()
+        for status_clause, ttl in (("status = 'OK'", self.ttl),
+                                   ("status = 'ZERO_RESULTS'", self.negative_ttl),
+                                   ("status NOT IN ('OK', 'ZERO_RESULTS')", self.error_ttl)):
+            self.conn.execute(f"DELETE FROM geocode_cache WHERE {status_clause} AND created_at < ?", (now - ttl,))
+        self.size = self.conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        target = int(self.max_entries * 0.9)
+        if self.size > target:
+            self.conn.execute(
+                "DELETE FROM geocode_cache WHERE key IN "
+                "(SELECT key FROM geocode_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (self.size - target,)
+            )
+            self.size = target
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(f"Geocode cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+              f"{self.size} entries in {self.path}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to cap the request rate across workers.
+
+    Parameters:
+    rate (float): Tokens added per second (the sustained requests-per-second limit)
+    capacity (int): Maximum burst size; defaults to one second's worth of tokens
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeocodingEngine:
+    """
+    Concurrent geocoder for the Google Maps Geocoding API.
+
+    Requests share one keep-alive Session, are spread over a thread pool capped
+    at max_workers, and are paced by a token bucket. OVER_QUERY_LIMIT responses
+    are retried with exponential backoff and jitter.
+
+    Parameters:
+    api_key (str): Google Maps API key
+    requests_per_second (float): Sustained request rate across all workers
+    max_workers (int): Maximum number of requests in flight
+    max_retries (int): Retries per address on OVER_QUERY_LIMIT or network errors
+    backoff (float): Base backoff delay in seconds, doubled after each retry
+    base_url (str): Geocoding endpoint (overridable for local stub servers)
+    cache (GeocodeCache): Optional cache consulted before every request
+    refresh (bool): Skip cache reads and always call the API (results still refresh the cache)
+    """
+
+    def __init__(self, api_key, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 max_workers=DEFAULT_MAX_WORKERS, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, base_url=GEOCODE_URL, cache=None, refresh=False):
+        self.api_key = api_key
+        self.cache = cache
+        self.refresh = refresh
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.bucket = TokenBucket(requests_per_second)
+
+        # Connection pool sized to the worker count so every worker keeps its socket alive
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def lookup(self, address):
+        """
+        Geocode a single address through the cache (unless refreshing), retrying on OVER_QUERY_LIMIT.
+
+        Parameters:
+        address (str): The address to geocode.
+
+        Returns:
+        tuple: (latitude, longitude, status). Coordinates are None unless status is 'OK'.
+        """
+        if self.cache is not None and not self.refresh:
+            cached = self.cache.get(address)
+            if cached is not None:
+                return cached
+
+        lat, lon, status = self._request(address)
+        if self.cache is not None:
+            self.cache.put(address, lat, lon, status)
+        return lat, lon, status
+
+    def _request(self, address):
+        params = {
+            'address': address,
+            'key': self.api_key
+        }
+        status = 'ERROR'
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=10)
+                response.raise_for_status()
+                results = response.json()
+                status = results['status']
+
+                if status == 'OK':
+                    location = results['results'][0]['geometry']['location']
+                    return location['lat'], location['lng'], status
+                if status == 'ZERO_RESULTS':
+                    print(f"Warning: Geocoding API found no results for address: '{address}'")
+                    return None, None, status
+                if status != 'OVER_QUERY_LIMIT':
+                    # REQUEST_DENIED, INVALID_REQUEST etc. will not improve on retry
+                    print(f"Warning: Geocoding API error for address '{address}'. Status: {status}. Message: {results.get('error_message', 'N/A')}")
+                    return None, None, status
+
+            except requests.exceptions.RequestException as e:
+                status = 'ERROR'
+                print(f"Error during Geocoding API request for '{address}': {e}")
+            except Exception as e:
+                print(f"Error processing geocoding result for '{address}': {e}")
+                return None, None, 'ERROR'
+
+            if attempt < self.max_retries:
+                delay = self.backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+        print(f"Warning: Giving up on '{address}' after {self.max_retries + 1} attempts. Status: {status}")
+        return None, None, status
+
+    def geocode_many(self, addresses, progress_every=10, on_result=None):
+        """
+        Geocode many addresses concurrently.
+
+        Parameters:
+        addresses (iterable): Addresses to geocode; duplicates are looked up once
+        progress_every (int): Print progress after this many completed lookups
+        on_result (callable): Called as on_result(address, result) in the calling
+                              thread as each lookup completes (e.g. to checkpoint it)
+
+        Returns:
+        dict: address -> (latitude, longitude, status)
+        """
+        unique = list(dict.fromkeys(addresses))
+        results = {}
+        if not unique:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.lookup, address): address for address in unique}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    address = futures[future]
+                    results[address] = future.result()
+                    if on_result is not None:
+                        on_result(address, results[address])
+                    if progress_every and done % progress_every == 0:
+                        print(f"Geocoded {done}/{len(unique)} addresses...")
+            except BaseException:
+                # Ctrl-C or a failing callback: drop the queued lookups instead of waiting for them
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return results
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
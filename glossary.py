@@ -0,0 +1,325 @@
+"""
+Offline company-name translation by longest-match glossary segmentation.
+
+Most Shandong chemical company names are built from a small vocabulary:
+place names (山东, 淄博, 临淄 ...), industry terms (化工, 石化, 新材料 ...)
+and legal forms (集团, 股份有限公司 ...). A character trie built from the
+glossary splits each name into the longest known terms; whatever is left
+(usually the brand, e.g. 齐翔腾达) is an unmatched segment. Brands are
+romanized rather than translated (齐翔腾达 -> Qixiang Tengda, 兖矿 ->
+Yankuang), so when pypinyin is installed the unmatched segments of two or
+more characters are rendered offline in pinyin. A name with an unmatched
+segment that cannot be rendered that way (a single character left between
+glossary terms, or any segment without pypinyin) goes to the network
+translator whole: a brand translated on its own, out of context, reads badly
+next to the glossary words around it.
+"""
+import re
+
+from translation import DEFAULT_BATCH_SIZE, translate_texts
+
+# Whole-name translations that take precedence over the glossary
+OVERRIDES = {
+    "万华化学集团股份有限公司": "Wanhua Chemical Group Co., Ltd.",
+    "山东东明化学集团有限公司": "Shandong Dongming Chemical Group Co., Ltd.",
+    "利华益集团股份有限公司": "Liwayee Group Co., Ltd.",
+    "万达控股集团股份有限公司": "Wanda Holdings Group Co., Ltd.",
+}
+
+# Province, prefecture-level cities and regional names
+PLACE_NAMES = {
+    "山东": "Shandong", "齐鲁": "Qilu", "胶东": "Jiaodong",
+    "鲁西": "Luxi", "鲁西南": "Luxinan", "鲁北": "Lubei", "鲁南": "Lunan", "鲁中": "Luzhong",
+    "济南": "Jinan", "青岛": "Qingdao", "淄博": "Zibo", "枣庄": "Zaozhuang", "东营": "Dongying",
+    "烟台": "Yantai", "潍坊": "Weifang", "济宁": "Jining", "泰安": "Tai'an", "威海": "Weihai",
+    "日照": "Rizhao", "临沂": "Linyi", "德州": "Dezhou", "聊城": "Liaocheng", "滨州": "Binzhou",
+    "菏泽": "Heze", "莱芜": "Laiwu",
+}
+
+# County-level cities, counties and districts (ambiguous ones such as 市中 are left out)
+COUNTY_NAMES = {
+    # Jinan
+    "历下": "Lixia", "槐荫": "Huaiyin", "天桥": "Tianqiao", "历城": "Licheng", "长清": "Changqing",
+    "章丘": "Zhangqiu", "济阳": "Jiyang", "钢城": "Gangcheng", "平阴": "Pingyin", "商河": "Shanghe",
+    # Qingdao
+    "黄岛": "Huangdao", "崂山": "Laoshan", "李沧": "Licang", "城阳": "Chengyang", "即墨": "Jimo",
+    "胶州": "Jiaozhou", "平度": "Pingdu", "莱西": "Laixi",
+    # Zibo
+    "张店": "Zhangdian", "淄川": "Zichuan", "博山": "Boshan", "临淄": "Linzi", "周村": "Zhoucun",
+    "桓台": "Huantai", "高青": "Gaoqing", "沂源": "Yiyuan",
+    # Zaozhuang
+    "薛城": "Xuecheng", "峄城": "Yicheng", "台儿庄": "Tai'erzhuang", "山亭": "Shanting", "滕州": "Tengzhou",
+    # Dongying
+    "河口": "Hekou", "垦利": "Kenli", "利津": "Lijin", "广饶": "Guangrao",
+    # Yantai
+    "芝罘": "Zhifu", "福山": "Fushan", "牟平": "Muping", "莱山": "Laishan", "蓬莱": "Penglai",
+    "龙口": "Longkou", "莱阳": "Laiyang", "莱州": "Laizhou", "招远": "Zhaoyuan", "栖霞": "Qixia",
+    "海阳": "Haiyang",
+    # Weifang
+    "潍城": "Weicheng", "寒亭": "Hanting", "坊子": "Fangzi", "奎文": "Kuiwen", "青州": "Qingzhou",
+    "诸城": "Zhucheng", "寿光": "Shouguang", "安丘": "Anqiu", "高密": "Gaomi", "昌邑": "Changyi",
+    "临朐": "Linqu", "昌乐": "Changle",
+    # Jining
+    "任城": "Rencheng", "兖州": "Yanzhou", "曲阜": "Qufu", "邹城": "Zoucheng", "微山": "Weishan",
+    "鱼台": "Yutai", "金乡": "Jinxiang", "嘉祥": "Jiaxiang", "汶上": "Wenshang", "泗水": "Sishui",
+    "梁山": "Liangshan",
+    # Tai'an
+    "岱岳": "Daiyue", "新泰": "Xintai", "肥城": "Feicheng", "宁阳": "Ningyang", "东平": "Dongping",
+    # Weihai
+    "环翠": "Huancui", "文登": "Wendeng", "荣成": "Rongcheng", "乳山": "Rushan",
+    # Rizhao
+    "东港": "Donggang", "岚山": "Lanshan", "五莲": "Wulian", "莒县": "Juxian",
+    # Linyi
+    "兰山": "Lanshan", "罗庄": "Luozhuang", "沂南": "Yinan", "郯城": "Tancheng", "沂水": "Yishui",
+    "兰陵": "Lanling", "费县": "Feixian", "平邑": "Pingyi", "莒南": "Junan", "蒙阴": "Mengyin",
+    "临沭": "Linshu",
+    # Dezhou
+    "德城": "Decheng", "陵城": "Lingcheng", "乐陵": "Laoling", "禹城": "Yucheng", "宁津": "Ningjin",
+    "庆云": "Qingyun", "临邑": "Linyi", "齐河": "Qihe", "夏津": "Xiajin", "武城": "Wucheng",
+    # Liaocheng
+    "东昌府": "Dongchangfu", "茌平": "Chiping", "临清": "Linqing", "阳谷": "Yanggu", "莘县": "Shenxian",
+    "东阿": "Dong'e", "冠县": "Guanxian", "高唐": "Gaotang",
+    # Binzhou
+    "滨城": "Bincheng", "沾化": "Zhanhua", "惠民": "Huimin", "阳信": "Yangxin", "无棣": "Wudi",
+    "博兴": "Boxing", "邹平": "Zouping",
+    # Heze
+    "定陶": "Dingtao", "曹县": "Caoxian", "单县": "Shanxian", "成武": "Chengwu", "巨野": "Juye",
+    "郓城": "Yuncheng", "鄄城": "Juancheng", "东明": "Dongming",
+}
+
+# Industry terms and legal forms, rendered the way the translated CSVs already have them
+INDUSTRY_TERMS = {
+    "股份有限公司": "Co., Ltd.", "有限责任公司": "Co., Ltd.", "有限公司": "Co., Ltd.",
+    "分公司": "Branch", "集团": "Group", "控股": "Holdings", "股份": "",
+    "化工": "Chemical", "化学": "Chemical", "化学工业": "Chemical Industry", "精细化工": "Fine Chemical",
+    "石化": "Petrochemical", "石油化工": "Petrochemical", "石油": "Petroleum", "炼化": "Refining & Chemical",
+    "煤化工": "Coal Chemical", "盐化工": "Salt Chemical", "氯碱": "Chlor-Alkali", "天然气": "Natural Gas",
+    "化肥": "Fertilizer", "肥业": "Fertilizer", "农药": "Pesticide", "农化": "Agrochemical",
+    "制药": "Pharmaceutical", "医药": "Pharmaceutical", "药业": "Pharmaceutical",
+    "生物": "Biological", "生物化工": "Biochemical", "生物科技": "Biotechnology",
+    "新材料": "New Materials", "材料": "Materials", "塑料": "Plastics", "塑胶": "Plastics",
+    "橡胶": "Rubber", "化纤": "Chemical Fiber", "纺织": "Textile", "染料": "Dye", "涂料": "Coatings",
+    "助剂": "Additives", "日化": "Daily Chemical", "树脂": "Resin", "硅业": "Silicon", "盐业": "Salt",
+    "科技": "Technology", "技术": "Technology", "新能源": "New Energy", "能源": "Energy",
+    "环保": "Environmental Protection", "工程": "Engineering", "生态": "Ecological",
+    "实业": "Industrial", "工业": "Industry", "贸易": "Trading", "投资": "Investment",
+    "发展": "Development", "开发": "Development", "国际": "International", "中国": "China",
+    "工业园": "Industrial Park", "开发区": "Development Zone", "经济开发区": "Economic Development Zone",
+    "化工厂": "Chemical Plant",
+    "机械": "Machinery", "设备": "Equipment", "装备": "Equipment", "制造": "Manufacturing",
+    "产品": "Products", "制品": "Products", "原料": "Raw Materials", "建材": "Building Materials",
+    "仪器": "Instruments", "油脂": "Oils", "日用": "Daily", "销售": "Sales", "交易": "Trading",
+    "市场": "Market", "研究院": "Research Institute", "研究所": "Research Institute", "中心": "Center",
+    "燃气": "Gas", "码头": "Terminal", "港务": "Port", "物流": "Logistics", "仓储": "Storage",
+    "海洋": "Ocean", "联合": "United",
+    "化工品": "Chemicals", "石油化工厂": "Petrochemical Plant", "总厂": "General Factory",
+    "有机": "Organic", "液体": "Liquid", "燃料": "Fuel", "油气": "Oil & Gas", "油田": "Oilfield",
+    "机电": "Electromechanical", "配件": "Parts", "储运": "Storage & Transportation",
+    "进出口": "Import & Export", "管理": "Management", "高新": "High-Tech", "碱业": "Alkali",
+    "第一": "First", "第二": "Second", "第三": "Third",
+}
+
+# Brackets are kept; the spaces the join puts inside them are removed again
+PUNCTUATION = {"(": "(", ")": ")", "（": "(", "）": ")"}
+
+# 省, 市, 县 and 区 are only dropped as the suffix of a place name (山东省, 淄博市,
+# 无棣县); on their own, single characters would split brand names wherever they occur
+DIVISION_SUFFIXES = {
+    "山东省": "Shandong",
+    **{f"{place}市": english for place, english in PLACE_NAMES.items()},
+    **{f"{place}{suffix}": english for place, english in COUNTY_NAMES.items()
+       for suffix in ("市", "县", "区") if not place.endswith(suffix)},
+}
+
+GLOSSARY = {**PLACE_NAMES, **COUNTY_NAMES, **DIVISION_SUFFIXES, **INDUSTRY_TERMS, **PUNCTUATION}
+
+# Shortest unmatched segment romanized offline; a single leftover character is
+# more often a word the glossary lacks than a brand
+MIN_ROMANIZED_LENGTH = 2
+
+HAN_RUN_PATTERN = re.compile(r"[\u4e00-\u9fff]+")
+
+
+def _pinyin():
+    """pypinyin's lazy_pinyin when it is installed, otherwise None."""
+    try:
+        from pypinyin import lazy_pinyin
+        return lazy_pinyin
+    except ImportError:
+        return None
+
+
+def _pinyin_words(syllables):
+    # Brands are written as two-syllable words (Qixiang Tengda); a brand of up to three
+    # syllables is one word (Yankuang, Jinzhengda), and an odd one leads with three
+    if len(syllables) <= 3:
+        sizes = [len(syllables)]
+    else:
+        sizes = [3] * (len(syllables) % 2) + [2] * (len(syllables) // 2 - len(syllables) % 2)
+    words = []
+    start = 0
+    for size in sizes:
+        word = syllables[start]
+        for syllable in syllables[start + 1:start + size]:
+            # Ji'an, not Jian: a syllable starting with a, o or e is marked off
+            word += ("'" if syllable[:1] in "aoe" else "") + syllable
+        words.append(word.capitalize())
+        start += size
+    return words
+
+
+class GlossaryTranslator:
+    """
+    Longest-match segmentation of company names against a glossary trie.
+
+    Parameters:
+    glossary (dict): Chinese term -> English rendering ("" drops the term)
+    overrides (dict): Whole-name translations checked first
+    romanize (bool): Render unmatched segments in pinyin (needs pypinyin)
+    """
+
+    def __init__(self, glossary=GLOSSARY, overrides=OVERRIDES, romanize=True):
+        self.overrides = dict(overrides)
+        self.pinyin = _pinyin() if romanize else None
+        # Segment -> pinyin; pypinyin is far slower than the trie, and brands repeat
+        self.romanized = {}
+        # Character trie; the None key holds the English rendering of a complete term
+        self.trie = {}
+        for term, english in glossary.items():
+            node = self.trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[None] = english
+
+    def segment(self, name):
+        """
+        Split a name into glossary terms and unmatched runs.
+
+        Returns:
+            list: (text, english) pairs; english is None for unmatched runs
+        """
+        segments = []
+        unmatched_start = None
+        i = 0
+        length = len(name)
+        while i < length:
+            # Longest glossary term starting at i
+            node = self.trie
+            match_end = None
+            english = None
+            j = i
+            while j < length:
+                node = node.get(name[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node:
+                    match_end, english = j, node[None]
+            if match_end is None:
+                if unmatched_start is None:
+                    unmatched_start = i
+                i += 1
+                continue
+            if unmatched_start is not None:
+                segments.append((name[unmatched_start:i], None))
+                unmatched_start = None
+            segments.append((name[i:match_end], english))
+            i = match_end
+        if unmatched_start is not None:
+            segments.append((name[unmatched_start:], None))
+        return segments
+
+    def romanize(self, text):
+        """
+        Pinyin rendering of an unmatched segment.
+
+        Returns:
+            str or None: None without pypinyin or for a segment shorter than MIN_ROMANIZED_LENGTH
+        """
+        if self.pinyin is None or len(text) < MIN_ROMANIZED_LENGTH:
+            return None
+        if text in self.romanized:
+            return self.romanized[text]
+        words = []
+        position = 0
+        for run in HAN_RUN_PATTERN.finditer(text):
+            words.append(text[position:run.start()].strip())
+            words.extend(_pinyin_words(self.pinyin(run.group(), v_to_u=True)))
+            position = run.end()
+        words.append(text[position:].strip())
+        self.romanized[text] = " ".join(word for word in words if word)
+        return self.romanized[text]
+
+    def covers(self, name):
+        """True if the name is overridden or every part of it is a glossary term or can be romanized."""
+        return self.translate(name, keep_unmatched=False) is not None
+
+    def translate(self, name, keep_unmatched=True):
+        """
+        Translate one name.
+
+        Args:
+            name (str): Chinese company name
+            keep_unmatched (bool): Keep unmatched runs that cannot be romanized in
+                                   Chinese; if False, return None for such names
+
+        Returns:
+            str or None: English name
+        """
+        if name in self.overrides:
+            return self.overrides[name]
+        words = []
+        for text, english in self.segment(name):
+            if english is None:
+                english = self.romanize(text)
+            if english is None:
+                if not keep_unmatched:
+                    return None
+                english = text
+            if english:
+                words.append(english.strip())
+        return " ".join(words).replace("( ", "(").replace(" )", ")")
+
+
+def translate_names(names, translator=None, backend=None, cache=None, batch_size=DEFAULT_BATCH_SIZE,
+                    on_translated=None):
+    """
+    Translate company names offline where the glossary (and pinyin for brands) covers them,
+    and the rest whole through the backend.
+
+    Parameters:
+    names (iterable): Chinese company names; empty strings and duplicates are dropped
+    translator (GlossaryTranslator): Segmenter (default glossary when None)
+    backend: Network translator with translate_batch(list) -> list, or None for offline only
+    cache (TranslationCache): Optional persistent memo for the network translations
+    batch_size (int): Names sent per backend call
+    on_translated (callable): Called with {name: English name} for the offline names
+                              and after every backend batch, so callers can
+                              checkpoint while the backend is still working
+
+    Returns:
+    dict: name -> English name, for the names that were translated
+    """
+    translator = translator or GlossaryTranslator()
+    unique = [name for name in dict.fromkeys(names) if name]
+    translations = {}
+    pending = []
+    for name in unique:
+        english = translator.translate(name, keep_unmatched=False)
+        if english is None:
+            pending.append(name)
+        else:
+            translations[name] = english
+    if on_translated is not None and translations:
+        on_translated(dict(translations))
+
+    def on_batch(fresh):
+        translations.update(fresh)
+        if on_translated is not None:
+            on_translated(fresh)
+
+    if pending and backend is not None:
+        translate_texts(pending, backend, cache, batch_size, on_batch=on_batch)
+    print(f"Glossary: {len(unique)} names, {len(unique) - len(pending)} translated offline, "
+          f"{len(pending)} sent whole to the translator, {len(translations)} names translated")
+    return translations
@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+
+# Page content that means the engine is pushing back rather than answering
+BLOCK_MARKERS = [
+    # Baidu verification wall
+    "百度安全验证",
+    "wappass.baidu.com",
+    "网络不给力，请稍后重试",
+    # Bing challenge page
+    "/challenge/verify",
+    "verify you are a human",
+    "请解决以下难题以继续",
+]
+
+# Default AIMD parameters, in requests per minute
+DEFAULT_INITIAL_RATE = 8.0     # ~7.5 s between queries, the middle of the old 5-10 s window
+DEFAULT_MIN_RATE = 0.5         # never slower than one query every 2 minutes
+DEFAULT_MAX_RATE = 30.0        # never faster than one query every 2 seconds
+DEFAULT_INCREASE = 0.5         # additive increase per clean response
+DEFAULT_DECREASE = 0.5         # multiplicative decrease on a block
+
+
+class BlockedError(Exception):
+    """Raised when a results page is a captcha or verification page."""
+
+
+def detect_block(page_source):
+    """
+    Check whether a page is a captcha / verification wall.
+
+    Args:
+        page_source (str): Page HTML or text
+
+    Returns:
+        str or None: The marker that matched, or None for a normal page
+    """
+    if not page_source:
+        return None
+    lowered = page_source.lower()
+    for marker in BLOCK_MARKERS:
+        if marker.lower() in lowered:
+            return marker
+    return None
+
+
+class AdaptiveRateController:
+    """
+    AIMD pacing for search queries.
+
+    Every clean response raises the rate by a fixed step; every block halves
+    it (or multiplies by `decrease`). wait() sleeps for the current interval
+    with a little jitter. The current rate is logged so the limits can be
+    tuned towards the highest sustainable throughput.
+
+    Args:
+        name (str): Label used in log lines (e.g. "baidu worker 0")
+        initial_rate (float): Starting rate in requests per minute
+        min_rate (float): Lower bound in requests per minute
+        max_rate (float): Upper bound in requests per minute
+        increase (float): Requests per minute added after each clean response
+        decrease (float): Factor applied to the rate after a block
+        log_every (int): Log the rate after this many clean responses
+    """
+
+    def __init__(self, name, initial_rate=DEFAULT_INITIAL_RATE, min_rate=DEFAULT_MIN_RATE,
+                 max_rate=DEFAULT_MAX_RATE, increase=DEFAULT_INCREASE, decrease=DEFAULT_DECREASE,
+                 log_every=10):
+        self.name = name
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.log_every = log_every
+        self.successes = 0
+        self.blocks = 0
+        self.lock = threading.Lock()
+
+    @property
+    def delay(self):
+        return 60.0 / self.rate
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self.successes += 1
+            if self.log_every and self.successes % self.log_every == 0:
+                self.log("steady")
+
+    def on_block(self, reason=""):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.blocks += 1
+            self.log(f"blocked{': ' + reason if reason else ''}")
+
+    def log(self, event):
+        print(f"[pacing {self.name}] {event} -> rate {self.rate:.1f} req/min "
+              f"(delay {self.delay:.1f} s, {self.successes} clean, {self.blocks} blocks)")
+
+    def wait(self):
+        """Sleep for the current interval, with +/-20% jitter."""
+        delay = self.delay
+        time.sleep(random.uniform(delay * 0.8, delay * 1.2))
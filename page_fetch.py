@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Constants ---
+DEFAULT_TIMEOUT = 15
+DEFAULT_POOL_SIZE = 8
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+FetchResult = namedtuple('FetchResult', ['url', 'html', 'status', 'not_modified', 'elapsed', 'bytes'])
+
+
+class PageCache:
+    """
+    SQLite store of fetched pages and their validators (ETag / Last-Modified).
+
+    The validators are sent back as If-None-Match / If-Modified-Since on the
+    next fetch, and the stored body is reused when the server answers 304.
+
+    Parameters:
+    path (str): SQLite database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        """
+        Returns:
+        tuple or None: (etag, last_modified, body) for a previously fetched URL.
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT etag, last_modified, body FROM page_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(self, url, etag, last_modified, body):
+        """Record a full download; the body is stored only when the server sent a validator."""
+        with self.lock:
+            self.misses += 1
+            if not (etag or last_modified):
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO page_cache (url, etag, last_modified, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time())
+            )
+            self.conn.commit()
+
+    def touch(self, url):
+        """Record a 304 for a cached URL."""
+        with self.lock:
+            self.conn.execute("UPDATE page_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+            self.hits += 1
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(f"Page cache: {self.hits} not modified, {self.misses} downloaded ({hit_rate:.1f}% unchanged) "
+              f"in {self.path}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class StaticFetcher:
+    """
+    Plain HTTP page fetcher: one keep-alive Session with a pooled adapter and,
+    when a PageCache is given, conditional requests.
+
+    Parameters:
+    cache (PageCache): Optional validator/body store for conditional requests
+    pool_size (int): Connections kept alive per host
+    timeout (float): Per-request timeout in seconds
+    user_agent (str): User-Agent header sent with every request
+    """
+
+    def __init__(self, cache=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 user_agent=DEFAULT_USER_AGENT):
+        self.cache = cache
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url):
+        """
+        GET a page, revalidating against the cache when possible.
+
+        Returns:
+        FetchResult: html is the cached body when not_modified is True.
+        Raises requests.exceptions.RequestException on network errors and HTTP
+        error statuses.
+        """
+        cached = self.cache.get(url) if self.cache is not None else None
+        headers = {}
+        if cached:
+            etag, last_modified, _body = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        start = time.monotonic()
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        elapsed = time.monotonic() - start
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(url)
+            return FetchResult(url, cached[2], 304, True, elapsed, 0)
+
+        response.raise_for_status()
+        # Chinese sites often omit the charset; don't let requests fall back to ISO-8859-1
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            response.encoding = response.apparent_encoding
+        html = response.text
+
+        if self.cache is not None:
+            self.cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), html)
+        return FetchResult(url, html, response.status_code, False, elapsed, len(response.content))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
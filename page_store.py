@@ -0,0 +1,150 @@
+"""
+Compressed, content-addressed store of search-engine results pages.
+
+Every page is gzip-compressed and written once under objects/ by the
+SHA-256 of its HTML, so identical pages share one blob. A SQLite index maps
+(engine, query) to the digest of the latest page, together with the company
+the query was for. reextract() re-runs an extractor over the stored pages in
+a process pool, so extraction rules can be improved without a browser.
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# --- Constants ---
+PAGE_STORE_DIR = "serp_cache"
+INDEX_FILE = "index.sqlite"
+COMPRESS_LEVEL = 6
+
+
+class PageStore:
+    """
+    Content-addressed page store with a SQLite index keyed by engine + query.
+
+    Parameters:
+    directory (str): Root directory holding objects/ and the index
+    """
+
+    def __init__(self, directory=PAGE_STORE_DIR):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.stored = 0
+        self.deduplicated = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                engine TEXT NOT NULL,
+                query TEXT NOT NULL,
+                company TEXT,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (engine, query)
+            )
+        """)
+        self.conn.commit()
+
+    def blob_path(self, digest):
+        return blob_path(self.directory, digest)
+
+    def put(self, engine, query, company, html):
+        """
+        Store a results page and point (engine, query) at it.
+
+        Returns:
+        str: SHA-256 digest of the page
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        duplicate = os.path.exists(path)
+        if not duplicate:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp name: two threads may store the same page at once
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(data, COMPRESS_LEVEL))
+            os.replace(tmp_path, path)
+        with self.lock:
+            # Counters are shared by the scraper's worker threads
+            if duplicate:
+                self.deduplicated += 1
+            else:
+                self.stored += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (engine, query, company, digest, size, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (engine, query, company, digest, len(data), time.time())
+            )
+            self.conn.commit()
+        return digest
+
+    def get(self, engine, query):
+        """Latest stored HTML for an engine + query, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest FROM pages WHERE engine = ? AND query = ?", (engine, query)
+            ).fetchone()
+        return load_page(self.directory, row[0]) if row else None
+
+    def entries(self, engine):
+        """
+        Returns:
+        list: (company, query, digest) for every stored page of an engine, oldest first.
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT company, query, digest FROM pages WHERE engine = ? ORDER BY fetched_at", (engine,)
+            ).fetchall()
+
+    def report(self):
+        print(f"Page store: {self.stored} pages stored, {self.deduplicated} already present, in {self.directory}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def blob_path(directory, digest):
+    return os.path.join(directory, "objects", digest[:2], digest[2:] + ".html.gz")
+
+
+def load_page(directory, digest):
+    with open(blob_path(directory, digest), "rb") as f:
+        return gzip.decompress(f.read()).decode("utf-8")
+
+
+def _extract_stored(directory, extractor, digest):
+    # Runs in a worker process: only the digest crosses the process boundary, not the page
+    return extractor(load_page(directory, digest))
+
+
+def reextract(store, engine, extractor, workers=None):
+    """
+    Re-run an extractor over every stored page of an engine, in a process pool.
+
+    Args:
+        store (PageStore): The page store
+        engine (str): "baidu" or "bing"
+        extractor (callable): Module-level function taking the page HTML
+        workers (int): Worker processes (default: CPU count)
+
+    Returns:
+        list: (company, query, extractor result) in the order the pages were fetched
+    """
+    entries = store.entries(engine)
+    if not entries:
+        return []
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(entries) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(partial(_extract_stored, store.directory, extractor),
+                                [digest for _company, _query, digest in entries], chunksize=chunksize)
+        return [(company, query, result) for (company, query, _digest), result in zip(entries, results)]
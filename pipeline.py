@@ -0,0 +1,410 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# --- Constants ---
+CHECKPOINT_DIR = '.pipeline_checkpoints'
+STATE_FILE = 'state.json'
+
+
+def _checkpoint_format():
+    """Parquet when pyarrow is available, otherwise pickle (still binary, keeps dtypes)."""
+    try:
+        import pyarrow  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        return 'pickle'
+
+
+def input_hashes(df, columns):
+    """
+    Content hash of each row's input columns, computed column-wise.
+
+    Returns:
+    Series: Decimal strings (text survives a CSV round trip; uint64 with gaps would not)
+    """
+    values = df.reindex(columns=columns).fillna('').astype(str)
+    return pd.util.hash_pandas_object(values, index=False).astype(str)
+
+
+class RowDelta:
+    """
+    Per-row change tracking for one enrichment stage.
+
+    Each enriched row stores the hash its input columns had when the stage
+    last processed it. A row is stale when its current hash differs, so
+    editing one address re-geocodes one row, and a fresh extract only
+    processes the companies that are new or changed.
+
+    Parameters:
+    hash_column (str): Column holding the stored input hash
+    input_columns (list): Columns the stage reads
+    output_columns (list): Columns the stage writes (copied by carry_over)
+    """
+
+    def __init__(self, hash_column, input_columns, output_columns):
+        self.hash_column = hash_column
+        self.input_columns = list(input_columns)
+        self.output_columns = list(output_columns)
+
+    def stored(self, df):
+        if self.hash_column not in df.columns:
+            return pd.Series('', index=df.index, dtype=object)
+        return df[self.hash_column].fillna('').astype(str)
+
+    def stale(self, df, enriched=None):
+        """
+        Rows whose inputs changed since the stage last processed them.
+
+        Parameters:
+        df (DataFrame): Data to check; stamped in place for adopted rows
+        enriched (Series): Rows that already have output; rows without a stored
+                           hash (files written before hashes existed) are adopted
+                           as up to date instead of being re-processed
+
+        Returns:
+        Series: Boolean mask of stale rows
+        """
+        current = input_hashes(df, self.input_columns)
+        stored = self.stored(df)
+        if enriched is not None:
+            adopt = (stored == '') & enriched
+            if adopt.any():
+                stored = stored.where(~adopt, current)
+                df[self.hash_column] = stored
+        return stored != current
+
+    def unfinished(self, df):
+        """
+        Rows with input that the stage has not processed in their current form
+        (new, changed, or failed the last time).
+
+        Returns:
+        int: Number of such rows
+        """
+        has_input = (df.reindex(columns=self.input_columns).fillna('').astype(str) != '').any(axis=1)
+        return int((has_input & (self.stored(df) != input_hashes(df, self.input_columns))).sum())
+
+    def mark(self, df, rows):
+        """Record the current input hash for rows the stage has just processed (in place)."""
+        current = input_hashes(df.loc[rows], self.input_columns)
+        df[self.hash_column] = self.stored(df)
+        df.loc[rows, self.hash_column] = current
+
+    def carry_over(self, new_df, old_df):
+        """
+        Copy outputs from old_df into the rows of new_df whose inputs are unchanged.
+        Rows of old_df without a stored hash (files written before hashes
+        existed) match on their current inputs if they have any output.
+
+        Returns:
+        tuple: (DataFrame, number of rows carried over)
+        """
+        if not len(new_df):
+            return new_df, 0
+        stored = self.stored(old_df)
+        # Rows written before hashes existed: if they have output, it was made from their current inputs
+        outputs = old_df.reindex(columns=self.output_columns)
+        has_output = (outputs.notna() & (outputs.astype(str) != '')).any(axis=1)
+        legacy = (stored == '') & has_output
+        if legacy.any():
+            stored = stored.where(~legacy, input_hashes(old_df, self.input_columns))
+        old = old_df.assign(**{self.hash_column: stored})[stored != '']
+        old = old.drop_duplicates(self.hash_column, keep='last').set_index(self.hash_column)
+        current = input_hashes(new_df, self.input_columns)
+        matched = current.isin(old.index)
+        if not matched.any():
+            return new_df, 0
+        new_df = new_df.copy()
+        for column in self.output_columns:
+            carried = current.map(old[column]) if column in old.columns else pd.Series(pd.NA, index=new_df.index)
+            existing = new_df[column] if column in new_df.columns else pd.Series(pd.NA, index=new_df.index)
+            # Build a fresh column so the dtype can change (an empty float column receiving text)
+            new_df[column] = carried.where(matched, existing)
+        new_df[self.hash_column] = current.where(matched, self.stored(new_df))
+        return new_df, int(matched.sum())
+
+    def resume(self, df, rows, journal):
+        """
+        Apply journaled results to rows whose current input hash has one (in place).
+
+        Returns:
+        Index: The rows that were resumed from the journal
+        """
+        current = input_hashes(df.loc[rows], self.input_columns)
+        resumed = current[current.map(journal.contains)]
+        if len(resumed):
+            values = pd.DataFrame([journal.get(row_hash) for row_hash in resumed], index=resumed.index)
+            for column in values.columns:
+                column_values = values[column]
+                if column in df.columns:
+                    column_values = column_values.astype(df[column].dtype)
+                df.loc[resumed.index, column] = column_values
+            self.mark(df, resumed.index)
+        return resumed.index
+
+
+class StageJournal:
+    """
+    Side-car result log that makes a stage resumable row by row.
+
+    Every processed row appends one JSON line (its input hash and output
+    values) that is flushed at once and fsync'd at most every sync_interval
+    seconds, so a crash, Ctrl-C or exhausted quota loses only the batch in
+    flight instead of every paid call made so far, without rewriting the
+    CSV per row. On open the log is replayed and rewritten without torn or
+    superseded lines (temp file, then rename). Records are keyed by input
+    hash, so they stay valid however the rows are reordered, and a row whose
+    input changed simply finds no record.
+
+    Parameters:
+    path (str): Journal file (JSONL)
+    sync_interval (float): Minimum seconds between fsyncs (0 syncs every append)
+    """
+
+    def __init__(self, path, sync_interval=1.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.last_sync = time.monotonic()
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.records = self._replay()
+        self._rewrite()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                records[record['hash']] = record['values']
+        return records
+
+    def _rewrite(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row_hash, values in self.records.items():
+                f.write(json.dumps({'hash': row_hash, 'values': values}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self.records)
+
+    def contains(self, row_hash):
+        return row_hash in self.records
+
+    def get(self, row_hash):
+        return self.records[row_hash]
+
+    def append_many(self, items):
+        """Durably record (input hash, {column: value}) pairs."""
+        lines = []
+        for row_hash, values in items:
+            self.records[row_hash] = values
+            lines.append(json.dumps({'hash': row_hash, 'values': values}, ensure_ascii=False) + '\n')
+        if not lines:
+            return
+        with self.lock:
+            self.file.write(''.join(lines))
+            self.file.flush()
+            if time.monotonic() - self.last_sync >= self.sync_interval:
+                os.fsync(self.file.fileno())
+                self.last_sync = time.monotonic()
+
+    def reset(self):
+        """Forget every record (used when a stage is forced to re-run all rows)."""
+        with self.lock:
+            self.file.close()
+            self.records = {}
+            self._rewrite()
+            self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Stage:
+    """
+    One in-memory pipeline step.
+
+    Parameters:
+    name (str): Stage name, used for checkpoint files and progress output
+    func (callable): Takes the current DataFrame (None for the first stage) and
+                     returns the new DataFrame, or False on failure
+    required (bool): Abort the pipeline if this stage fails; otherwise continue
+                     with the unchanged frame
+    unfinished (callable): Takes the stage's result and returns how many rows it
+                           still has to process (e.g. RowDelta.unfinished); a
+                           stage that leaves rows unfinished is not recorded as
+                           completed, so the next run repeats it
+    """
+
+    def __init__(self, name, func, required=False, unfinished=None):
+        self.name = name
+        self.func = func
+        self.required = required
+        self.unfinished = unfinished
+
+    def run(self, df):
+        return self.func(df)
+
+
+class Pipeline:
+    """
+    Runs stages over a DataFrame held in memory, checkpointing after each stage.
+
+    After every successful stage the frame is written to the checkpoint
+    directory in a binary format, so dtypes survive and nothing is re-parsed.
+    On the next run the pipeline resumes after the last completed stage, as
+    long as the fingerprint (e.g. input file size and mtime) is unchanged.
+    A stage that failed or left rows unfinished is not completed: the next
+    run starts again from it.
+
+    Parameters:
+    stages (list): Stage objects in execution order
+    checkpoint_dir (str): Directory for checkpoints and the state file
+    fingerprint (dict): JSON-serializable description of the inputs; a change discards old checkpoints
+    """
+
+    def __init__(self, stages, checkpoint_dir=CHECKPOINT_DIR, fingerprint=None):
+        self.stages = stages
+        self.checkpoint_dir = checkpoint_dir
+        self.fingerprint = fingerprint or {}
+        self.format = _checkpoint_format()
+
+    def _state_path(self):
+        return os.path.join(self.checkpoint_dir, STATE_FILE)
+
+    def _checkpoint_path(self, index, stage):
+        extension = 'parquet' if self.format == 'parquet' else 'pkl'
+        return os.path.join(self.checkpoint_dir, f"{index}_{stage.name}.{extension}")
+
+    def _load_state(self):
+        try:
+            with open(self._state_path(), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if state.get('fingerprint') != self.fingerprint or state.get('format') != self.format:
+            return None
+        return state
+
+    def _save_state(self, completed):
+        state = {'fingerprint': self.fingerprint, 'format': self.format, 'completed': completed}
+        tmp_path = self._state_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._state_path())
+
+    def _stop_completing(self, completed):
+        # Later stages may still run, but resuming must start at the current one again.
+        # Truncate the state file to the completed prefix, so an entry left over from an
+        # earlier run (e.g. one started with force_from) cannot skip the current stage.
+        if completed is not None:
+            self._save_state(completed)
+        return None
+
+    def _write_checkpoint(self, index, stage, df):
+        path = self._checkpoint_path(index, stage)
+        tmp_path = path + '.tmp'
+        if self.format == 'parquet':
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _read_checkpoint(self, index, stage):
+        path = self._checkpoint_path(index, stage)
+        if self.format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def resume_point(self, force_from=None):
+        """
+        Work out where to start.
+
+        Parameters:
+        force_from (str): Name of a stage that must re-run, together with everything after it
+
+        Returns:
+        int: Number of leading stages whose results can be reused from checkpoints
+        """
+        state = self._load_state()
+        if state is None:
+            return 0
+        completed = state.get('completed', [])
+        start = 0
+        for index, stage in enumerate(self.stages):
+            if index >= len(completed) or completed[index] != stage.name:
+                break
+            if stage.name == force_from:
+                break
+            if not os.path.exists(self._checkpoint_path(index, stage)):
+                break
+            start = index + 1
+        return start
+
+    def run(self, force_from=None):
+        """
+        Run the pipeline.
+
+        Parameters:
+        force_from (str): Name of the earliest stage to re-run regardless of checkpoints
+
+        Returns:
+        DataFrame or False: The final frame, or False if a required stage failed
+        """
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        start = self.resume_point(force_from)
+
+        df = None
+        completed = [stage.name for stage in self.stages[:start]]
+        if start > 0:
+            df = self._read_checkpoint(start - 1, self.stages[start - 1])
+            print(f"Resuming after stage '{self.stages[start - 1].name}' from checkpoint ({len(df)} rows)")
+
+        for index in range(start, len(self.stages)):
+            stage = self.stages[index]
+            print(f"\n--- Stage {index + 1}/{len(self.stages)}: {stage.name} ---")
+            result = stage.run(df)
+
+            if result is False or result is None:
+                completed = self._stop_completing(completed)
+                if stage.required or df is None:
+                    print(f"Stage '{stage.name}' failed. Exiting pipeline.")
+                    return False
+                print(f"Stage '{stage.name}' failed. Continuing with the previous data...")
+                continue
+
+            df = result
+            left = stage.unfinished(df) if stage.unfinished is not None else 0
+            if left:
+                print(f"Stage '{stage.name}' left {left} rows unfinished; it runs again on the next run.")
+                completed = self._stop_completing(completed)
+            if completed is not None:
+                self._write_checkpoint(index, stage, df)
+                completed.append(stage.name)
+                self._save_state(completed)
+
+        return df
@@ -0,0 +1,397 @@
+"""
+Hedged address resolution: each company is sent to every configured engine
+at once, the first answer that passes the address-quality check wins, and
+the slower engines are cancelled.
+
+Engines are adapters with a name and a search(company, cancel) method that
+returns an address string (or None) and raises BlockedError on a captcha
+page. Each engine runs on its own single-thread executor, so a Selenium
+driver is only ever touched by one thread. A browser query that is already
+loading cannot be interrupted; cancelling makes the adapter skip its
+remaining waits and discard the result, and stops queued work from starting.
+
+FakeEngine stands in for the real engines so the race can be run offline:
+    python resolver.py --fake --limit 50
+"""
+import argparse
+import csv
+import importlib.util
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from company_store import load_table
+from pacing import AdaptiveRateController, BlockedError
+
+# --- Constants ---
+INPUT_FILE = "shandong_chemical_plant_list.csv"
+OUTPUT_FILE = "resolved_addresses.csv"
+
+# Give up on a company if no engine has produced an acceptable address by then
+DEFAULT_TIMEOUT = 60.0
+
+# An acceptable address names an administrative unit or a street-level feature
+QUALITY_MARKERS = ("省", "市", "县", "区", "镇", "路", "街", "号", "开发区", "工业园")
+NOT_FOUND_VALUES = {"", "address not found", "error"}
+MIN_ADDRESS_LENGTH = 6
+MAX_ADDRESS_LENGTH = 120
+
+
+class Cancelled(Exception):
+    """Raised inside an adapter when another engine already won the race."""
+
+
+def address_quality(address):
+    """
+    Check whether an engine's answer looks like a usable Shandong address.
+
+    Returns:
+        bool: True if the address is long enough, has an address marker and
+              does not name another province
+    """
+    if address is None:
+        return False
+    address = address.strip()
+    if address.lower() in NOT_FOUND_VALUES:
+        return False
+    if not MIN_ADDRESS_LENGTH <= len(address) <= MAX_ADDRESS_LENGTH:
+        return False
+    if "省" in address and "山东" not in address:
+        return False
+    return any(marker in address for marker in QUALITY_MARKERS)
+
+
+class SeleniumEngine:
+    """
+    Base for browser-backed engines: a lazily started driver plus AIMD pacing
+    between queries. The pacing wait ends early when the query is cancelled.
+    """
+
+    name = None
+
+    def __init__(self, controller=None):
+        self.controller = controller or AdaptiveRateController(self.name)
+        self.driver = None
+        self.last_query = 0.0
+
+    def create_driver(self):
+        raise NotImplementedError
+
+    def query(self, company):
+        raise NotImplementedError
+
+    def search(self, company, cancel):
+        # Keep the engine's own query spacing, but stop waiting once the race is decided
+        delay = self.last_query + self.controller.delay - time.monotonic()
+        if delay > 0 and cancel.wait(delay):
+            raise Cancelled()
+        if cancel.is_set():
+            raise Cancelled()
+        if self.driver is None:
+            self.driver = self.create_driver()
+        self.last_query = time.monotonic()
+        try:
+            address = self.query(company)
+        except BlockedError as e:
+            self.controller.on_block(str(e))
+            raise
+        self.controller.on_success()
+        return address
+
+    def close(self):
+        if self.driver is not None:
+            from browser import quit_driver
+            quit_driver(self.driver).report(f"{self.name} pages")
+            self.driver = None
+
+
+class BaiduEngine(SeleniumEngine):
+    name = "baidu"
+
+    def __init__(self, controller=None, store=None):
+        super().__init__(controller)
+        self.store = store
+
+    def create_driver(self):
+        import baidu_scrape
+        return baidu_scrape.create_driver(baidu_scrape.USER_AGENTS[0])
+
+    def query(self, company):
+        import baidu_scrape
+        address, selector = baidu_scrape.search_company(self.driver, company, store=self.store)
+        return address if selector else None
+
+
+def _load_bing_module():
+    # bing-web-scrape.py is not importable by name because of the hyphens
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bing-web-scrape.py")
+    spec = importlib.util.spec_from_file_location("bing_web_scrape", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class BingEngine(SeleniumEngine):
+    name = "bing"
+
+    def __init__(self, controller=None, store=None):
+        super().__init__(controller)
+        self.store = store
+        self.bing = _load_bing_module()
+
+    def create_driver(self):
+        from browser import create_driver
+        return create_driver(window_size=(1920, 1080))
+
+    def query(self, company):
+        result = self.bing.search_company_address_bing(self.driver, company, store=self.store)
+        if result["blocked"]:
+            raise BlockedError(result["blocked"])
+        return result["address"]
+
+
+class CsvEngine:
+    """
+    Third source: addresses already known from a company table (e.g. the zctpt.com list).
+
+    Parameters:
+    path (str): Company table (CSV export or store path)
+    name_column (str): Column holding the company name
+    address_column (str): Column holding the address
+    """
+
+    name = "csv"
+
+    def __init__(self, path, name_column="Chinese Name", address_column="Address"):
+        df = load_table(path, columns=[name_column, address_column])
+        self.addresses = dict(zip(df[name_column], df[address_column]))
+
+    def search(self, company, cancel):
+        return self.addresses.get(company) or None
+
+    def close(self):
+        pass
+
+
+class FakeEngine:
+    """
+    Offline stand-in for benchmarks and tests: answers after a random latency
+    with a synthetic address, a miss, or a block.
+
+    Parameters:
+    name (str): Engine name used in the statistics
+    latency (tuple): (min, max) seconds per query
+    miss_rate (float): Probability of returning no address
+    block_rate (float): Probability of raising BlockedError
+    seed (int): Random seed
+    """
+
+    def __init__(self, name, latency=(0.05, 0.2), miss_rate=0.2, block_rate=0.0, seed=0):
+        self.name = name
+        self.latency = latency
+        self.miss_rate = miss_rate
+        self.block_rate = block_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def search(self, company, cancel):
+        with self.lock:
+            self.calls += 1
+            latency = self.random.uniform(*self.latency)
+            outcome = self.random.random()
+        if cancel.wait(latency):
+            raise Cancelled()
+        if outcome < self.block_rate:
+            raise BlockedError("fake block")
+        if outcome < self.block_rate + self.miss_rate:
+            return None
+        return f"山东省{self.name}市测试路{len(company)}号"
+
+    def close(self):
+        pass
+
+
+class EngineStats:
+    def __init__(self):
+        self.queries = 0
+        self.wins = 0
+        self.misses = 0
+        self.rejected = 0
+        self.blocked = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.latencies = []
+
+
+class HedgedResolver:
+    """
+    Race every engine for each company and keep the first acceptable answer.
+
+    Parameters:
+    engines (list): Engine adapters
+    timeout (float): Seconds to wait for an acceptable answer per company
+    quality_check (callable): Predicate deciding whether an address is acceptable
+    """
+
+    def __init__(self, engines, timeout=DEFAULT_TIMEOUT, quality_check=address_quality):
+        self.engines = engines
+        self.timeout = timeout
+        self.quality_check = quality_check
+        self.executors = {engine.name: ThreadPoolExecutor(max_workers=1) for engine in engines}
+        self.stats = {engine.name: EngineStats() for engine in engines}
+        self.lock = threading.Lock()
+
+    def _run(self, engine, company, cancel):
+        stats = self.stats[engine.name]
+        start = time.monotonic()
+        try:
+            address = engine.search(company, cancel)
+        except Cancelled:
+            with self.lock:
+                stats.cancelled += 1
+            raise
+        except BlockedError:
+            with self.lock:
+                stats.blocked += 1
+            raise
+        except Exception:
+            with self.lock:
+                stats.errors += 1
+            raise
+        latency = time.monotonic() - start
+        with self.lock:
+            stats.queries += 1
+            stats.latencies.append(latency)
+        return address, latency
+
+    def resolve(self, company):
+        """
+        Returns:
+            dict: company, address, engine (winner or None), latency, and every
+                  engine's answer that arrived before the race was decided
+        """
+        cancel = threading.Event()
+        start = time.monotonic()
+        futures = {self.executors[engine.name].submit(self._run, engine, company, cancel): engine.name
+                   for engine in self.engines}
+        answers = {}
+        winner = None
+        pending = set(futures)
+        while pending and winner is None:
+            remaining = self.timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    address, _latency = future.result()
+                except Exception:
+                    continue
+                answers[name] = address
+                if not address:
+                    with self.lock:
+                        self.stats[name].misses += 1
+                elif not self.quality_check(address):
+                    with self.lock:
+                        self.stats[name].rejected += 1
+                elif winner is None:
+                    winner = name
+
+        # Decide the race: queued queries never start, running ones bail out at their next check
+        cancel.set()
+        for future in pending:
+            if future.cancel():
+                with self.lock:
+                    self.stats[futures[future]].cancelled += 1
+
+        if winner is not None:
+            with self.lock:
+                self.stats[winner].wins += 1
+        return {
+            "company": company,
+            "address": answers[winner] if winner else None,
+            "engine": winner,
+            "latency": time.monotonic() - start,
+            "answers": answers,
+        }
+
+    def report(self, resolved):
+        print("\n============ ENGINE RACE ============")
+        total = max(1, resolved)
+        for name, stats in self.stats.items():
+            latencies = sorted(stats.latencies)
+            if latencies:
+                mean = sum(latencies) / len(latencies)
+                median = latencies[len(latencies) // 2]
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                latency_text = f"latency mean {mean:.2f} s, median {median:.2f} s, p95 {p95:.2f} s"
+            else:
+                latency_text = "no completed queries"
+            print(f"{name}: {stats.wins} wins ({stats.wins / total * 100:.1f}%), {stats.queries} answered, "
+                  f"{stats.misses} misses, {stats.rejected} rejected, {stats.blocked} blocked, {stats.errors} errors, "
+                  f"{stats.cancelled} cancelled; {latency_text}")
+
+    def close(self):
+        for engine in self.engines:
+            self.executors[engine.name].shutdown(wait=True)
+            engine.close()
+
+
+def write_resolved(results, output_file):
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Company", "Address", "Engine", "Latency"])
+        for result in results:
+            writer.writerow([result["company"], result["address"] or "address not found",
+                             result["engine"] or "", f"{result['latency']:.2f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resolve company addresses by racing several search engines.')
+    parser.add_argument('--input', default=INPUT_FILE, help='CSV with a Company column')
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--engines', default='baidu,bing', help='Comma-separated engines: baidu, bing')
+    parser.add_argument('--third-source-csv', metavar='CSV',
+                        help='Also race a lookup in this CSV (Chinese Name / Address columns)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='Seconds to wait for an acceptable address per company')
+    parser.add_argument('--fake', action='store_true', help='Race offline fake engines instead of browsers')
+    parser.add_argument('--limit', type=int, help='Only resolve the first N companies')
+    args = parser.parse_args()
+
+    df = load_table(args.input)
+    if "Company" not in df.columns:
+        raise ValueError("The input CSV must contain a column named 'Company'")
+    companies = list(dict.fromkeys(df["Company"].tolist()))[:args.limit]
+
+    if args.fake:
+        engines = [FakeEngine("baidu", latency=(0.05, 0.3), miss_rate=0.25, block_rate=0.05, seed=1),
+                   FakeEngine("bing", latency=(0.1, 0.25), miss_rate=0.15, seed=2)]
+    else:
+        available = {"baidu": BaiduEngine, "bing": BingEngine}
+        engines = [available[name.strip()]() for name in args.engines.split(",") if name.strip()]
+    if args.third_source_csv:
+        engines.append(CsvEngine(args.third_source_csv))
+
+    resolver = HedgedResolver(engines, args.timeout)
+    results = []
+    try:
+        for company in companies:
+            result = resolver.resolve(company)
+            print(f"{company} --> {result['address']} ({result['engine'] or 'no engine'}, "
+                  f"{result['latency']:.1f} s)")
+            results.append(result)
+    finally:
+        resolver.close()
+        write_resolved(results, args.output)
+
+    resolver.report(len(results))
+    print(f"Saved {len(results)} companies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
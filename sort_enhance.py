@@ -1,86 +1,162 @@
 import pandas as pd
-import time
 import sys
 import os
-import requests
-import json
-import numpy as np
+
+from address_normalize import normalize_addresses
+from company_schema import apply_schema, strip_quotes, text_column
+from company_store import ensure_store, load_table, load_top_n, modified_time, save_table
+from gazetteer import geocode_offline, needs_street_level
+from geocoding import GeocodeCache, GeocodingEngine
+from glossary import GlossaryTranslator, translate_names
+from pipeline import CHECKPOINT_DIR, Pipeline, RowDelta, Stage, StageJournal, input_hashes
+from translation import DEFAULT_BATCH_SIZE, GoogleTranslateBackend, TranslationCache
 
 # --- Constants ---
 # Assume the address column name is 'Address'. 
 # !!! IMPORTANT: Change this if your CSV uses a different column name !!!
 ADDRESS_COLUMN = 'Address' 
 
+# Prepended to addresses sent to the Geocoding API that do not name the province
+PROVINCE_NAME = '山东省'
+
+# Where geocode_dataframe records how precise each row's coordinates are
+PRECISION_COLUMN = 'Geocode Precision'
+
 # Delay between API calls in seconds to avoid hitting rate limits
 GEOCODE_DELAY = 0.1 
 
-def extract_largest_companies(input_file, output_file, num_companies=200, force_extract=False):
+# Concurrent geocoding limits (requests per second across all workers, and max in-flight requests)
+GEOCODE_RATE_LIMIT = 1 / GEOCODE_DELAY
+GEOCODE_MAX_WORKERS = 8
+
+# Engines shared by get_lat_long calls, by (API key, cache)
+_LOOKUP_ENGINES = {}
+
+# On-disk geocode cache shared across runs and CSV files
+GEOCODE_CACHE_FILE = 'geocode_cache.sqlite'
+
+# On-disk translation memo shared across runs and CSV files
+TRANSLATION_CACHE_FILE = 'translation_cache.sqlite'
+
+# Per-row input hashes: a stage only re-processes rows whose inputs changed since it last ran on them
+TRANSLATE_DELTA = RowDelta('Translate Input Hash', ['Chinese Name'], ['English Name'])
+GEOCODE_DELTA = RowDelta('Geocode Input Hash', [ADDRESS_COLUMN], ['Latitude', 'Longitude', PRECISION_COLUMN])
+ROW_DELTAS = (TRANSLATE_DELTA, GEOCODE_DELTA)
+
+# Side-car per-row result logs (in the checkpoint directory) that let an interrupted stage resume exactly
+TRANSLATE_JOURNAL = 'translate_journal.jsonl'
+GEOCODE_JOURNAL = 'geocode_journal.jsonl'
+
+def output_is_current(input_file, output_file):
+    """True if output_file's table exists and is not older than input_file's (or input_file is gone)."""
+    output_time = modified_time(output_file)
+    if output_time is None:
+        return False
+    input_time = modified_time(input_file)
+    return input_time is None or input_time <= output_time
+
+
+def extract_dataframe(input_file, output_file, num_companies=200, force_extract=False,
+                      sort_by='Registered Capital (RMB)', ascending=False):
     """
-    Extract the largest companies by registered capital from a CSV file
-    and save them to a new CSV file. Skip if output file already exists.
+    Load the largest companies into memory: reuse output_file if it exists
+    and is newer than input_file, otherwise take the top rows out of
+    input_file's memory-mapped store (company_store). Rows whose Chinese name or address are unchanged take their
+    translation and coordinates from the previous output_file, so only new
+    or edited companies reach the translate and geocode stages. Companies
+    tied on the ranking column keep their input order, so at a tie on the
+    cut-off the earlier rows are kept. Nothing is written.
     
     Parameters:
-    input_file (str): Path to the input CSV file
-    output_file (str): Path to the output CSV file
+    input_file (str): Input table (CSV export or store path)
+    output_file (str): Previously extracted table (CSV export or store path)
     num_companies (int): Number of largest companies to extract
     force_extract (bool): Whether to extract even if output file exists
+    sort_by (str): Ranking column (defaults to registered capital)
+    ascending (bool): Rank by smallest values instead of largest (e.g. oldest Opening Year)
     
     Returns:
     DataFrame or False: Extracted companies data or False if failed
     """
-    # Check if output file already exists
-    if os.path.exists(output_file) and not force_extract:
+    # Check if output file already exists and is up to date
+    output_exists = modified_time(output_file) is not None
+    input_newer = output_exists and not output_is_current(input_file, output_file)
+    if output_exists and not force_extract and not input_newer:
         print(f"Output file {output_file} already exists. Reading existing data.")
         try:
-            # Read existing data, ensuring correct types for lat/lon if they exist
-            dtype_spec = {}
-            # Check if lat/lon columns exist by reading just the header
-            try:
-                header_df = pd.read_csv(output_file, nrows=0)
-                if 'Latitude' in header_df.columns:
-                    dtype_spec['Latitude'] = float
-                if 'Longitude' in header_df.columns:
-                    dtype_spec['Longitude'] = float
-            except Exception:
-                pass # Ignore errors if file is empty or malformed initially
-                
-                return pd.read_csv(output_file, dtype=dtype_spec)
+            return load_table(output_file)
         except Exception as e:
             print(f"Error reading existing file: {e}")
             return False
-        
+    if input_newer and not force_extract:
+        print(f"{input_file} is newer than {output_file}. Extracting again.")
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(input_file)
-        
-        # Check if the required column exists
-        if 'Registered Capital (RMB)' not in df.columns:
-            print("Error: Could not find 'Registered Capital (RMB)' column in the CSV file.")
-            return False
-        
-        # Sort the dataframe by registered capital in descending order
-        sorted_df = df.sort_values(by='Registered Capital (RMB)', ascending=False)
-        
-        # Extract the top companies
-        top_companies = sorted_df.head(num_companies)
-        
-        # Save to a new CSV file
-        top_companies.to_csv(output_file, index=False)
-        
-        print(f"Successfully extracted the {num_companies} largest companies to {output_file}")
-        
-        # Return the dataframe for potential further processing
+        # Rank on the store's capital column alone, then take only the top rows
+        top_companies = load_top_n(input_file, num_companies, sort_by, ascending=ascending)
+        print(f"Successfully extracted the {num_companies} largest companies from {input_file}")
+    except KeyError:
+        print(f"Error: Could not find '{sort_by}' column in {input_file}.")
+        return False
+    except Exception as e:
+        print(f"Error processing the file: {e}")
+        return False
+    
+    # Reuse the enrichment of rows that did not change since the previous output
+    if output_exists:
+        try:
+            previous = load_table(output_file)
+        except Exception as e:
+            print(f"Could not read previous output {output_file} ({e}); enriching every row.")
+            return top_companies
+        for delta in ROW_DELTAS:
+            top_companies, carried = delta.carry_over(top_companies, previous)
+            print(f"Carried over {', '.join(delta.output_columns)} for {carried}/{len(top_companies)} unchanged rows")
+    # Carried-over columns are rebuilt from mixed values; restore their dtypes
+    return apply_schema(top_companies, normalize=False)
+
+
+def extract_largest_companies(input_file, output_file, num_companies=200, force_extract=False,
+                              sort_by='Registered Capital (RMB)', ascending=False):
+    """
+    Extract the largest companies by registered capital from a company table
+    and save them as a new table (store plus CSV export). Skip if the output
+    already exists and is up to date. Only the ranking column and the chosen
+    rows are read from the memory-mapped input store.
+    
+    Parameters:
+    input_file (str): Input table (CSV export or store path)
+    output_file (str): Output table (CSV export or store path)
+    num_companies (int): Number of largest companies to extract
+    force_extract (bool): Whether to extract even if output file exists
+    sort_by (str): Ranking column (defaults to registered capital)
+    ascending (bool): Rank by smallest values instead of largest (e.g. oldest Opening Year)
+    
+    Returns:
+    DataFrame or False: Extracted companies data or False if failed
+    """
+    reuse_existing = output_is_current(input_file, output_file) and not force_extract
+    top_companies = extract_dataframe(input_file, output_file, num_companies, force_extract,
+                                      sort_by=sort_by, ascending=ascending)
+    if top_companies is False or reuse_existing:
         return top_companies
     
+    try:
+        # Save the store and its CSV export
+        save_table(top_companies, output_file)
+        print(f"Saved the {num_companies} largest companies to {output_file}")
+        return top_companies
     except Exception as e:
-        print(f"Error processing the file: {e}")
+        print(f"Error saving {output_file}: {e}")
         return False
 
 
 def setup_translator():
     """
     Set up the translator with the correct googletrans version
+    
+    Returns:
+    GoogleTranslateBackend or None: Batch translator backend, or None if setup failed
     """
     try:
         # First check if googletrans is installed
@@ -104,101 +180,139 @@ def setup_translator():
         from googletrans import Translator
         translator = Translator(service_urls=['translate.google.com'])
         
-        # Test the translator with a simple phrase
-        try:
-            test_result = translator.translate('测试', src='zh-cn', dest='en')
-            print(f"Translator test: '测试' -> '{test_result.text}'")
-            return translator
-        except Exception as e:
-            print(f"Translator test failed: {e}")
-            return None
+        # No live test call here: a broken translator surfaces on the first batch instead
+        return GoogleTranslateBackend(translator)
             
     except Exception as e:
         print(f"Error setting up translator: {e}")
         return None
 
 
-def translate_company_names(csv_file, force_translate=False):
+def translate_dataframe(df, force_translate=False, backend=None,
+                        cache_file=TRANSLATION_CACHE_FILE, batch_size=DEFAULT_BATCH_SIZE,
+                        journal_file=os.path.join(CHECKPOINT_DIR, TRANSLATE_JOURNAL)):
     """
-    Translate Chinese company names to English in the CSV file and update it.
-    Skip if English names already exist.
+    Translate Chinese company names to English in a DataFrame.
+    Only rows whose Chinese name changed since they were last translated
+    (tracked by TRANSLATE_DELTA's per-row input hash) or that were never
+    translated are processed; rows that already had an English name before
+    hashes existed are kept as they are.
+    Names are segmented against the place-name/industry glossary, with
+    brand names romanized in pinyin when pypinyin is installed; names it
+    covers completely are translated offline, and the rest are looked up
+    whole in the persistent translation cache, and only the misses are sent
+    to the backend in batches.
+    Every name is journaled as soon as it is translated, so a run that
+    crashes or is interrupted resumes with exactly the rows it had not
+    finished.
     
     Parameters:
-    csv_file (str): Path to the CSV file containing company data
-    force_translate (bool): Whether to translate even if English names exist
+    df (DataFrame): Company data with a 'Chinese Name' column
+    force_translate (bool): Whether to translate every row, even unchanged ones
+    backend: Translator backend with a translate_batch method (defaults to googletrans)
+    cache_file (str): SQLite translation cache path, or None to disable caching
+    batch_size (int): Number of names sent per backend call
+    journal_file (str): Per-row result journal, or None to disable resuming
+    
+    Returns:
+    DataFrame or False: The translated data (unchanged if skipped) or False if failed
     """
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_file)
-        
         # Check if the required column exists
         if 'Chinese Name' not in df.columns:
-            print("Error: Could not find 'Chinese Name' column in the CSV file.")
+            print("Error: Could not find 'Chinese Name' column in the data.")
             return False
         
-        # Ensure 'English Name' column exists and is of string type
-        if 'English Name' not in df.columns:
-            df['English Name'] = ""
-        
-        # Check if translations already exist
-        if not force_translate and df['English Name'].notna().sum() > 0:
-            print(f"English names already exist in {csv_file}. Skipping translation.")
-            return True
-        
-        # Convert all columns to string to avoid dtype issues
-        for col in df.columns:
-            df[col] = df[col].astype(str)
-        
-        # Where values are 'nan', replace with empty string
-        df.replace('nan', '', inplace=True)
-            
-        print("Setting up translator...")
-        translator = setup_translator()
-        
-        if translator is None:
-            print("Failed to set up translator. Cannot proceed with translation.")
-            return False
+        df = df.copy()
+        
+        # Ensure 'English Name' column exists and is text ("" where missing)
+        df['English Name'] = text_column(df['English Name']) if 'English Name' in df.columns else ""
+        
+        # Rows that need a translation: new or changed names, or all of them when forced
+        has_english = df['English Name'].fillna('').astype(str).str.strip() != ''
+        stale = TRANSLATE_DELTA.stale(df, enriched=has_english)
+        to_translate = df['Chinese Name'].fillna('').astype(str) != ''
+        if not force_translate:
+            to_translate &= stale
+        if not to_translate.any():
+            print("English names are up to date for every row. Skipping translation.")
+            return df
+        print(f"{int(to_translate.sum())} of {len(df)} rows need a translation")
+        
+        # Rows an interrupted run already translated come from the journal
+        journal = StageJournal(journal_file) if journal_file else None
+        if journal is not None:
+            if force_translate:
+                journal.reset()
+            else:
+                resumed = TRANSLATE_DELTA.resume(df, df.index[to_translate], journal)
+                if len(resumed):
+                    print(f"Resumed {len(resumed)} translations from {journal_file}")
+                    to_translate[resumed] = False
+        
+        names = df.loc[to_translate, 'Chinese Name']
+        name_hashes = dict(zip(names, input_hashes(df.loc[to_translate], TRANSLATE_DELTA.input_columns)))
+        
+        def checkpoint(done):
+            if journal is not None:
+                journal.append_many((name_hashes[name], {'English Name': english}) for name, english in done.items())
+        
+        # The network translator is only needed for names the glossary does not cover
+        translator = GlossaryTranslator()
+        if backend is None and not all(map(translator.covers, names.unique())):
+            print("Setting up translator...")
+            backend = setup_translator()
+            if backend is None:
+                print("Failed to set up translator. Only names the glossary covers will be translated.")
             
         print("Starting translation of company names...")
         
-        # Total rows to translate
-        total_rows = len(df)
-        translated_count = 0
+        cache = TranslationCache(cache_file) if cache_file else None
+        try:
+            translations = translate_names(names, translator, backend, cache=cache, batch_size=batch_size,
+                                           on_translated=checkpoint)
+        finally:
+            if journal is not None:
+                journal.close()
+        if cache is not None:
+            cache.report()
+            cache.close()
+        
+        # Write back in one vectorized assignment, keeping existing values where a batch failed
+        translated = df.loc[to_translate, 'Chinese Name'].map(translations)
+        df.loc[to_translate, 'English Name'] = translated.fillna(df.loc[to_translate, 'English Name'])
+        TRANSLATE_DELTA.mark(df, translated.index[translated.notna()])
+        
+        print(f"Successfully added {int(translated.notna().sum())} English translations")
+        return df
         
-        # Process each row individually
-        for i in range(total_rows):
-            chinese_name = df.loc[i, 'Chinese Name']
-            
-            # Skip empty values
-            if chinese_name == '':
-                continue
-                
-            try:
-                # Skip if already has non-empty English name and not forcing translation
-                if not force_translate and df.loc[i, 'English Name'] != '':
-                    continue
-                
-                # Try to translate the name
-                translation = translator.translate(chinese_name, src='zh-cn', dest='en')
-                df.loc[i, 'English Name'] = translation.text
-                
-                # Update progress
-                translated_count += 1
-                if translated_count % 5 == 0:
-                    print(f"Translated {translated_count} company names...")
-                
-                # Small delay to avoid potential rate limiting
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Error translating '{chinese_name}': {e}")
-                # Leave the existing value or empty string
-                if df.loc[i, 'English Name'] == 'nan':
-                    df.loc[i, 'English Name'] = ''
+    except Exception as e:
+        print(f"Error translating company names: {e}")
+        return False
+
+
+def translate_company_names(csv_file, force_translate=False, backend=None,
+                            cache_file=TRANSLATION_CACHE_FILE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Translate Chinese company names to English in a company table and save it (store plus CSV export).
+    Only new or changed names are translated.
+    
+    Parameters:
+    csv_file (str): Path to the CSV file containing company data
+    force_translate (bool): Whether to translate every row, even unchanged ones
+    backend: Translator backend with a translate_batch method (defaults to googletrans)
+    cache_file (str): SQLite translation cache path, or None to disable caching
+    batch_size (int): Number of names sent per backend call
+    """
+    try:
+        df = load_table(csv_file)
+        result = translate_dataframe(df, force_translate, backend, cache_file, batch_size)
+        if result is False:
+            return False
         
         # Save the updated dataframe
-        df.to_csv(csv_file, index=False)
-        print(f"Successfully updated {csv_file} with {translated_count} English translations")
+        save_table(result, csv_file)
+        print(f"Updated {csv_file}")
         return True
         
     except Exception as e:
@@ -206,143 +320,313 @@ def translate_company_names(csv_file, force_translate=False):
         return False
 
 
-def clean_translations(csv_file):
+def clean_dataframe(df):
     """
-    Remove quotation marks from English translations in the CSV file.
+    Remove quotation marks from English translations in a DataFrame, then
+    normalize whitespace and full-width punctuation in the text columns and
+    apply the fixed company schema. Every step is a vectorized column operation.
     
     Parameters:
-    csv_file (str): Path to the CSV file containing company data with translations
+    df (DataFrame): Company data with an 'English Name' column
+    
+    Returns:
+    DataFrame or False: The cleaned data or False if failed
     """
     try:
-        # Read the CSV file
-        print(f"Reading file: {csv_file}")
-        df = pd.read_csv(csv_file)
-        
         # Check if the required column exists
         if 'English Name' not in df.columns:
-            print("Error: Could not find 'English Name' column in the CSV file.")
+            print("Error: Could not find 'English Name' column in the data.")
             return False
         
-        # Count rows with quotation marks
-        quote_count = 0
+        df = apply_schema(df)
+        df['English Name'], quote_count = strip_quotes(df['English Name'])
+        
+        print(f"Successfully cleaned {quote_count} translations")
+        return df
+        
+    except Exception as e:
+        print(f"Error cleaning translations: {e}")
+        return False
+
+
+def clean_translations(csv_file):
+    """
+    Remove quotation marks from English translations in a company table and save it.
+    
+    Parameters:
+    csv_file (str): Path to the CSV file containing company data with translations
+    """
+    try:
+        # Load the table
+        print(f"Reading file: {csv_file}")
+        df = load_table(csv_file)
         
-        # Process each English name
-        for i in range(len(df)):
-            if pd.notna(df.loc[i, 'English Name']):
-                english_name = str(df.loc[i, 'English Name'])
-                
-                # Remove quotation marks if present
-                if english_name.startswith('"') and english_name.endswith('"'):
-                    df.loc[i, 'English Name'] = english_name[1:-1]
-                    quote_count += 1
-                # Also handle single quotes
-                elif english_name.startswith("'") and english_name.endswith("'"):
-                    df.loc[i, 'English Name'] = english_name[1:-1]
-                    quote_count += 1
+        result = clean_dataframe(df)
+        if result is False:
+            return False
         
         # Save the updated dataframe
-        df.to_csv(csv_file, index=False)
-        print(f"Successfully cleaned {quote_count} translations in {csv_file}")
+        save_table(result, csv_file)
+        print(f"Updated {csv_file}")
         return True
         
     except Exception as e:
         print(f"Error cleaning translations: {e}")
         return False
 
-def get_lat_long(address, api_key):
+def _lookup_engine(api_key, cache):
+    """The engine get_lat_long shares across calls for this key and cache (one pool and rate limit)."""
+    key = (api_key, id(cache))
+    engine = _LOOKUP_ENGINES.get(key)
+    if engine is None:
+        engine = GeocodingEngine(api_key, requests_per_second=GEOCODE_RATE_LIMIT, max_workers=1,
+                                 max_retries=0, cache=cache)
+        _LOOKUP_ENGINES[key] = engine
+    return engine
+
+
+def get_lat_long(address, api_key, cache=None, engine=None):
     """
     Geocode an address using Google Maps Geocoding API.
     
     Parameters:
     address (str): The address to geocode.
     api_key (str): Your Google Maps API key.
+    cache (GeocodeCache): Optional cache consulted before calling the API.
+    engine (GeocodingEngine): Engine to look the address up with; by default
+                              one engine per key and cache is shared by all calls,
+                              so calls reuse its connections and its rate limit.
     
     Returns:
     tuple: (latitude, longitude) or (None, None) if failed.
     """
-    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        'address': address,
-        'key': api_key
-    }
-    
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-        
-        results = response.json()
-        
-        if results['status'] == 'OK':
-            location = results['results'][0]['geometry']['location']
-            return location['lat'], location['lng']
-        elif results['status'] == 'ZERO_RESULTS':
-            print(f"Warning: Geocoding API found no results for address: '{address}'")
-            return None, None
-        else:
-            # Log other potential errors like OVER_QUERY_LIMIT, REQUEST_DENIED, INVALID_REQUEST
-            print(f"Warning: Geocoding API error for address '{address}'. Status: {results['status']}. Message: {results.get('error_message', 'N/A')}")
-            return None, None
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Error during Geocoding API request for '{address}': {e}")
-        return None, None
-    except Exception as e:
-        print(f"Error processing geocoding result for '{address}': {e}")
-        return None, None
+    if engine is None:
+        engine = _lookup_engine(api_key, cache)
+    lat, lon, _status = engine.lookup(address)
+    return lat, lon
+
 
+def _fan_out(df, row_keys, values_by_key):
+    """
+    Write one (latitude, longitude, precision) per address key to every row with that key (in place).
 
-def geocode_addresses(csv_file, force_geocode=False):
+    Returns:
+    Index: The rows written
     """
-    Add latitude and longitude to the CSV file using Google Maps Geocoding API.
-    Skips if Latitude/Longitude columns exist and have data, unless force_geocode is True.
+    keys = row_keys[row_keys.isin(values_by_key.keys())]
+    if keys.empty:
+        return keys.index
+    table = pd.DataFrame.from_dict(values_by_key, orient='index', columns=['Latitude', 'Longitude', PRECISION_COLUMN])
+    for column in table.columns:
+        # Cast to the column's dtype, so the text and float columns keep their schema dtype
+        df.loc[keys.index, column] = keys.map(table[column]).astype(df[column].dtype)
+    return keys.index
+
+
+def geocode_dataframe(df, force_geocode=False, requests_per_second=None, max_workers=None,
+                      cache_file=GEOCODE_CACHE_FILE, use_gazetteer=True,
+                      journal_file=os.path.join(CHECKPOINT_DIR, GEOCODE_JOURNAL)):
+    """
+    Add latitude and longitude to a DataFrame.
+    Only rows without coordinates, or whose address changed since they were
+    last geocoded (tracked by GEOCODE_DELTA's per-row input hash), are
+    processed unless force_geocode is True.
+    Rows are grouped by normalized address, so each distinct address is
+    resolved once and its coordinates are fanned out to every row sharing it;
+    the API is sent the address of the group's first row, not the normalized key.
+    Addresses that stop at the county or town are resolved offline from the
+    bundled gazetteer; only addresses naming a road or house number (or that
+    the gazetteer cannot place) go to the Google Maps Geocoding API, concurrently
+    through a pooled, rate-limited GeocodingEngine.
+    The 'Geocode Precision' column records province/city/county/town for offline
+    results, street for street-level API results and network for other API results.
+    Each successful API lookup is journaled as it completes, so an
+    interrupted run (crash, Ctrl-C, exhausted quota) resumes without
+    repeating the lookups it already paid for.
     
     Parameters:
-    csv_file (str): Path to the CSV file.
-    force_geocode (bool): Whether to geocode even if lat/lon data exists.
+    df (DataFrame): Company data with an address column.
+    force_geocode (bool): Whether to geocode every row, even unchanged ones,
+                          with fresh API lookups (the cache is refreshed, not read).
+    requests_per_second (float): Rate limit across workers (defaults to GEOCODE_RATE_LIMIT).
+    max_workers (int): Maximum concurrent requests (defaults to GEOCODE_MAX_WORKERS).
+    cache_file (str): SQLite geocode cache path, or None to disable caching.
+    use_gazetteer (bool): Resolve county/town-level addresses offline.
+    journal_file (str): Per-row result journal, or None to disable resuming.
     
     Returns:
-    bool: True if successful or skipped, False otherwise.
+    DataFrame or False: The geocoded data (unchanged if skipped) or False if failed.
     """
-    # --- 1. Get API Key ---
+    # --- 1. Check Columns ---
+    # Check if address column exists
+    if ADDRESS_COLUMN not in df.columns:
+        print(f"Error: Address column '{ADDRESS_COLUMN}' not found.")
+        print("Please ensure the address column name is correct (check ADDRESS_COLUMN constant).")
+        return False
+
+    df = df.copy()
+
+    # Add Latitude/Longitude columns if they don't exist
+    if 'Latitude' not in df.columns:
+        df['Latitude'] = pd.NA # Use pandas NA for missing floats
+    if 'Longitude' not in df.columns:
+        df['Longitude'] = pd.NA
+    if PRECISION_COLUMN not in df.columns:
+        df[PRECISION_COLUMN] = ''
+        
+    # Ensure correct data types (float for coordinates)
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    df[PRECISION_COLUMN] = df[PRECISION_COLUMN].fillna('').astype(str)
+
+    # --- 2. Identify Rows to Geocode ---
+    # Rows that need geocoding: Latitude is missing, the address changed, OR force_geocode is True
+    has_coordinates = df['Latitude'].notna()
+    needs_geocoding = ~has_coordinates | GEOCODE_DELTA.stale(df, enriched=has_coordinates)
+    if not force_geocode and not needs_geocoding.any():
+        print("Latitude/Longitude data is up to date for all entries. Skipping geocoding.")
+        return df
+        
+    rows_to_process_indices = df.index[needs_geocoding | force_geocode]
+
+    # Rows an interrupted run already geocoded come from the journal
+    journal = StageJournal(journal_file) if journal_file else None
+    resumed = pd.Index([])
+    if journal is not None:
+        if force_geocode:
+            journal.reset()
+        else:
+            resumed = GEOCODE_DELTA.resume(df, rows_to_process_indices, journal)
+            if len(resumed):
+                print(f"Resumed {len(resumed)} geocoded rows from {journal_file}")
+                rows_to_process_indices = rows_to_process_indices.difference(resumed)
+    total_to_geocode = len(rows_to_process_indices)
+    
+    if total_to_geocode == 0:
+         print("No addresses need geocoding.")
+         if journal is not None:
+             journal.close()
+         return df
+
+    print(f"Starting geocoding for {total_to_geocode} addresses...")
+    
+    # --- 3. Normalize and Group Addresses ---
+    # Vectorized cleanup, then each distinct address is parsed once. Rows whose
+    # addresses share a dedup key (same divisions, park, road and number once
+    # variant spellings are folded) are resolved once and the result fanned out
+    normalized = normalize_addresses(df.loc[rows_to_process_indices, ADDRESS_COLUMN])
+    empty = normalized['key'] == ''
+    for index in normalized.index[empty]:
+        print(f"Skipping row {index}: Empty address.")
+    row_keys = normalized.loc[~empty, 'key']
+    groups = row_keys.groupby(row_keys, sort=False).groups
+    if groups:
+        print(f"{len(row_keys)} rows share {len(groups)} normalized addresses "
+              f"(dedup ratio {len(row_keys) / len(groups):.2f}:1, {len(row_keys) - len(groups)} lookups saved)")
+
+    # --- 4. Resolve County/Town-Level Addresses Offline ---
+    resolved_offline = 0
+    pending = list(groups)
+    if use_gazetteer:
+        offline = geocode_offline(pending)
+        resolved = _fan_out(df, row_keys, {key: (match.latitude, match.longitude, match.precision)
+                                           for key, match in offline.items()})
+        GEOCODE_DELTA.mark(df, resolved)
+        resolved_offline = len(resolved)
+        pending = [key for key in pending if key not in offline]
+        breakdown = ", ".join(f"{count} {precision}"
+                              for precision, count in df.loc[resolved, PRECISION_COLUMN].value_counts().items())
+        print(f"Resolved {len(offline)} addresses ({resolved_offline} rows) offline from the gazetteer"
+              f"{f' ({breakdown})' if breakdown else ''}; {len(pending)} need the Geocoding API.")
+
+    if not pending:
+        if journal is not None:
+            journal.close()
+        return df
+
+    # --- 5. Get API Key ---
     api_key = os.environ.get('GOOGLE_API_KEY')
     if not api_key:
         print("Error: GOOGLE_API_KEY environment variable not set.")
         print("Please set the GOOGLE_API_KEY environment variable with your Google Maps API key.")
         # Example for bash/zsh: export GOOGLE_API_KEY='YOUR_API_KEY_HERE'
         # Example for GitHub Codespaces: Add it as a secret named GOOGLE_API_KEY
-        return False
-        
-    # --- 2. Read CSV and Check Columns ---
+        # Keep the offline and resumed results; the remaining rows are retried on the next run
+        if journal is not None:
+            journal.close()
+        return df if resolved_offline or len(resumed) else False
+
+    # --- 6. Geocode Each Unique Address Concurrently ---
+    api_rows = row_keys[row_keys.isin(pending)]
+    hashes = input_hashes(df.loc[api_rows.index], GEOCODE_DELTA.input_columns)
+
+    # The API gets a real address, not the dedup key: the first row's address of each
+    # group, with "山东省" prepended if not present
+    queries = {}
+    for key in pending:
+        address = str(df.loc[groups[key][0], ADDRESS_COLUMN]).strip()
+        queries[address if PROVINCE_NAME in address else PROVINCE_NAME + address] = key
+
+    def api_values(key, result):
+        lat, lon, status = result
+        precision = ('street' if needs_street_level(key) else 'network') if status == 'OK' else ''
+        return lat, lon, precision
+
+    def checkpoint(query, result):
+        if journal is None or result[2] != 'OK':
+            return
+        key = queries[query]
+        lat, lon, precision = api_values(key, result)
+        values = {'Latitude': lat, 'Longitude': lon, PRECISION_COLUMN: precision}
+        journal.append_many((hashes[index], values) for index in groups[key])
+
+    cache = GeocodeCache(cache_file) if cache_file else None
     try:
-        # Read with specific dtypes if columns exist
-        dtype_spec = {}
-        try:
-            header_df = pd.read_csv(csv_file, nrows=0)
-            if 'Latitude' in header_df.columns:
-                dtype_spec['Latitude'] = float
-            if 'Longitude' in header_df.columns:
-                dtype_spec['Longitude'] = float
-        except Exception:
-             pass # Ignore if file doesn't exist or is empty
-
-        df = pd.read_csv(csv_file, dtype=dtype_spec)
-
-        # Check if address column exists
-        if ADDRESS_COLUMN not in df.columns:
-            print(f"Error: Address column '{ADDRESS_COLUMN}' not found in {csv_file}.")
-            print("Please ensure the address column name is correct (check ADDRESS_COLUMN constant).")
-            return False
+        with GeocodingEngine(api_key,
+                             requests_per_second=requests_per_second or GEOCODE_RATE_LIMIT,
+                             max_workers=max_workers or GEOCODE_MAX_WORKERS,
+                             cache=cache, refresh=force_geocode) as engine:
+            results = engine.geocode_many(queries, on_result=checkpoint)
+        results = {queries[query]: result for query, result in results.items()}
+    finally:
+        if journal is not None:
+            journal.close()
+    if cache is not None:
+        cache.report()
+        cache.close()
 
-        # Add Latitude/Longitude columns if they don't exist
-        if 'Latitude' not in df.columns:
-            df['Latitude'] = pd.NA # Use pandas NA for missing floats
-        if 'Longitude' not in df.columns:
-            df['Longitude'] = pd.NA
-            
-        # Ensure correct data types (float for coordinates)
-        df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
-        df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    # Fan each result out to every row with that address; failed rows keep a
+    # stale hash and are retried on the next run
+    ok = {key: api_values(key, result) for key, result in results.items() if result[2] == 'OK'}
+    failed = {key: api_values(key, result) for key, result in results.items() if result[2] != 'OK'}
+    geocoded = _fan_out(df, row_keys, ok)
+    _fan_out(df, row_keys, failed)
+    GEOCODE_DELTA.mark(df, geocoded)
+
+    print(f"Successfully geocoded {len(ok)} of {len(pending)} addresses ({len(geocoded)} rows); "
+          f"{len(pending)} API lookups for {len(api_rows)} rows, {len(api_rows) - len(pending)} saved by address dedup.")
+    return df
 
+
+def geocode_addresses(csv_file, force_geocode=False, requests_per_second=None, max_workers=None,
+                      cache_file=GEOCODE_CACHE_FILE, use_gazetteer=True):
+    """
+    Add latitude and longitude to a company table using Google Maps Geocoding API.
+    Only rows without coordinates or with a changed address are geocoded, unless force_geocode is True.
+    
+    Parameters:
+    csv_file (str): Path to the CSV file.
+    force_geocode (bool): Whether to geocode every row, even unchanged ones, bypassing the cache.
+    requests_per_second (float): Rate limit across workers (defaults to GEOCODE_RATE_LIMIT).
+    max_workers (int): Maximum concurrent requests (defaults to GEOCODE_MAX_WORKERS).
+    cache_file (str): SQLite geocode cache path, or None to disable caching.
+    use_gazetteer (bool): Resolve county/town-level addresses offline.
+    
+    Returns:
+    bool: True if successful or skipped, False otherwise.
+    """
+    try:
+        df = load_table(csv_file)
     except FileNotFoundError:
         print(f"Error: CSV file not found: {csv_file}")
         return False
@@ -350,60 +634,14 @@ def geocode_addresses(csv_file, force_geocode=False):
         print(f"Error reading or preparing CSV file {csv_file}: {e}")
         return False
 
-    # --- 3. Identify Rows to Geocode ---
-    # Rows that need geocoding: EITHER Latitude is missing OR force_geocode is True
-    needs_geocoding = df['Latitude'].isna()
-    if not force_geocode and not needs_geocoding.any():
-        print(f"Latitude/Longitude data already exists for all entries in {csv_file}. Skipping geocoding.")
-        return True
-        
-    rows_to_process_indices = df.index[needs_geocoding | force_geocode]
-    total_to_geocode = len(rows_to_process_indices)
-    
-    if total_to_geocode == 0:
-         print("No addresses need geocoding.")
-         return True
-
-    print(f"Starting geocoding for {total_to_geocode} addresses...")
-    geocoded_count = 0
-    
-    # --- 4. Iterate and Geocode ---
-    for index in rows_to_process_indices:
-        address = df.loc[index, ADDRESS_COLUMN]
-        
-        # Skip if address is empty or NaN
-        if pd.isna(address) or not str(address).strip():
-            print(f"Skipping row {index}: Empty address.")
-            continue
-            
-        address = str(address).strip() # Ensure it's a clean string
-
-        # Enhance address: Add "山东省" if not present
-        province_name = "山东省"
-        if province_name not in address:
-            # Prepend for clarity, common in Chinese addresses
-            enhanced_address = province_name + address 
-        else:
-            enhanced_address = address
-            
-        # Call the geocoding function
-        lat, lon = get_lat_long(enhanced_address, api_key)
-        
-        # Update DataFrame
-        df.loc[index, 'Latitude'] = lat
-        df.loc[index, 'Longitude'] = lon
-        
-        geocoded_count += 1
-        if geocoded_count % 10 == 0: # Print progress every 10 addresses
-            print(f"Geocoded {geocoded_count}/{total_to_geocode} addresses...")
-            
-        # Delay between requests
-        time.sleep(GEOCODE_DELAY) 
+    result = geocode_dataframe(df, force_geocode, requests_per_second, max_workers, cache_file, use_gazetteer)
+    if result is False:
+        return False
 
-    # --- 5. Save Updated CSV ---
+    # --- 6. Save Updated Table ---
     try:
-        df.to_csv(csv_file, index=False)
-        print(f"Successfully geocoded {geocoded_count} addresses and updated {csv_file}.")
+        save_table(result, csv_file)
+        print(f"Updated {csv_file}.")
         return True
     except Exception as e:
         print(f"Error saving updated CSV file {csv_file}: {e}")
@@ -419,45 +657,66 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Process and translate, and geocode chemical company data.')
     parser.add_argument('--force-extract', action='store_true', help='Force extraction even if output file exists')
-    parser.add_argument('--force-translate', action='store_true', help='Force translation even if English names exist')
-    parser.add_argument('--force-geocode', action='store_true', help='Force geocoding even if Latitude/Longitude data exists')
+    parser.add_argument('--force-translate', action='store_true', help='Re-translate every row, even those whose Chinese name is unchanged')
+    parser.add_argument('--force-geocode', action='store_true', help='Re-geocode every row, even those whose address is unchanged, bypassing the geocode cache')
+    parser.add_argument('--geocode-rps', type=float, default=GEOCODE_RATE_LIMIT, help='Maximum geocoding requests per second')
+    parser.add_argument('--geocode-workers', type=int, default=GEOCODE_MAX_WORKERS, help='Maximum concurrent geocoding requests')
+    parser.add_argument('--geocode-cache', default=GEOCODE_CACHE_FILE, help='SQLite geocode cache file')
+    parser.add_argument('--no-geocode-cache', action='store_true', help='Disable the on-disk geocode cache')
+    parser.add_argument('--no-gazetteer', action='store_true', help='Send every address to the Geocoding API, even county/town-level ones')
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, help='Directory for per-stage pipeline checkpoints')
     args = parser.parse_args()
     
-# --- Step 1: Extract Largest Companies ---
-    print("--- Step 1: Extracting Largest Companies ---")
-    result_df = extract_largest_companies(input_file, output_file, force_extract=args.force_extract)
+    # --- Stages: Extract, Translate, Clean, Geocode ---
+    # The frame is loaded once and handed from stage to stage in memory;
+    # each completed stage is checkpointed so an interrupted run resumes where it stopped.
+    # Translate and geocode only count as completed once no row is left stale (a
+    # failed batch, a missing API key), so the next run retries those rows.
+    stages = [
+        Stage('extract', lambda df: extract_dataframe(input_file, output_file, force_extract=args.force_extract),
+              required=True),
+        Stage('translate', lambda df: translate_dataframe(df, force_translate=args.force_translate,
+                                                          journal_file=os.path.join(args.checkpoint_dir,
+                                                                                    TRANSLATE_JOURNAL)),
+              unfinished=TRANSLATE_DELTA.unfinished),
+        Stage('clean', clean_dataframe),
+        Stage('geocode', lambda df: geocode_dataframe(df, force_geocode=args.force_geocode,
+                                                      requests_per_second=args.geocode_rps,
+                                                      max_workers=args.geocode_workers,
+                                                      cache_file=None if args.no_geocode_cache else args.geocode_cache,
+                                                      use_gazetteer=not args.no_gazetteer,
+                                                      journal_file=os.path.join(args.checkpoint_dir,
+                                                                                GEOCODE_JOURNAL)),
+              unfinished=GEOCODE_DELTA.unfinished),
+    ]
+    
+    # Checkpoints are only valid for the same input data (its store, imported from the CSV if newer)
+    input_store = ensure_store(input_file) if modified_time(input_file) is not None else None
+    input_stat = os.stat(input_store) if input_store else None
+    fingerprint = {
+        'input_file': input_file,
+        'input_size': input_stat.st_size if input_stat else None,
+        'input_mtime': input_stat.st_mtime if input_stat else None,
+    }
+    
+    # A force flag re-runs its stage and everything after it
+    force_from = None
+    for stage_name, forced in (('extract', args.force_extract), ('translate', args.force_translate),
+                               ('geocode', args.force_geocode)):
+        if forced:
+            force_from = stage_name
+            break
+    
+    pipeline = Pipeline(stages, checkpoint_dir=args.checkpoint_dir, fingerprint=fingerprint)
+    result_df = pipeline.run(force_from=force_from)
     
     if result_df is False:
         print("Extraction failed. Exiting.")
         sys.exit(1) # Exit if extraction fails
-
-    # --- Step 2: Translate Company Names ---
-    print("\n--- Step 2: Translating Company Names ---")
-    if not translate_company_names(output_file, force_translate=args.force_translate):
-        print("Translation step failed or was skipped due to errors. Continuing...")
-        # Decide if you want to exit here or continue to geocoding
-        # sys.exit(1) 
-
-    # --- Step 3: Clean Translations ---
-    print("\n--- Step 3: Cleaning Translations ---")
-    if not clean_translations(output_file):
-         print("Cleaning translations failed. Continuing...")
-         # Decide if you want to exit here or continue to geocoding
-         # sys.exit(1)
-
-    # --- Step 4: Geocode Addresses ---
-    print("\n--- Step 4: Geocoding Addresses ---")
-    # Check if the required library 'requests' is installed
-    try:
-        import requests
-    except ImportError:
-        print("Error: 'requests' library not found. Please install it: pip install requests")
-        sys.exit(1)
-        
-    if not geocode_addresses(output_file, force_geocode=args.force_geocode):
-        print("Geocoding step failed or was skipped due to errors.")
-        # Decide if you want to exit here
-        # sys.exit(1) 
+    
+    # --- Final Export ---
+    # The typed store is canonical; the CSV is written alongside it for the web page and spreadsheets
+    save_table(result_df, output_file)
+    print(f"\nSaved {len(result_df)} companies to {output_file}")
         
     print("\n--- Processing Complete ---")
-
@@ -0,0 +1,107 @@
+"""
+A stage that returns with rows still stale must not be checkpointed as
+completed: the next run has to repeat it and retry exactly those rows.
+"""
+import pandas as pd
+
+import sort_enhance
+from geocoding import GeocodingEngine
+from pipeline import Pipeline, RowDelta, Stage
+
+DELTA = RowDelta('Output Input Hash', ['Input'], ['Output'])
+
+# Resolved offline from the gazetteer, and four that need the Geocoding API (a street,
+# or a town the gazetteer has no centroid for)
+COUNTY_ADDRESS = '山东省淄博市临淄区'
+STREET_ADDRESSES = ['山东省淄博市临淄区化工路1号', '山东省东营市东营区港城路北、港西二路东', '山东省潍坊市寿光市羊口镇渤海路3号',
+                    '山东省滨州市无棣县埕口镇']
+
+
+def run_pipeline(tmp_path, stage_func, unfinished, force_from=None, after=None):
+    frame = pd.DataFrame({'Input': ['a', 'b', 'c', 'd']})
+    stages = [
+        Stage('load', lambda df: frame.copy(), required=True),
+        Stage('enrich', stage_func, unfinished=unfinished),
+    ]
+    if after is not None:
+        stages.append(Stage('after', after))
+    return Pipeline(stages, checkpoint_dir=str(tmp_path), fingerprint={'input': 1}).run(force_from)
+
+
+def test_stage_with_stale_rows_runs_again(tmp_path):
+    calls = []
+
+    def enrich(df, fail=('c', 'd')):
+        df = df.copy()
+        todo = df.index[DELTA.stored(df) == '']
+        calls.append(list(df.loc[todo, 'Input']))
+        done = [index for index in todo if df.loc[index, 'Input'] not in fail]
+        df.loc[done, 'Output'] = df.loc[done, 'Input'].str.upper()
+        DELTA.mark(df, done)
+        return df
+
+    first = run_pipeline(tmp_path, enrich, DELTA.unfinished)
+    assert DELTA.unfinished(first) == 2
+
+    second = run_pipeline(tmp_path, lambda df: enrich(df, fail=()), DELTA.unfinished)
+    assert calls[1] == ['a', 'b', 'c', 'd']  # resumed from 'load', not after 'enrich'
+    assert DELTA.unfinished(second) == 0
+
+    # Now complete: a third run resumes after 'enrich' without calling it
+    run_pipeline(tmp_path, enrich, DELTA.unfinished)
+    assert len(calls) == 2
+
+
+def test_forced_stage_left_unfinished_is_not_skipped(tmp_path):
+    calls = []
+
+    def enrich(df, fail=()):
+        df = df.copy()
+        todo = df.index[DELTA.stored(df) == '']
+        calls.append(list(df.loc[todo, 'Input']))
+        done = [index for index in todo if df.loc[index, 'Input'] not in fail]
+        df.loc[done, 'Output'] = df.loc[done, 'Input'].str.upper()
+        DELTA.mark(df, done)
+        return df
+
+    keep = lambda df: df
+    run_pipeline(tmp_path, enrich, DELTA.unfinished, after=keep)
+    run_pipeline(tmp_path, lambda df: enrich(df, fail=('c', 'd')), DELTA.unfinished,
+                 force_from='enrich', after=keep)
+    assert len(calls) == 2
+
+    # The state file of the complete first run must not let this run skip 'enrich'
+    final = run_pipeline(tmp_path, enrich, DELTA.unfinished, after=keep)
+    assert len(calls) == 3
+    assert DELTA.unfinished(final) == 0
+
+
+def test_geocode_without_key_is_retried_with_key(tmp_path, monkeypatch):
+    requested = []
+
+    def fake_request(engine, address):
+        requested.append(address)
+        return 36.5, 118.0, 'OK'
+
+    monkeypatch.setattr(GeocodingEngine, '_request', fake_request)
+
+    def stages():
+        geocode = lambda df: sort_enhance.geocode_dataframe(
+            df, cache_file=None, journal_file=str(tmp_path / 'geocode_journal.jsonl'))
+        return [
+            Stage('load', lambda df: pd.DataFrame({'Address': [COUNTY_ADDRESS] + STREET_ADDRESSES}), required=True),
+            Stage('geocode', geocode, unfinished=sort_enhance.GEOCODE_DELTA.unfinished),
+        ]
+
+    checkpoints = str(tmp_path / 'checkpoints')
+    monkeypatch.delenv('GOOGLE_API_KEY', raising=False)
+    first = Pipeline(stages(), checkpoint_dir=checkpoints).run()
+    # Only the offline row is geocoded; the stage returns the partial frame
+    assert first['Latitude'].notna().tolist() == [True, False, False, False, False]
+    assert requested == []
+
+    monkeypatch.setenv('GOOGLE_API_KEY', 'test-key')
+    second = Pipeline(stages(), checkpoint_dir=checkpoints).run()
+    # The API is sent the addresses as written, not their dedup keys
+    assert sorted(requested) == sorted(STREET_ADDRESSES)
+    assert second['Latitude'].notna().all()
@@ -0,0 +1,62 @@
+"""
+GoogleTranslateBackend against the real googletrans Translator.translate
+(one str per call); only the network round trip (_translate) is replaced by
+a canned RPC reply, so googletrans' own request and parsing code runs.
+"""
+import json
+
+import pytest
+
+googletrans = pytest.importorskip('googletrans')
+from googletrans.client import RPC_ID
+
+from translation import GoogleTranslateBackend, translate_texts
+
+GLOSSARY = {'山东化工': 'Shandong Chemical', '齐鲁石化': 'Qilu Petrochemical', '鲁西集团': 'Luxi Group'}
+
+
+def rpc_reply(translated):
+    parsed = [[None, None, 'zh-CN'], [[[None, None, None, True, None, [[translated]]]]], 'zh-CN']
+    return ')]}\'\n\n' + json.dumps([['wrb.fr', RPC_ID, json.dumps(parsed)]])
+
+
+class FakeService:
+    """Stands in for Translator._translate: translates line by line and records the requests."""
+
+    def __init__(self, merge_lines=False):
+        self.requests = []
+        self.merge_lines = merge_lines
+
+    def __call__(self, text, dest, src):
+        assert isinstance(text, str), "googletrans sends one string per call"
+        self.requests.append(text)
+        lines = [GLOSSARY.get(line, line) for line in text.split('\n')]
+        return rpc_reply((' ' if self.merge_lines else '\n').join(lines)), None
+
+
+def make_backend(monkeypatch, service):
+    translator = googletrans.Translator()
+    monkeypatch.setattr(translator, '_translate', service)
+    return GoogleTranslateBackend(translator)
+
+
+def test_batch_is_one_call(monkeypatch):
+    service = FakeService()
+    backend = make_backend(monkeypatch, service)
+    assert backend.translate_batch(list(GLOSSARY)) == list(GLOSSARY.values())
+    assert len(service.requests) == 1
+
+
+def test_line_count_mismatch_falls_back_to_one_call_per_text(monkeypatch):
+    service = FakeService(merge_lines=True)
+    backend = make_backend(monkeypatch, service)
+    assert backend.translate_batch(list(GLOSSARY)) == list(GLOSSARY.values())
+    assert service.requests[1:] == list(GLOSSARY)
+
+
+def test_translate_texts_with_real_signature(monkeypatch):
+    service = FakeService()
+    backend = make_backend(monkeypatch, service)
+    names = list(GLOSSARY) * 2
+    assert translate_texts(names, backend, batch_size=2, batch_delay=0) == GLOSSARY
+    assert len(service.requests) == 2
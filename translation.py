@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+import time
+
+# --- Constants ---
+DEFAULT_BATCH_SIZE = 50
+
+# Delay between batches (not rows) to avoid rate limiting
+DEFAULT_BATCH_DELAY = 0.5
+
+
+class GoogleTranslateBackend:
+    """
+    Translator backend wrapping a googletrans Translator.
+
+    googletrans 4.0.0rc1 translates one string per translate() call, so a
+    batch is sent as its texts joined by newlines, which the service
+    translates line by line, and the reply is split back into lines. If the
+    reply does not have one line per text (a text containing a newline, or
+    lines merged by the service), the batch is translated one text per call
+    instead.
+
+    Parameters:
+    translator: googletrans.Translator instance
+    src (str): Source language code
+    dest (str): Target language code
+    """
+
+    def __init__(self, translator, src='zh-cn', dest='en'):
+        self.translator = translator
+        self.src = src
+        self.dest = dest
+
+    def _translate(self, text):
+        return self.translator.translate(text, src=self.src, dest=self.dest).text
+
+    def translate_batch(self, texts):
+        texts = list(texts)
+        if not any('\n' in text for text in texts):
+            lines = self._translate('\n'.join(texts)).split('\n')
+            if len(lines) == len(texts):
+                return [line.strip() for line in lines]
+        return [self._translate(text) for text in texts]
+
+
+class FakeTranslatorBackend:
+    """
+    Offline stand-in for benchmarks: returns a deterministic pseudo-translation
+    after a fixed per-call latency, counting calls like a metered API would.
+
+    Parameters:
+    latency (float): Seconds to sleep on every call
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.items = 0
+
+    def translate_batch(self, texts):
+        texts = list(texts)
+        self.calls += 1
+        self.items += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [f"EN[{text}]" for text in texts]
+
+
+class TranslationCache:
+    """
+    Persistent SQLite memo of source text -> translation, shared across runs and CSV files.
+
+    Parameters:
+    path (str): SQLite database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS translation_cache (
+                source TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get_many(self, texts):
+        """
+        Look up many texts at once.
+
+        Returns:
+        dict: source text -> cached translation, for the texts that were found.
+        """
+        texts = list(texts)
+        found = {}
+        with self.lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(texts), 500):
+                chunk = texts[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT source, translation FROM translation_cache WHERE source IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, translations):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO translation_cache (source, translation, created_at) VALUES (?, ?, ?)",
+                [(source, text, now) for source, text in translations.items()]
+            )
+            self.conn.commit()
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(f"Translation cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def translate_texts(texts, backend, cache=None, batch_size=DEFAULT_BATCH_SIZE, batch_delay=DEFAULT_BATCH_DELAY,
+                    on_batch=None):
+    """
+    Translate texts with deduplication, caching and batching.
+
+    Parameters:
+    texts (iterable): Source strings; empty strings and duplicates are dropped
+    backend: Object with a translate_batch(list) -> list method
+    cache (TranslationCache): Optional persistent memo consulted before the backend
+    batch_size (int): Number of texts sent per backend call
+    batch_delay (float): Seconds to wait between backend calls
+    on_batch (callable): Called with the dict of new translations after every
+                         successful batch (and once with the cached ones)
+
+    Returns:
+    dict: source text -> translation. Texts whose batch failed are omitted.
+    """
+    unique = [text for text in dict.fromkeys(texts) if text]
+    translations = cache.get_many(unique) if cache is not None else {}
+    pending = [text for text in unique if text not in translations]
+    if on_batch is not None and translations:
+        on_batch(dict(translations))
+
+    if pending:
+        print(f"Translating {len(pending)} unique names in batches of {batch_size} "
+              f"({len(unique) - len(pending)} already cached)...")
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            results = backend.translate_batch(batch)
+            fresh = dict(zip(batch, results))
+            translations.update(fresh)
+            if cache is not None:
+                cache.put_many(fresh)
+            print(f"Translated {min(start + batch_size, len(pending))}/{len(pending)} company names...")
+        except Exception as e:
+            print(f"Error translating batch starting with '{batch[0]}': {e}")
+        else:
+            # Outside the try: a failing checkpoint must stop the run, not pass as a failed batch
+            if on_batch is not None:
+                on_batch(fresh)
+
+        if batch_delay and start + batch_size < len(pending):
+            time.sleep(batch_delay)
+
+    return translations
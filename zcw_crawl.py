@@ -0,0 +1,287 @@
+"""
+Concurrent crawler for the zctpt.com chemical-company listings.
+
+Starting from seed URLs, worker threads fetch pages over plain HTTP
+(page_fetch.StaticFetcher), parse company blocks with zcw_scrape's parser,
+and follow links that match --link-pattern. The frontier is bounded and
+every host gets its own concurrency cap and minimum request interval. The
+rows from all pages are merged into one CSV, deduplicated by Chinese Name.
+
+To test offline, serve a directory of saved pages locally and point the
+crawler at it:
+    python -m http.server 8000 --directory saved_pages
+    python zcw_crawl.py --seed http://127.0.0.1:8000/chem/13818.html --host-delay 0
+"""
+import argparse
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import requests
+
+from page_fetch import PageCache, StaticFetcher
+from zcw_scrape import ARTICLE_URL, parse_companies, write_companies
+
+# --- Constants ---
+OUTPUT_FILE = "shandong_chemical_companies_all.csv"
+PAGE_CACHE_FILE = "zcw_page_cache.sqlite"
+
+# Article pages and the listing pages that link to them
+DEFAULT_LINK_PATTERN = r"/chem/(\d+\.html)?(\?page=\d+)?$"
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_PAGES = 500
+DEFAULT_FRONTIER_SIZE = 2000
+DEFAULT_PER_HOST = 2            # concurrent requests per host
+DEFAULT_HOST_DELAY = 1.0        # seconds between request starts on one host
+
+HREF_PATTERN = re.compile(r'<a\s[^>]*?href\s*=\s*["\']([^"\'#]+)', re.IGNORECASE)
+
+
+class Frontier:
+    """
+    Bounded FIFO of URLs waiting to be crawled.
+
+    Each URL is admitted at most once. Once max_pages URLs have been admitted,
+    or max_size URLs are waiting, new links are dropped; a dropped URL is not
+    marked seen, so a later link to it is admitted once there is room. get()
+    blocks while other workers may still add links, and returns None once the
+    queue is empty and nothing is in flight.
+
+    Parameters:
+    max_size (int): Maximum number of URLs waiting at once
+    max_pages (int): Maximum number of URLs admitted over the whole crawl
+    """
+
+    def __init__(self, max_size=DEFAULT_FRONTIER_SIZE, max_pages=DEFAULT_MAX_PAGES):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.queue = deque()
+        self.seen = set()
+        self.admitted = 0
+        self.dropped = set()
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def add(self, url):
+        """Queue a URL. Returns False if it was already seen or had to be dropped."""
+        with self.condition:
+            if url in self.seen:
+                return False
+            if self.admitted >= self.max_pages or len(self.queue) >= self.max_size:
+                self.dropped.add(url)
+                return False
+            self.seen.add(url)
+            self.dropped.discard(url)
+            self.queue.append((self.admitted, url))
+            self.admitted += 1
+            self.condition.notify()
+            return True
+
+    def get(self):
+        """
+        Returns:
+        tuple or None: (discovery order, url), or None when the crawl is finished.
+        """
+        with self.condition:
+            while not self.queue and self.in_flight:
+                self.condition.wait()
+            if not self.queue:
+                return None
+            self.in_flight += 1
+            return self.queue.popleft()
+
+    def task_done(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+
+class HostPoliteness:
+    """
+    Per-host limits: at most max_concurrent requests in flight, and request
+    starts spaced at least min_interval seconds apart.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_PER_HOST, min_interval=DEFAULT_HOST_DELAY):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def _host_state(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = {"slots": threading.Semaphore(self.max_concurrent), "next_start": 0.0}
+            return self.hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        state = self._host_state(urlsplit(url).netloc)
+        with state["slots"]:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, state["next_start"])
+                state["next_start"] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+def extract_links(html, base_url, link_pattern):
+    """Absolute same-host links in a page whose path matches link_pattern."""
+    host = urlsplit(base_url).netloc
+    links = []
+    for href in HREF_PATTERN.findall(html):
+        url = urldefrag(urljoin(base_url, href.strip()))[0]
+        parts = urlsplit(url)
+        if parts.scheme in ("http", "https") and parts.netloc == host and link_pattern.search(url):
+            links.append(url)
+    return links
+
+
+def merge_companies(pages):
+    """
+    Merge per-page rows in discovery order, keeping the first row for each Chinese Name.
+
+    Returns:
+        tuple: (merged rows, number of duplicates dropped)
+    """
+    merged = {}
+    duplicates = 0
+    for _order, companies in sorted(pages, key=lambda page: page[0]):
+        for company in companies:
+            name = company["Chinese Name"]
+            if name in merged:
+                duplicates += 1
+                continue
+            merged[name] = company
+    return list(merged.values()), duplicates
+
+
+def crawl(seeds, fetcher, link_pattern=DEFAULT_LINK_PATTERN, workers=DEFAULT_WORKERS,
+          max_pages=DEFAULT_MAX_PAGES, frontier_size=DEFAULT_FRONTIER_SIZE,
+          per_host=DEFAULT_PER_HOST, host_delay=DEFAULT_HOST_DELAY, backend="html.parser"):
+    """
+    Crawl from the seed URLs and parse every page that has an article_content block.
+
+    Returns:
+        tuple: (list of (discovery order, companies) per page, stats dict)
+    """
+    link_pattern = re.compile(link_pattern)
+    frontier = Frontier(frontier_size, max_pages)
+    politeness = HostPoliteness(per_host, host_delay)
+    for seed in seeds:
+        frontier.add(seed)
+
+    pages = []
+    lock = threading.Lock()
+    stats = {"fetched": 0, "not_modified": 0, "articles": 0, "errors": 0, "bytes": 0,
+             "fetch_time": 0.0, "parse_times": []}
+
+    def worker():
+        while True:
+            item = frontier.get()
+            if item is None:
+                return
+            order, url = item
+            try:
+                with politeness.slot(url):
+                    result = fetcher.fetch(url)
+                parse_start = time.perf_counter()
+                try:
+                    companies = parse_companies(result.html, backend)
+                except RuntimeError:
+                    companies = []  # listing page without article_content
+                links = extract_links(result.html, url, link_pattern)
+                parse_time = time.perf_counter() - parse_start
+
+                with lock:
+                    stats["fetched"] += 1
+                    stats["not_modified"] += result.not_modified
+                    stats["bytes"] += result.bytes
+                    stats["fetch_time"] += result.elapsed
+                    stats["parse_times"].append(parse_time)
+                    if companies:
+                        stats["articles"] += 1
+                        pages.append((order, companies))
+                for link in links:
+                    frontier.add(link)
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching {url}: {e}")
+                with lock:
+                    stats["errors"] += 1
+            except Exception as e:
+                # A page that fails to decode or parse must not stop this worker's share of the frontier
+                print(f"Error processing {url}: {e!r}")
+                with lock:
+                    stats["errors"] += 1
+            finally:
+                frontier.task_done()
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(worker) for _ in range(workers)]:
+            future.result()
+    stats["elapsed"] = time.monotonic() - start
+    stats["dropped"] = len(frontier.dropped)
+    return pages, stats
+
+
+def print_crawl_report(stats, merged_count, duplicates):
+    parse_times = sorted(stats["parse_times"])
+    elapsed = stats["elapsed"]
+    rate = stats["fetched"] / elapsed if elapsed else 0.0
+    print("\n============ CRAWL ============")
+    print(f"Pages: {stats['fetched']} fetched ({stats['not_modified']} not modified), "
+          f"{stats['articles']} with companies, {stats['errors']} errors, "
+          f"{stats['dropped']} links dropped by the frontier")
+    print(f"Time: {elapsed:.1f} s, {rate:.2f} pages/s, {stats['bytes'] / 1024:.0f} KiB downloaded")
+    if parse_times:
+        mean = sum(parse_times) / len(parse_times)
+        median = parse_times[len(parse_times) // 2]
+        print(f"Parse time per page: mean {mean * 1000:.1f} ms, median {median * 1000:.1f} ms, "
+              f"max {parse_times[-1] * 1000:.1f} ms")
+    print(f"Companies: {merged_count} unique, {duplicates} duplicates dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl zctpt.com chemical-company listings.')
+    parser.add_argument('--seed', action='append', help=f'Start URL (repeatable, default {ARTICLE_URL})')
+    parser.add_argument('--link-pattern', default=DEFAULT_LINK_PATTERN,
+                        help='Regex a same-host link must match to be followed')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES)
+    parser.add_argument('--frontier-size', type=int, default=DEFAULT_FRONTIER_SIZE)
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help='Concurrent requests per host')
+    parser.add_argument('--host-delay', type=float, default=DEFAULT_HOST_DELAY,
+                        help='Minimum seconds between requests to one host')
+    parser.add_argument('--backend', choices=['html.parser', 'lxml'], default='html.parser')
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--page-cache', default=PAGE_CACHE_FILE)
+    parser.add_argument('--no-page-cache', action='store_true')
+    args = parser.parse_args()
+
+    cache = None if args.no_page_cache else PageCache(args.page_cache)
+    try:
+        with StaticFetcher(cache, pool_size=args.workers) as fetcher:
+            pages, stats = crawl(args.seed or [ARTICLE_URL], fetcher, args.link_pattern, args.workers,
+                                 args.max_pages, args.frontier_size, args.per_host, args.host_delay,
+                                 args.backend)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    companies, duplicates = merge_companies(pages)
+    write_companies(companies, args.output)
+    print_crawl_report(stats, len(companies), duplicates)
+    print(f"✅ Wrote {len(companies)} companies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
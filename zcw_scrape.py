@@ -1,33 +1,36 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
-import csv
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+import argparse
+import os
 import re
-import time
 
-# Setup headless Chrome
-options = Options()
-options.add_argument("--headless")
-options.add_argument("--disable-gpu")
-driver = webdriver.Chrome(options=options)
+import pandas as pd
+import requests
 
-# Load page and wait
-url = "http://zctpt.com/chem/13818.html"
-driver.get(url)
-time.sleep(3)  # Let JS load
+from browser import create_driver, load_page, quit_driver
+from company_store import save_table
+from page_fetch import PageCache, StaticFetcher
 
-# Get full rendered HTML
-soup = BeautifulSoup(driver.page_source, "html.parser")
-driver.quit()
+ARTICLE_URL = "http://zctpt.com/chem/13818.html"
+OUTPUT_FILE = "shandong_chemical_companies.csv"
+PAGE_CACHE_FILE = "zcw_page_cache.sqlite"
 
-# Now parse the dynamic content
-content_div = soup.find("div", class_="article_content")
-if not content_div:
-    raise RuntimeError("Could not find article_content div.")
+# Upper bound for the article's JS to fill in article_content (was a fixed 3 s sleep)
+JS_WAIT = 10
 
-# Proceed as before...
-raw_html = content_div.decode_contents()
-blocks = re.split(r'<br\s*/?>\s*<br\s*/?>', raw_html)
+FIELDNAMES = [
+    "Chinese Name",
+    "English Name",
+    "Address",
+    "Latitude",
+    "Longitude",
+    "Main Products",
+    "Registered Capital (RMB)",
+    "Opening Year"
+]
 
 # Same regex logic as before
 patterns = {
@@ -40,22 +43,170 @@ patterns = {
     "address": re.compile(r'公司地址[:：]?(.+)')
 }
 
-companies = []
-for block in blocks:
-    text = ' '.join(BeautifulSoup(block, 'html.parser').stripped_strings)
+# Elements whose text is not part of the article body
+SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+
+def fetch_rendered_html(url):
+    """Load a page in headless Chrome and return the rendered HTML."""
+    driver = create_driver()
+    try:
+        # Load page and wait for JS to fill in the article
+        load_page(driver, url)
+        try:
+            WebDriverWait(driver, JS_WAIT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div.article_content"))
+            )
+        except TimeoutException:
+            pass
+
+        # Get full rendered HTML
+        return driver.page_source
+    finally:
+        quit_driver(driver).report("zcw browser")
+
+
+def _is_whitespace_string(node):
+    return type(node) in (NavigableString, CData) and not node.strip()
+
+
+def _ends_br_pair(br):
+    """True if this <br> is followed, across whitespace only, by a sibling <br>."""
+    sibling = br.next_sibling
+    while sibling is not None and _is_whitespace_string(sibling):
+        sibling = sibling.next_sibling
+    return isinstance(sibling, Tag) and sibling.name == "br"
+
+
+def iter_text_blocks(content_div):
+    """
+    Yield the text of each company block in one walk over the parsed tree.
+
+    Blocks are separated by two <br> tags with only whitespace between them,
+    and each block's text is its stripped strings joined by single spaces, as
+    if the block had been cut out of the HTML and re-parsed on its own.
+
+    Args:
+        content_div (Tag): The parsed article_content element
+
+    Returns:
+        generator: Text of each non-empty block, in document order
+    """
+    strings = []
+    # Adjacent sibling strings (left by stray end tags) serialize as one run of
+    # text, so they are merged before stripping, as a re-parse would
+    pending = []
+    previous = None
+
+    def flush():
+        text = "".join(pending).strip()
+        if text:
+            strings.append(text)
+        pending.clear()
+
+    for node in content_div.descendants:
+        if type(node) in (NavigableString, CData):
+            if node.parent.name in SKIPPED_TEXT_TAGS:
+                continue
+            if pending and node.previous_sibling is not previous:
+                flush()
+            pending.append(node)
+            previous = node
+            continue
+        flush()
+        if isinstance(node, Tag) and node.name == "br" and _ends_br_pair(node):
+            if strings:
+                yield " ".join(strings)
+            strings = []
+    flush()
+    if strings:
+        yield " ".join(strings)
+
+
+def iter_text_blocks_lxml(html):
+    """
+    lxml backend for iter_text_blocks: same blocks, parsed and walked with lxml.html.
+    Much faster; on malformed markup (stray end tags) lxml's tree can differ
+    slightly from html.parser's.
+
+    Args:
+        html (str): Full page HTML
+
+    Returns:
+        generator: Text of each non-empty block, in document order
+    """
+    import lxml.html
+
+    root = lxml.html.fromstring(html)
+    found = root.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " article_content ")]')
+    if not found:
+        raise RuntimeError("Could not find article_content div.")
+
+    strings = []
+
+    def add(text):
+        if text:
+            text = text.strip()
+            if text:
+                strings.append(text)
+
+    def walk(element):
+        # Yields once per block boundary; text is collected into `strings`
+        for child in element:
+            is_element = isinstance(child.tag, str)
+            if is_element and child.tag == "br":
+                following = child.getnext()
+                if (child.tail is None or not child.tail.strip()) and following is not None \
+                        and following.tag == "br":
+                    yield
+            elif is_element and child.tag not in SKIPPED_TEXT_TAGS:
+                add(child.text)
+                yield from walk(child)
+            add(child.tail)
+
+    content = found[0]
+    add(content.text)
+    for _boundary in walk(content):
+        if strings:
+            yield " ".join(strings)
+        strings = []
+    if strings:
+        yield " ".join(strings)
+
+
+def find_article_blocks(html, backend="html.parser"):
+    """
+    Parse a page once and yield the article's company text blocks.
+
+    Args:
+        html (str): Full page HTML
+        backend (str): "html.parser" (BeautifulSoup) or "lxml"
+    """
+    if backend == "lxml":
+        yield from iter_text_blocks_lxml(html)
+        return
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Now parse the dynamic content
+    content_div = soup.find("div", class_="article_content")
+    if not content_div:
+        raise RuntimeError("Could not find article_content div.")
+
+    yield from iter_text_blocks(content_div)
+
+
+def parse_company_block(text):
+    """
+    Turn one block of article text into a company row.
+
+    Returns:
+        dict or None: Row keyed by FIELDNAMES, or None if the block has no company name
+    """
     if not text.strip():
-        continue
-
-    company = {
-        "Chinese Name": "",
-        "English Name": "",
-        "Address": "",
-        "Latitude": "",
-        "Longitude": "",
-        "Main Products": "",
-        "Registered Capital (RMB)": "",
-        "Opening Year": ""
-    }
+        return None
+
+    company = dict.fromkeys(FIELDNAMES, "")
 
     # Extract raw values using regex
     extracted = {}
@@ -67,7 +218,7 @@ for block in blocks:
     # Assign mapped fields
     company["Chinese Name"] = extracted.get("company", "")
     company["Address"] = extracted.get("address", "")
-    
+
     # Registered Capital: convert to full RMB value
     raw_cap = extracted.get("capital", "")
     if raw_cap:
@@ -81,13 +232,94 @@ for block in blocks:
     if raw_date:
         company["Opening Year"] = raw_date[:4]
 
-    if company["Chinese Name"]:
-        companies.append(company)
+    return company if company["Chinese Name"] else None
+
+
+def parse_companies(html, backend="html.parser"):
+    """Parse every company row out of an article page."""
+    companies = []
+    for block in find_article_blocks(html, backend):
+        company = parse_company_block(block)
+        if company:
+            companies.append(company)
+    return companies
+
+
+def write_companies(companies, output_file):
+    """Save the companies as a typed table (company_store) with a CSV export (BOM kept for Excel)."""
+    save_table(pd.DataFrame(companies, columns=FIELDNAMES), output_file, csv_encoding="utf-8-sig")
+
+
+def scrape_article(url, mode="auto", fetcher=None, backend="html.parser", output_file=None):
+    """
+    Fetch and parse one article, preferring a plain HTTP GET over headless Chrome.
+
+    Args:
+        url (str): Article URL
+        mode (str): "auto" (static first, Chrome only if article_content is missing),
+                    "static" or "browser"
+        fetcher (StaticFetcher): HTTP client for the static modes
+        backend (str): Parser backend passed to parse_companies
+        output_file (str): Existing output; if the page is unchanged (HTTP 304) and
+                           this file exists, the page is not parsed again
+
+    Returns:
+        tuple: (companies, source) where source is "static", "browser" or
+               "not_modified" (companies is None in that case)
+    """
+    if mode != "browser":
+        try:
+            result = fetcher.fetch(url)
+        except requests.exceptions.RequestException as e:
+            if mode == "static":
+                raise
+            print(f"Static fetch failed ({e}); falling back to headless Chrome")
+        else:
+            if result.not_modified and output_file and os.path.exists(output_file):
+                return None, "not_modified"
+            try:
+                companies = parse_companies(result.html, backend)
+            except RuntimeError:
+                companies = []
+            if companies:
+                return companies, "static"
+            if mode == "static":
+                raise RuntimeError("article_content not found in the static HTML; it needs JavaScript.")
+            print("article_content not in the static HTML; falling back to headless Chrome")
+
+    html = fetch_rendered_html(url)
+    return parse_companies(html, backend), "browser"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape the zctpt.com Shandong chemical company list.')
+    parser.add_argument('--backend', choices=['html.parser', 'lxml'], default='html.parser',
+                        help='HTML parser used to walk the article')
+    parser.add_argument('--fetch', choices=['auto', 'static', 'browser'], default='auto',
+                        help='auto: plain HTTP, headless Chrome only when the article needs JS')
+    parser.add_argument('--page-cache', default=PAGE_CACHE_FILE,
+                        help='SQLite file holding ETag / Last-Modified validators for conditional requests')
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help='Always download and parse the page')
+    args = parser.parse_args()
+
+    cache = None if args.no_page_cache else PageCache(args.page_cache)
+    try:
+        with StaticFetcher(cache) as fetcher:
+            companies, source = scrape_article(ARTICLE_URL, args.fetch, fetcher, args.backend, OUTPUT_FILE)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if source == "not_modified":
+        print(f"Source page unchanged; keeping {OUTPUT_FILE}.")
+        return
+
+    # Write the table and its CSV export
+    write_companies(companies, OUTPUT_FILE)
+
+    print(f"✅ Extracted {len(companies)} companies ({source} fetch).")
 
-# Write to CSV
-with open("shandong_chemical_companies.csv", "w", newline='', encoding="utf-8-sig") as f:
-    writer = csv.DictWriter(f, fieldnames=company.keys())
-    writer.writeheader()
-    writer.writerows(companies)
 
-print(f"✅ Extracted {len(companies)} companies.")
+if __name__ == "__main__":
+    main()